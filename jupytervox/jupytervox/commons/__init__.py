@@ -1,3 +1,11 @@
-from .logging import jvox_logging
-from .ai_backend import gemini_interface
-from .ai_backend import llama_cpp_interface
\ No newline at end of file
+# the AI backends pull in google.genai and requests, which are slow to
+# import, and the logging pulls in the configuration (tomllib) and inspect.
+# They are imported on first access, e.g., commons.gemini_interface
+def __getattr__(name):
+    if name in ("gemini_interface", "llama_cpp_interface"):
+        from . import ai_backend
+        return getattr(ai_backend, name)
+    if name == "jvox_logging":
+        from .logging import jvox_logging
+        return jvox_logging
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -1,5 +1,13 @@
-from . import gemini_interface
-from . import llama_cpp_interface
+import importlib
+
+# the backends are imported on first use, since google.genai and requests
+# are slow to import
+_backend_modules = {"gemini_interface", "llama_cpp_interface"}
+
+def __getattr__(name):
+    if name in _backend_modules:
+        return importlib.import_module(f".{name}", __name__)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
 def get_ai_interface(client_name=None):
@@ -17,6 +25,6 @@ def get_ai_interface(client_name=None):
         A module that exposes at least ``generate(prompt, **kwargs)``.
     """
     if client_name == "gemini":
-        return gemini_interface
+        return importlib.import_module(".gemini_interface", __name__)
     # Default to the Ollama / llama.cpp backend
-    return llama_cpp_interface
\ No newline at end of file
+    return importlib.import_module(".llama_cpp_interface", __name__)
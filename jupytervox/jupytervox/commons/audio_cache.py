@@ -0,0 +1,446 @@
+#
+# Two-tier cache of synthesized audio (e.g., gTTS MP3 bytes).
+#
+# Most of JVox's audio is repeated phrases, e.g., "end of statement", "Empty
+# line." or "There is no syntax error.". Each synthesis is a network round
+# trip to Google, so the audio is cached:
+#   1. in memory: a size-bounded LRU of the most recent audio clips
+#   2. on disk: a content-addressed store (file name is the hash of the text
+#      and the voice settings), shared by the processes of the same user and
+#      kept across server restarts. The store must be a private directory of
+#      the user, since anyone who can write to it can plant audio under the
+#      hashed names
+#
+
+import collections
+import hashlib
+import json
+import os
+import stat
+import tempfile
+import threading
+
+from . import config as jc
+
+def make_audio_key(text, settings):
+    """
+    Generate the content address of an audio clip.
+
+    Parameters
+    ----------
+    text: the text to synthesize
+
+    settings: dict of everything else that changes the audio, e.g., the TTS
+        engine, language and voice settings
+
+    Returns
+    -------
+    str
+        hex SHA-256 of the text and settings
+    """
+    data = json.dumps([text, settings], sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(data.encode("utf-8")).hexdigest()
+
+def is_audio_key(key):
+    """
+    Check if "key" looks like a content address from make_audio_key, e.g.,
+    before using a key from a request as a file name
+    """
+    return (isinstance(key, str) and len(key) == 64 and
+            all(c in "0123456789abcdef" for c in key))
+
+def make_private_dir(path):
+    """
+    Create the directory "path" (mode 0700) if it does not exist, and check
+    that it is a private directory of the current user, i.e., not a symbolic
+    link, owned by the user and not accessible by the group or others.
+
+    Raises
+    ------
+    OSError
+        if the directory can't be created or is not private
+    """
+    os.makedirs(path, mode=0o700, exist_ok=True)
+
+    st = os.lstat(path)
+    if not stat.S_ISDIR(st.st_mode):
+        raise OSError(f"Audio cache path is not a directory: {path}")
+    if hasattr(os, "getuid") and st.st_uid != os.getuid():
+        raise OSError(f"Audio cache directory is owned by another user: "
+                      f"{path}")
+    if st.st_mode & 0o077:
+        raise OSError(f"Audio cache directory is not private "
+                      f"(mode {stat.S_IMODE(st.st_mode):o}): {path}")
+
+def audio_mime_type(audio):
+    """
+    Guess the MIME type of audio bytes from their header
+    """
+    if audio[:4] == b"RIFF" and audio[8:12] == b"WAVE":
+        return "audio/wav"
+    if audio[:3] == b"ID3" or (len(audio) > 1 and audio[0] == 0xFF and
+                               (audio[1] & 0xE0) == 0xE0):
+        return "audio/mpeg"
+    if audio[:4] == b"OggS":
+        return "audio/ogg"
+    return "application/octet-stream"
+
+class audio_cache:
+    """
+    In-memory LRU plus on-disk content-addressed store of audio clips, with
+    size limits, eviction and hit-rate counters. Thread-safe.
+    """
+
+    def __init__(self, memory_max_entries=512, memory_max_bytes=32*1024*1024,
+                 disk_dir=None, disk_max_bytes=256*1024*1024,
+                 pinned_max_entries=64):
+        """
+        Parameters
+        ----------
+        memory_max_entries, memory_max_bytes: limits of the in-memory tier;
+            0 disables the in-memory tier
+
+        disk_dir: directory of the on-disk tier; None or "" disables it.
+            It is created if missing, and must be private to the user, see
+            make_private_dir
+
+        disk_max_bytes: size limit of the on-disk tier
+
+        pinned_max_entries: max number of clips pinned until fetched, see
+            pin; 0 disables pinning
+        """
+        self.memory_max_entries = memory_max_entries
+        self.memory_max_bytes = memory_max_bytes
+        self.memory = collections.OrderedDict()
+        self.memory_bytes = 0
+
+        self.disk_dir = disk_dir if disk_dir else None
+        self.disk_max_bytes = disk_max_bytes
+        self.disk_bytes = 0
+
+        # key -> [audio, number of pending fetches] of the pinned clips, in
+        # pinning order
+        self.pinned_max_entries = pinned_max_entries
+        self.pinned = collections.OrderedDict()
+
+        self.lock = threading.Lock()
+        # key -> threading.Event of the syntheses in progress
+        self.in_flight = {}
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.memory_evictions = 0
+        self.disk_evictions = 0
+
+        if self.disk_dir is not None:
+            make_private_dir(self.disk_dir)
+            self.disk_bytes = sum(size for path, size, mtime
+                                  in self._disk_files())
+
+    # ---------------------------------------------------------------
+    # in-memory tier
+    # ---------------------------------------------------------------
+    def _memory_get(self, key):
+        audio = self.memory.get(key)
+        if audio is not None:
+            self.memory.move_to_end(key)
+        return audio
+
+    def _memory_put(self, key, audio):
+        if self.memory_max_entries <= 0 or len(audio) > self.memory_max_bytes:
+            return
+
+        old = self.memory.pop(key, None)
+        if old is not None:
+            self.memory_bytes -= len(old)
+        self.memory[key] = audio
+        self.memory_bytes += len(audio)
+
+        while (len(self.memory) > self.memory_max_entries or
+               self.memory_bytes > self.memory_max_bytes):
+            old_key, old_audio = self.memory.popitem(last=False)
+            self.memory_bytes -= len(old_audio)
+            self.memory_evictions += 1
+
+    # ---------------------------------------------------------------
+    # on-disk tier
+    # ---------------------------------------------------------------
+    def _disk_path(self, key):
+        # two-level layout to keep directories small
+        return os.path.join(self.disk_dir, key[:2], key + ".audio")
+
+    def _disk_files(self):
+        """
+        Return a list of (path, size, mtime) of all files in the store
+        """
+        files = []
+        for root, dirs, names in os.walk(self.disk_dir):
+            for name in names:
+                if not name.endswith(".audio"):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue
+                files.append((path, st.st_size, st.st_mtime))
+        return files
+
+    def _disk_get(self, key):
+        path = self._disk_path(key)
+        try:
+            with open(path, "rb") as f:
+                audio = f.read()
+            # mark as recently used for eviction
+            os.utime(path)
+        except OSError:
+            return None
+        return audio
+
+    def _disk_put(self, key, audio):
+        path = self._disk_path(key)
+        if os.path.exists(path):
+            return
+        try:
+            os.makedirs(os.path.dirname(path), mode=0o700, exist_ok=True)
+            # write to a temporary file then rename, so that other processes
+            # never read a partial file
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path))
+            with os.fdopen(fd, "wb") as f:
+                f.write(audio)
+            os.replace(tmp_path, path)
+        except OSError:
+            return
+
+        with self.lock:
+            self.disk_bytes += len(audio)
+            if self.disk_bytes <= self.disk_max_bytes:
+                return
+
+        self._disk_evict()
+
+    def _disk_evict(self):
+        """
+        Remove the least recently used files until the store is within 90% of
+        its size limit
+        """
+        files = self._disk_files()
+        total = sum(size for path, size, mtime in files)
+        target = self.disk_max_bytes * 0.9
+        evicted = 0
+        for path, size, mtime in sorted(files, key=lambda f: f[2]):
+            if total <= target:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+            evicted += 1
+
+        with self.lock:
+            self.disk_bytes = total
+            self.disk_evictions += evicted
+
+    # ---------------------------------------------------------------
+    # public interface
+    # ---------------------------------------------------------------
+    def get(self, text, settings):
+        """
+        Return the cached audio bytes of text/settings, or None
+        """
+        key = make_audio_key(text, settings)
+        with self.lock:
+            audio = self._memory_get(key)
+            if audio is not None:
+                self.memory_hits += 1
+                return audio
+
+        if self.disk_dir is not None:
+            audio = self._disk_get(key)
+            if audio is not None:
+                with self.lock:
+                    self.disk_hits += 1
+                    self._memory_put(key, audio)
+                return audio
+
+        with self.lock:
+            self.misses += 1
+        return None
+
+    def get_by_key(self, key):
+        """
+        Return the cached audio bytes with content address "key", or None.
+        Used to serve audio that was synthesized (and cached) earlier, so it
+        is not counted in the hit/miss statistics.
+        """
+        if not is_audio_key(key):
+            return None
+
+        with self.lock:
+            audio = self._unpin(key)
+            if audio is not None:
+                self._memory_put(key, audio)
+            else:
+                audio = self._memory_get(key)
+        if audio is None and self.disk_dir is not None:
+            audio = self._disk_get(key)
+            if audio is not None:
+                with self.lock:
+                    self._memory_put(key, audio)
+        return audio
+
+    def pin(self, key, audio):
+        """
+        Keep the audio bytes with content address "key" until they are
+        fetched once with get_by_key, even if the clip is too large for the
+        tiers or is evicted in the meantime. Used before handing the key to a
+        client that fetches the audio later. Only the "pinned_max_entries"
+        most recent pins are kept, so clips that are never fetched do not
+        pile up.
+
+        Returns True if the audio is pinned
+        """
+        if self.pinned_max_entries <= 0 or not is_audio_key(key):
+            return False
+
+        with self.lock:
+            entry = self.pinned.pop(key, None)
+            if entry is None:
+                entry = [audio, 0]
+            entry[1] += 1
+            self.pinned[key] = entry
+            while len(self.pinned) > self.pinned_max_entries:
+                self.pinned.popitem(last=False)
+        return True
+
+    def _unpin(self, key):
+        # called with the lock held; returns the pinned audio of "key" and
+        # releases one pending fetch, or None if not pinned
+        entry = self.pinned.get(key)
+        if entry is None:
+            return None
+        entry[1] -= 1
+        if entry[1] <= 0:
+            del self.pinned[key]
+        return entry[0]
+
+    def _peek(self, key):
+        # returns the audio of "key" from the tiers, or the pinned audio if
+        # it is in neither, without releasing a pending fetch of the pin
+        with self.lock:
+            audio = self._memory_get(key)
+            if audio is None:
+                entry = self.pinned.get(key)
+                if entry is not None:
+                    return entry[0]
+        if audio is None and self.disk_dir is not None:
+            audio = self._disk_get(key)
+        return audio
+
+    def put(self, text, settings, audio):
+        """
+        Add the audio bytes of text/settings to both tiers
+        """
+        key = make_audio_key(text, settings)
+        with self.lock:
+            self._memory_put(key, audio)
+        if self.disk_dir is not None:
+            self._disk_put(key, audio)
+
+    def get_or_synthesize(self, text, settings, synthesize):
+        """
+        Return the cached audio of text/settings. On a miss, call
+        synthesize(text) to generate the audio, and cache it. If the same
+        audio is already being synthesized by another thread (e.g., by
+        speculative pre-synthesis), wait for it instead.
+        """
+        audio = self.get(text, settings)
+        if audio is not None:
+            return audio
+
+        key = make_audio_key(text, settings)
+        with self.lock:
+            event = self.in_flight.get(key)
+            owner = event is None
+            if owner:
+                event = threading.Event()
+                self.in_flight[key] = event
+
+        if not owner:
+            event.wait()
+            audio = self._peek(key)
+            if audio is not None:
+                return audio
+            # the other synthesis failed or was not cached, do it here
+
+        try:
+            audio = synthesize(text)
+            self.put(text, settings, audio)
+        finally:
+            if owner:
+                with self.lock:
+                    del self.in_flight[key]
+                event.set()
+        return audio
+
+    def clear_memory(self):
+        """
+        Drop the in-memory tier. The on-disk tier is kept.
+        """
+        with self.lock:
+            self.memory.clear()
+            self.memory_bytes = 0
+
+    def stats(self):
+        """
+        Return the cache statistics as a dictionary
+        """
+        with self.lock:
+            lookups = self.memory_hits + self.disk_hits + self.misses
+            hits = self.memory_hits + self.disk_hits
+            return {"memory_entries": len(self.memory),
+                    "memory_bytes": self.memory_bytes,
+                    "pinned_entries": len(self.pinned),
+                    "disk_bytes": self.disk_bytes,
+                    "memory_hits": self.memory_hits,
+                    "disk_hits": self.disk_hits,
+                    "misses": self.misses,
+                    "memory_evictions": self.memory_evictions,
+                    "disk_evictions": self.disk_evictions,
+                    "hit_rate": (hits / lookups) if lookups else 0.0}
+
+# the process-wide cache, created from the configuration on first use
+_shared_cache = None
+_shared_cache_lock = threading.Lock()
+
+def shared_cache():
+    """
+    Return the process-wide audio cache, configured by the [audio_cache]
+    table of jvox_config.toml. Returns None if the cache is disabled.
+    """
+    global _shared_cache
+
+    with _shared_cache_lock:
+        if _shared_cache is None:
+            cache_config = jc.jvox_audio_cache_config()
+            if not cache_config["enabled"]:
+                _shared_cache = False
+            else:
+                disk_dir = jc.jvox_audio_cache_dir(cache_config["disk_dir"])
+                try:
+                    _shared_cache = audio_cache(
+                        cache_config["memory_max_entries"],
+                        cache_config["memory_max_bytes"],
+                        disk_dir,
+                        cache_config["disk_max_bytes"])
+                except OSError:
+                    # can't create the disk store, or it is not private
+                    # (e.g., created by another user), memory only
+                    _shared_cache = audio_cache(
+                        cache_config["memory_max_entries"],
+                        cache_config["memory_max_bytes"])
+
+    if _shared_cache is False:
+        return None
+    return _shared_cache
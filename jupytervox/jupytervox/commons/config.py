@@ -15,6 +15,34 @@ default_config = {
         "ipython": "/tmp/jvox_ipython_{user}.log",
         "general": "/tmp/jvox_general_{user}.log",
         "JupyterLab": "/tmp/jvox_jupyterlab_{user}.log"
+    },
+    "prewarm": {
+        "enabled": True,
+        "max_statements": 0
+    },
+    "audio_cache": {
+        "enabled": True,
+        "memory_max_entries": 512,
+        "memory_max_bytes": 32 * 1024 * 1024,
+        "disk_dir": "{cache_home}/jvox/audio",
+        "disk_max_bytes": 256 * 1024 * 1024
+    },
+    "tts": {
+        "engine": "gtts",
+        "espeak_path": "espeak-ng",
+        "espeak_voice": "en",
+        "espeak_speed": 175,
+        "phrase_clips": False,
+        "phrase_clip_pause_ms": 120
+    },
+    "server": {
+        "parse_workers": 2,
+        "tts_workers": 8,
+        "ai_workers": 4
+    },
+    "speculation": {
+        "enabled": True,
+        "max_queue": 16
     }
 }
 
@@ -114,6 +142,123 @@ def jvox_jupyterlab_log_path():
 
     return _expand_log_path(log_path)
 
+def jvox_prewarm_config():
+    """
+    Return the parser prewarming settings, i.e., the [prewarm] table, with
+    the defaults filled in for missing entries.
+
+    Returns
+    -------
+    dict
+        "enabled": whether to prewarm the parser when a server starts
+        "max_statements": number of corpus statements to use, 0 for all
+    """
+
+    config = jvox_load_config()
+
+    prewarm_config = dict(default_config["prewarm"])
+    prewarm_config.update(config.get("prewarm", {}))
+
+    return prewarm_config
+
+def jvox_audio_cache_config():
+    """
+    Return the synthesized audio cache settings, i.e., the [audio_cache]
+    table, with the defaults filled in for missing entries.
+
+    Returns
+    -------
+    dict
+        "enabled": whether to cache synthesized audio
+        "memory_max_entries", "memory_max_bytes": limits of the in-memory LRU
+        "disk_dir": directory of the on-disk store, "" to disable it;
+        "{cache_home}" is replaced with the user's cache directory and
+        "{user}" with the user name, see jvox_audio_cache_dir
+        "disk_max_bytes": size limit of the on-disk store
+    """
+
+    config = jvox_load_config()
+
+    cache_config = dict(default_config["audio_cache"])
+    cache_config.update(config.get("audio_cache", {}))
+
+    return cache_config
+
+def jvox_audio_cache_dir(disk_dir):
+    """
+    Expand the placeholders of the on-disk audio store directory:
+    "{cache_home}" is $XDG_CACHE_HOME, or ~/.cache if not set, and "{user}"
+    is the current OS username.
+    """
+
+    cache_home = os.environ.get("XDG_CACHE_HOME")
+    if not cache_home:
+        cache_home = os.path.join(os.path.expanduser("~"), ".cache")
+
+    return _expand_log_path(disk_dir.replace("{cache_home}", cache_home))
+
+def jvox_tts_config():
+    """
+    Return the text-to-speech settings, i.e., the [tts] table, with the
+    defaults filled in for missing entries.
+
+    Returns
+    -------
+    dict
+        "engine": the default TTS engine, "gtts", "espeak" or "fake"
+        "espeak_path": the espeak-ng executable
+        "espeak_voice", "espeak_speed": espeak-ng voice and words per minute
+        "phrase_clips": whether token-by-token readings are assembled from
+        cached phrase clips instead of synthesized as whole sentences
+        "phrase_clip_pause_ms": the pause between comma-separated clips
+    """
+
+    config = jvox_load_config()
+
+    tts_config = dict(default_config["tts"])
+    tts_config.update(config.get("tts", {}))
+
+    return tts_config
+
+def jvox_server_config():
+    """
+    Return the server concurrency settings, i.e., the [server] table, with
+    the defaults filled in for missing entries.
+
+    Returns
+    -------
+    dict
+        "parse_workers": threads for parsing and speech generation
+        "tts_workers": threads for text-to-speech synthesis
+        "ai_workers": threads for AI explanation requests
+    """
+
+    config = jvox_load_config()
+
+    server_config = dict(default_config["server"])
+    server_config.update(config.get("server", {}))
+
+    return server_config
+
+def jvox_speculation_config():
+    """
+    Return the speculative pre-synthesis settings, i.e., the [speculation]
+    table, with the defaults filled in for missing entries.
+
+    Returns
+    -------
+    dict
+        "enabled": whether to pre-synthesize the next line/chunk
+        "max_queue": max number of waiting speculation jobs
+    """
+
+    config = jvox_load_config()
+
+    speculation_config = dict(default_config["speculation"])
+    speculation_config.update(config.get("speculation", {}))
+
+    return speculation_config
+
 if __name__ == "__main__":
     # Just call the one you want here
     config = jvox_load_config()
@@ -0,0 +1,52 @@
+#
+# Lazy loading of heavy modules (AI backends, TTS, ANTLR4 parser), to keep
+# the import of JVox packages cheap for kernels and servers that only use
+# part of JVox.
+#
+
+import importlib
+import threading
+
+class lazy_module:
+    """
+    Placeholder of a module that is imported on first attribute access.
+
+    Usage:
+        gtts = lazy_module("gtts")
+        token_navigation = lazy_module(
+            "..parser.token_navigation.token_navigation", __package__)
+
+        tts = gtts.gTTS(speech)  # gtts is actually imported here
+    """
+
+    def __init__(self, name, package=None):
+        """
+        Parameters
+        ----------
+        name: the module name, can be relative if package is given
+
+        package: the anchor package for a relative module name
+        """
+        self._name = name
+        self._package = package
+        self._module = None
+        self._lock = threading.Lock()
+
+    def load(self):
+        """
+        Import (if not yet) and return the actual module
+        """
+        if self._module is None:
+            with self._lock:
+                if self._module is None:
+                    self._module = importlib.import_module(self._name,
+                                                           self._package)
+        return self._module
+
+    def __getattr__(self, attr):
+        # only called for attributes not found on the placeholder itself,
+        # i.e., the attributes of the actual module
+        return getattr(self.load(), attr)
+
+    def __repr__(self):
+        return f"<lazy module '{self._name}'>"
@@ -0,0 +1,251 @@
+#
+# Phrase-clip audio assembly for token-by-token readings.
+#
+# Token-by-token readings, e.g., chunk_to_read ("a-, equals, foo, left
+# paren") or the token fallback of unparsable statements, are built from a
+# closed vocabulary: the words of screenreader.utils.make_token_readable,
+# Python keywords and a few speech phrases. Instead of synthesizing every
+# such sentence as a whole, the speech is split into vocabulary phrases and
+# the runs of other words between them (usually identifiers). Each piece is
+# synthesized once and kept in the audio cache, and the sentence audio is the
+# pieces' audio concatenated at the frame level:
+#   1. WAV (espeak, fake): the PCM frames are joined, with a short silence
+#      for each comma
+#   2. MP3 (gtts): MPEG frames can simply follow each other, only the ID3
+#      tags are stripped
+#
+
+import io
+import keyword
+import wave
+
+# phrases of the mixins and the navigation messages, which are spoken in token
+# readings as well
+_speech_phrases = ["function call", "with argument", "with arguments",
+                   "no arguments", "equals", "end of statement",
+                   "beginning of statement", "start of statement",
+                   "white spaces", "space", "string", "hashtag",
+                   "comment", "the sum of", "the difference of",
+                   "the product of", "dot", "of type", "with annotation",
+                   "negative", "positive"]
+
+# tokens whose readings (from make_token_readable) are in the vocabulary
+_vocabulary_tokens = [".", ",", ":", ";", "=", "+", "-", "/", "%", "*", "**",
+                      "+=", "-=", "*=", "/=", "%=", "**=", "//=", "!=",
+                      "{", "}", "[", "]", "_", "\"", "'", "(", ")", "a"]
+
+# the vocabulary, built on first use: phrase (tuple of words) -> True
+_vocabulary = None
+# number of words of the longest phrase
+_max_phrase_words = 1
+
+def vocabulary():
+    """
+    Return the list of the fixed vocabulary phrases.
+    """
+    _load_vocabulary()
+    return [" ".join(words) for words in _vocabulary]
+
+def _load_vocabulary():
+    global _vocabulary, _max_phrase_words
+
+    if _vocabulary is not None:
+        return
+
+    # imported here, so that importing commons stays cheap
+    from ..screenreader import utils
+
+    phrases = [utils.make_token_readable(token)
+               for token in _vocabulary_tokens]
+    phrases += [utils.make_token_readable(" ", True)]
+    phrases += keyword.kwlist + _speech_phrases
+
+    vocab = {}
+    for phrase in phrases:
+        words = tuple(phrase.split())
+        if words:
+            vocab[words] = True
+
+    _max_phrase_words = max(len(words) for words in vocab)
+    _vocabulary = vocab
+
+def split_speech(speech):
+    """
+    Split a token-by-token speech into the pieces to synthesize.
+
+    Parameters
+    ----------
+    speech: the speech text, e.g., "foo, equals, bar, left paren"
+
+    Returns
+    -------
+    list
+        the pieces in reading order: a str for a phrase to synthesize, or
+        None for a pause (a comma in the speech). Vocabulary phrases are
+        separate pieces; the other words between them are grouped into one
+        piece.
+    """
+    _load_vocabulary()
+
+    pieces = []
+    for segment in speech.split(","):
+        words = segment.split()
+        if not words:
+            continue
+        # a pause between the comma-separated segments
+        if pieces:
+            pieces.append(None)
+
+        other_words = []
+        w = 0
+        while w < len(words):
+            # the longest vocabulary phrase starting at this word
+            match_len = 0
+            for n in range(min(_max_phrase_words, len(words) - w), 0, -1):
+                if tuple(words[w:w + n]) in _vocabulary:
+                    match_len = n
+                    break
+
+            if match_len == 0:
+                other_words.append(words[w])
+                w += 1
+                continue
+
+            if other_words:
+                pieces.append(" ".join(other_words))
+                other_words = []
+            pieces.append(" ".join(words[w:w + match_len]))
+            w += match_len
+
+        if other_words:
+            pieces.append(" ".join(other_words))
+
+    return pieces
+
+def _strip_id3(audio):
+    # ID3v2 header: "ID3", version (2 bytes), flags, syncsafe size (4 bytes)
+    if audio[:3] == b"ID3" and len(audio) >= 10:
+        size = 0
+        for b in audio[6:10]:
+            size = (size << 7) | (b & 0x7F)
+        audio = audio[10 + size:]
+
+    # ID3v1 trailer: the last 128 bytes starting with "TAG"
+    if len(audio) >= 128 and audio[-128:-125] == b"TAG":
+        audio = audio[:-128]
+
+    return audio
+
+def _concat_wav(clips, pause_ms):
+    params = None
+    frames = []
+    for clip in clips:
+        if clip is None:
+            frames.append(None)
+            continue
+
+        with wave.open(io.BytesIO(clip), "rb") as wav:
+            clip_params = (wav.getnchannels(), wav.getsampwidth(),
+                           wav.getframerate())
+            if params is None:
+                params = clip_params
+            elif clip_params != params:
+                raise ValueError("Phrase clips have different WAV formats: "
+                                 f"{params} and {clip_params}")
+            frames.append(wav.readframes(wav.getnframes()))
+
+    if params is None:
+        raise ValueError("No phrase clips to concatenate")
+
+    nchannels, sampwidth, framerate = params
+    # 8-bit WAV is unsigned, silence is 128; wider samples are signed
+    silence_byte = b"\x80" if sampwidth == 1 else b"\x00"
+    pause = silence_byte * (nchannels * sampwidth *
+                            (framerate * pause_ms // 1000))
+
+    wav_fp = io.BytesIO()
+    with wave.open(wav_fp, "wb") as wav:
+        wav.setnchannels(nchannels)
+        wav.setsampwidth(sampwidth)
+        wav.setframerate(framerate)
+        wav.writeframes(b"".join(pause if f is None else f for f in frames))
+
+    return wav_fp.getvalue()
+
+def concat_audio(clips, mime_type, pause_ms=120):
+    """
+    Concatenate audio clips of the same format at the frame level.
+
+    Parameters
+    ----------
+    clips: list of audio bytes, or None for a pause
+
+    mime_type: "audio/wav" or "audio/mpeg"
+
+    pause_ms: length of each pause, in milliseconds. MP3 has no silence frames
+        to insert without an encoder, so pauses are dropped for MP3 (gTTS
+        clips already start and end with a short silence)
+
+    Returns
+    -------
+    bytes
+        the audio of the clips, in order
+    """
+    if mime_type == "audio/wav":
+        return _concat_wav(clips, pause_ms)
+    if mime_type == "audio/mpeg":
+        return b"".join(_strip_id3(clip) for clip in clips if clip is not None)
+
+    raise ValueError(f"Cannot concatenate audio of type {mime_type}")
+
+def assemble(speech, settings, synthesize, cache, mime_type, pause_ms=120):
+    """
+    Generate the audio of a token-by-token speech from phrase clips.
+
+    Parameters
+    ----------
+    speech: the speech text
+
+    settings: voice settings of the TTS engine, part of the cache keys
+
+    synthesize: the TTS function, synthesize(text) returns the audio bytes
+
+    cache: the audio_cache, which keeps the clips
+
+    mime_type: the audio type of the TTS engine
+
+    pause_ms: length of the pause for each comma, in milliseconds
+
+    Returns
+    -------
+    bytes
+        the assembled audio
+    """
+    pieces = split_speech(speech)
+    if not pieces:
+        return synthesize(speech)
+
+    clips = []
+    for piece in pieces:
+        if piece is None:
+            clips.append(None)
+        else:
+            clips.append(cache.get_or_synthesize(piece, settings, synthesize))
+
+    return concat_audio(clips, mime_type, pause_ms)
+
+def prerender(settings, synthesize, cache):
+    """
+    Synthesize the clips of the whole vocabulary into the cache, so that
+    later assemblies only synthesize the identifiers.
+
+    Returns
+    -------
+    int
+        the number of phrases
+    """
+    phrases = vocabulary()
+    for phrase in phrases:
+        cache.get_or_synthesize(phrase, settings, synthesize)
+
+    return len(phrases)
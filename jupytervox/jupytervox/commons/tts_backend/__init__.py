@@ -0,0 +1,54 @@
+import importlib
+
+# the backends are imported on first use, e.g., gtts pulls in requests, which
+# is slow to import
+_backend_modules = {"gtts_interface", "espeak_interface", "fake_interface"}
+
+# engine name -> backend module
+_engine_modules = {"gtts": "gtts_interface",
+                   "espeak": "espeak_interface",
+                   "fake": "fake_interface"}
+
+# the engine set in jvox_config.toml, resolved on first use
+_default_engine = None
+
+def __getattr__(name):
+    if name in _backend_modules:
+        return importlib.import_module(f".{name}", __name__)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def get_tts_interface(engine_name=None):
+    """
+    Return the appropriate text-to-speech backend module based on
+    *engine_name*.
+
+    Parameters
+    ----------
+    engine_name : str or None
+        ``"gtts"`` (Google TTS, needs network access), ``"espeak"`` (local
+        espeak-ng synthesizer) or ``"fake"`` (deterministic audio for tests and
+        benchmarks). None uses the engine set in the [tts] table of
+        jvox_config.toml, which is read once per process.
+
+    Returns
+    -------
+    module
+        A module that exposes at least ``synthesize(text)``, which returns
+        the audio bytes, ``voice_settings()``, which returns the settings that
+        change the audio (used as part of the audio cache key), and
+        ``mime_type``.
+    """
+    global _default_engine
+
+    if not engine_name:
+        if _default_engine is None:
+            from .. import config as jc
+            _default_engine = jc.jvox_tts_config()["engine"]
+        engine_name = _default_engine
+
+    if engine_name not in _engine_modules:
+        raise ValueError(f"Unknown TTS engine: {engine_name}")
+
+    return importlib.import_module(f".{_engine_modules[engine_name]}",
+                                   __name__)
@@ -0,0 +1,51 @@
+#
+# Interface for the local espeak-ng synthesizer. Runs without network access,
+# e.g., in exam rooms, and is much faster than gTTS.
+#
+
+import shutil
+import subprocess
+
+from .. import config as jc
+
+engine_name = "espeak"
+mime_type = "audio/wav"
+
+# loaded from the [tts] table of jvox_config.toml on first use
+espeak_path = None
+voice = None
+speed = None
+
+def load_settings():
+    global espeak_path, voice, speed
+
+    if espeak_path is None:
+        tts_config = jc.jvox_tts_config()
+        espeak_path = tts_config["espeak_path"]
+        voice = tts_config["espeak_voice"]
+        speed = tts_config["espeak_speed"]
+
+def voice_settings():
+    '''
+    The settings that change the audio
+    '''
+    load_settings()
+    return {"engine": engine_name, "voice": voice, "speed": speed}
+
+def synthesize(text):
+    '''
+    Synthesize one text, return the WAV bytes
+    '''
+    load_settings()
+
+    if shutil.which(espeak_path) is None:
+        raise RuntimeError(f"espeak-ng executable not found: {espeak_path}")
+
+    # read the text from stdin, so that texts starting with "-" are not
+    # taken as options
+    result = subprocess.run([espeak_path, "--stdout", "--stdin",
+                             "-v", voice, "-s", str(speed)],
+                            input=text.encode("utf-8"),
+                            capture_output=True, check=True)
+
+    return result.stdout
@@ -0,0 +1,32 @@
+#
+# Interface for Google Text-to-Speech (gTTS), needs network access
+#
+
+import io
+
+from gtts import gTTS
+
+engine_name = "gtts"
+mime_type = "audio/mpeg"
+
+lang = "en"
+tld = "com"
+slow = False
+
+def voice_settings():
+    '''
+    The settings that change the audio
+    '''
+    return {"engine": engine_name, "lang": lang, "tld": tld, "slow": slow}
+
+def synthesize(text):
+    '''
+    Synthesize one text, return the MP3 bytes
+    '''
+    tts = gTTS(text=text, lang=lang, tld=tld, slow=slow)
+
+    # Save to a bytes buffer instead of a file
+    mp3_fp = io.BytesIO()
+    tts.write_to_fp(mp3_fp)
+
+    return mp3_fp.getvalue()
@@ -1 +1 @@
-from .jvox_interface import jvox_interface
\ No newline at end of file
+from .jvox_interface import jvox_interface, get_shared_interface
\ No newline at end of file
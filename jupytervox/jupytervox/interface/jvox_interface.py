@@ -1,18 +1,21 @@
 #!/usr/bin/python3
 
 # system packages
-import traceback
 import types
-import io
+import threading
+
+# lazy loading of the heavy modules, so that importing jvox_interface is
+# cheap. Each module is imported on its first use
+from ..commons.lazy_import import lazy_module
 
-# packages for AST parsing
-import ast
 # packages for Text2Speech and audio manipulation
-from gtts import gTTS
+gtts = lazy_module("gtts")
 
-# import sibling directories
-import sys
-from pathlib import Path
+# text-to-speech backends and the cache of the synthesized audio
+tts_backend = lazy_module("..commons.tts_backend", __package__)
+audio_cache = lazy_module("..commons.audio_cache", __package__)
+phrase_clips = lazy_module("..commons.phrase_clips", __package__)
+jvox_config = lazy_module("..commons.config", __package__)
 
 # from jupytervox.jupytervox import screenreader
 
@@ -22,22 +25,29 @@ from pathlib import Path
 # sys.path.append(f"{BASE_DIR}/../../../ASTVox_Antlr4/src/antlr2pyast/")
 
 # load the Vox parser utilities
-from ..screenreader import utils
+utils = lazy_module("..screenreader.utils", __package__)
 
 # import JVox speech generator
-from ..screenreader import jvox_screenreader
+screenreader = lazy_module("..screenreader.screenreader", __package__)
+speech_styles_module = lazy_module("..screenreader.speech_styles",
+                                   __package__)
 
 # import token/lexeme navigation packages
-from ..parser.token_navigation import token_navigation
-from ..parser.token_navigation import lexeme_navigation as lex_nav
+token_navigation = lazy_module("..parser.token_navigation.token_navigation",
+                               __package__)
+lex_nav = lazy_module("..parser.token_navigation.lexeme_navigation",
+                      __package__)
 
 # import single line parsing checking packages
-from ..parser.debug_support import single_line_check as one_chk
-from ..parser.debug_support import code_snippet_check as snippet_chk
-from ..parser.debug_support.runtime_error_support import entry_point as rt_support
+one_chk = lazy_module("..parser.debug_support.single_line_check", __package__)
+snippet_chk = lazy_module("..parser.debug_support.code_snippet_check",
+                          __package__)
+rt_support = lazy_module(
+    "..parser.debug_support.runtime_error_support.entry_point", __package__)
 
 # import chunked reading packages
-from ..parser.statement_chunking import statement_chunking as stmt_chunk
+stmt_chunk = lazy_module("..parser.statement_chunking.statement_chunking",
+                         __package__)
 
 # from ..commons.ai_backend import gemini_interface as ai_interface
 # from ..commons.ai_backend import llama_cpp_interface as ai_interface
@@ -46,41 +56,170 @@ from ..commons.ai_backend import get_ai_interface
 
 class jvox_interface:
     vox_gen = None;
-    jvox = None;
+    _jvox = None;
     style = "default";
 
     # constructor    
     def __init__(self, style="default"):
-        self.jvox =  jvox_screenreader()
-
-    # generate the speech for one statement
-    def gen_speech_for_one(self, stmt, verbose):
-        speech = self.jvox.generate_for_one(stmt, verbose)
+        self._jvox = None
+        self._jvox_lock = threading.Lock()
+
+        # phrase clip settings of the [tts] table of jvox_config.toml, read
+        # once instead of on every token-by-token reading
+        tts_config = jvox_config.jvox_tts_config()
+        self.use_phrase_clips = tts_config["phrase_clips"]
+        self.phrase_clip_pause_ms = tts_config["phrase_clip_pause_ms"]
+
+    # the jvox_screenreader instance, created on first use, so that
+    # constructing jvox_interface does not load the parser
+    @property
+    def jvox(self):
+        if self._jvox is None:
+            with self._jvox_lock:
+                if self._jvox is None:
+                    self._jvox = screenreader.jvox_screenreader()
+        return self._jvox
+
+    # the style selection of one call: the styles of this instance (i.e., the
+    # ones set with set_speech_style) updated with "speech_styles", e.g.,
+    # {"BinOp": "default"}; None (this instance's styles) if there are no
+    # overrides
+    def make_speech_styles(self, speech_styles):
+        if not speech_styles:
+            return None
+
+        return speech_styles_module.make_speech_styles(
+            speech_styles, self.jvox.vox_gen.speech_styles)
+
+    # generate the speech for one statement. "speech_styles" is an optional
+    # per-call style selection, e.g., {"BinOp": "default"}, which does not
+    # change the styles of this (possibly shared) instance
+    def gen_speech_for_one(self, stmt, verbose, speech_styles=None):
+        speech_styles = self.make_speech_styles(speech_styles)
+        speech = self.jvox.generate_for_one(stmt, verbose, speech_styles)
 
         return speech
 
+    # generate the speech for every line of a cell, parsing the cell once.
+    # Returns the list of speeches, one for each line
+    def gen_speech_for_cell(self, cell, verbose, speech_styles=None):
+        speech_styles = self.make_speech_styles(speech_styles)
+        return self.jvox.generate_for_cell(cell, verbose, speech_styles)
+
+    # generate the speech for many statements with a pool of "workers"
+    # processes (None for one per CPU). Returns the list of speeches, in the
+    # order of "stmts"
+    def gen_speech_for_many(self, stmts, verbose, speech_styles=None,
+                            workers=None):
+        speech_styles = self.make_speech_styles(speech_styles)
+        return self.jvox.generate_many(stmts, workers, verbose, speech_styles)
+
+    # generate the speech for one statement as a stream (generator) of
+    # segments in reading order, e.g., the assignment target first and then
+    # the value, so that the first segment can be synthesized and played
+    # before the audio of the whole statement is ready
+    def gen_speech_segments_for_one(self, stmt, verbose, speech_styles=None):
+        speech_styles = self.make_speech_styles(speech_styles)
+        return self.jvox.generate_stream(stmt, verbose, speech_styles)
+
     # generate the mp3 file
     def gen_mp3_from_speech(self, speech, file_name):
-        tts = gTTS(speech, slow=False)
+        tts = gtts.gTTS(speech, slow=False)
         tts.save(file_name)
         print("jvox created mp3 file at", file_name)
 
         return
 
-    # generate the audio MP3 bytes from Google TTS
+    # generate the audio MP3 bytes from Google TTS, through the audio cache
     def gen_mp3_bytes_from_speech_gtts(self, speech):
-        # Generate speech using gTTS
-        tts = gTTS(text=speech, lang='en')
-        
-        # Save to a bytes buffer instead of a file
-        mp3_fp = io.BytesIO()
-        tts.write_to_fp(mp3_fp)
-        
-        # Seek to the beginning of the buffer to read it
-        mp3_fp.seek(0)
-        mp3_bytes = mp3_fp.read()
+        return self.gen_audio_from_speech(speech, "gtts").audio
+
+    # generate the audio bytes with a TTS engine ("gtts", "espeak" or "fake";
+    # None for the configured default), through the audio cache.
+    # Returns a SimpleNamespace of "audio" (bytes), "mime_type", "engine" and
+    # "key" (content address in the audio cache, None if the cache is off)
+    def gen_audio_from_speech(self, speech, tts_engine=None):
+        tts = tts_backend.get_tts_interface(tts_engine)
+
+        ret_val = types.SimpleNamespace()
+        cache = audio_cache.shared_cache()
+        if cache is None:
+            ret_val.audio = tts.synthesize(speech)
+            ret_val.key = None
+        else:
+            settings = tts.voice_settings()
+            ret_val.audio = cache.get_or_synthesize(speech, settings,
+                                                    tts.synthesize)
+            ret_val.key = audio_cache.make_audio_key(speech, settings)
+
+        ret_val.mime_type = tts.mime_type
+        ret_val.engine = tts.engine_name
+
+        return ret_val
+
+    # generate the audio bytes of a token-by-token reading, e.g., a chunk or
+    # a token. If phrase clips are enabled in the [tts] table of
+    # jvox_config.toml, the audio is assembled from cached clips of the fixed
+    # vocabulary and the synthesized identifiers; otherwise (or without the
+    # audio cache) it is the same as gen_audio_from_speech
+    def gen_audio_from_token_speech(self, speech, tts_engine=None):
+        cache = audio_cache.shared_cache()
+        if not self.use_phrase_clips or cache is None:
+            return self.gen_audio_from_speech(speech, tts_engine)
+
+        tts = tts_backend.get_tts_interface(tts_engine)
+        settings = tts.voice_settings()
+        pause_ms = self.phrase_clip_pause_ms
+        # the assembled audio differs from the whole-sentence audio, so it has
+        # its own cache key
+        assembled_settings = dict(settings, phrase_clips=True,
+                                  pause_ms=pause_ms)
+
+        def assemble(text):
+            return phrase_clips.assemble(text, settings, tts.synthesize, cache,
+                                         tts.mime_type, pause_ms)
+
+        ret_val = types.SimpleNamespace()
+        ret_val.audio = cache.get_or_synthesize(speech, assembled_settings,
+                                                assemble)
+        ret_val.key = audio_cache.make_audio_key(speech, assembled_settings)
+        ret_val.mime_type = tts.mime_type
+        ret_val.engine = tts.engine_name
+
+        return ret_val
+
+    # synthesize the phrase clips of the whole fixed vocabulary into the
+    # audio cache, e.g., at server start. Returns the number of phrases, or 0
+    # if the audio cache is disabled
+    def prerender_phrase_clips(self, tts_engine=None):
+        cache = audio_cache.shared_cache()
+        if cache is None:
+            return 0
+
+        tts = tts_backend.get_tts_interface(tts_engine)
+        return phrase_clips.prerender(tts.voice_settings(), tts.synthesize,
+                                      cache)
+
+    # return the audio bytes previously generated with content address "key",
+    # or None if it is not (or no longer) in the audio cache
+    def get_cached_audio(self, key):
+        cache = audio_cache.shared_cache()
+        if cache is None:
+            return None
+
+        return cache.get_by_key(key)
+
+    # statistics of the audio cache, e.g., hit rate; None if disabled
+    def audio_cache_stats(self):
+        cache = audio_cache.shared_cache()
+        if cache is None:
+            return None
+
+        return cache.stats()
 
-        return mp3_bytes
+    # statistics of the statement speech cache, e.g., hit rate
+    def speech_cache_stats(self):
+        return self.jvox.speech_cache_stats()
 
     # find next token
     def find_next_token_start(self, stmt, cur_pos, verbose):
@@ -121,6 +260,15 @@ class jvox_interface:
                                                     verbose)
         return {"start":prev_token['start'], "stop":prev_token['stop']}
 
+    # get all readable lexemes and tokens of a statement, so that the caller
+    # can navigate through them locally
+    def get_lexeme_token_spans(self, stmt, verbose):
+        spans = lex_nav.get_lexeme_token_spans(stmt)
+        if verbose:
+            print("Readable lexemes and tokens:", spans)
+
+        return spans
+
     # check if a single statement is correct or not
     def single_line_parsing_check(self, stmt, verbose):
         # add a new line to the statement to suppress the "i want newline or ;"
@@ -172,10 +320,6 @@ class jvox_interface:
     # command should be "next", "pre", "current"
     # I think chunk navigation should be merged with token navigation
     def chunkify_statement(self, stmt, cur_pos, command, chunk_len, verbose):
-        # whether to read the space after or inside a chunk.
-        # this is not for leading spaces/indentation, indentation will be read
-        read_space = False
-        
         # prepare return value
         ret_val = types.SimpleNamespace()
         ret_val.error_message = ""
@@ -312,41 +456,67 @@ class jvox_interface:
             # move the cursor behind current chunk as well
             ret_val.new_pos += len(chunks[ret_chunk_idx])
 
+        # return the reading and original string of the chunk
+        ret_val.chunk_string = chunks[ret_chunk_idx]
+        ret_val.chunk_to_read = self.read_chunk(ret_val.chunk_string,
+                                                verbose)
+
+        return ret_val
+
+    # generate the reading of one chunk from chunkify_statement, i.e., its
+    # tokens made readable and joined with commas; a chunk of leading white
+    # spaces is read as their count
+    def read_chunk(self, chunk_string, verbose):
+        # whether to read the space after or inside a chunk.
+        # this is not for leading spaces/indentation, indentation will be read
+        read_space = False
+
         # if current chunk is leading indentation (white spaces)
         # read the white spaces count
-        if len(chunks[ret_chunk_idx].lstrip()) == 0:
-            ret_val.chunk_to_read = f'{len(chunks[ret_chunk_idx])} white spaces.'
-            ret_val.chunk_string = chunks[ret_chunk_idx]
-            return ret_val
+        if len(chunk_string.lstrip()) == 0:
+            return f'{len(chunk_string)} white spaces.'
 
         # current chunk is 
         # make statement readable, we need help from tokenization
         # to generate the reading for each token correctly
-        chunk_string = chunks[ret_chunk_idx]
         tokens = token_navigation.tokenize(chunk_string)
         if verbose:
             print("Tokens of chunk are:",)    
             for t in tokens:
                 print(t)
                 
-        # convert the statement chunk into a list of tokens and spaces
+        # the tokens by start position. The lexer does not always emit tokens
+        # in position order (e.g., NEWLINE/INDENT), and zero-width tokens
+        # have no text to read
+        tokens_at = {}
+        for t in tokens:
+            if t.stop >= t.start and t.start not in tokens_at:
+                tokens_at[t.start] = t
+
+        # convert the statement chunk into a list of tokens and spaces. Every
+        # step moves forward by at least one character
         chunk_items = []
         str_idx = 0
-        token_idx = 0
         while (str_idx < len(chunk_string)):
-            # if current character is space
-            if chunk_string[str_idx] == ' ' :
-                chunk_items.append(chunk_string[str_idx])
+            # if current character is a white space (space, tab, ...), it is
+            # read as a space
+            if chunk_string[str_idx].isspace():
+                chunk_items.append(' ')
                 str_idx += 1
                 continue
-            
+
             # if current character is the start of a token
-            if str_idx == tokens[token_idx].start:
-                chunk_items.append(tokens[token_idx].text)
-                str_idx = tokens[token_idx].stop + 1
-                token_idx += 1
+            t = tokens_at.get(str_idx)
+            if t is not None:
+                chunk_items.append(t.text)
+                str_idx = t.stop + 1
                 continue
 
+            # the character is not part of any token (e.g., a stray
+            # backslash), read it by itself
+            chunk_items.append(chunk_string[str_idx])
+            str_idx += 1
+
         # replace chunk items with readable strings
         for i in range(len(chunk_items)):
             chunk_items[i] = utils.make_token_readable(chunk_items[i],
@@ -356,11 +526,8 @@ class jvox_interface:
             print("Tokens and spaces of chunk are:")
             print(chunk_items)
 
-        # return the reading and original string of the chunk    
-        ret_val.chunk_to_read = ', '.join(chunk_items)
-        ret_val.chunk_string = chunk_string
-
-        return ret_val
+        # return the reading of the chunk
+        return ', '.join(chunk_items)
 
     # --------------------------------------------------------------
     # ai_explain_code: Use an AI model to explain a Python statement
@@ -451,3 +618,21 @@ class jvox_interface:
         print(f"AI Detailed Explanation Response: {response}")
 
         return response
+
+# the process-wide jvox_interface instance, shared by the servers' request
+# handlers so that the screenreader and its caches survive between requests
+_shared_interface = None
+_shared_interface_lock = threading.Lock()
+
+def get_shared_interface():
+    '''
+    Return the process-wide jvox_interface instance, created on first call
+    '''
+    global _shared_interface
+
+    if _shared_interface is None:
+        with _shared_interface_lock:
+            if _shared_interface is None:
+                _shared_interface = jvox_interface("default")
+
+    return _shared_interface
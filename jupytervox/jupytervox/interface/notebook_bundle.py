@@ -0,0 +1,432 @@
+'''
+Command-line generation of the speech bundle of Jupyter notebooks.
+
+Reads .ipynb files and generates, for every code cell, the speech of each
+line (with one parse of the cell, see jvox_screenreader.generate_for_cell),
+the chunk boundaries and chunk readings of each line, the syntax check of
+the cell and, optionally, the audio of the line speeches. The results are
+written to a bundle directory:
+
+  manifest.json   bundle version, settings and the list of notebooks
+  cells.jsonl     one JSON object per code cell, in notebook order
+  audio/          content-addressed audio store, one file per distinct
+                  speech, named by audio_cache.make_audio_key
+
+A cell record looks like:
+  {"notebook": "lab1.ipynb", "cell_index": 3, "cell_id": "...",
+   "hash": "...",
+   "lines": [{"line_no": 1, "speech": "...", "audio": "<key>.mp3",
+              "chunks": [{"start": 0, "stop": 4, "speech": "..."}, ...]},
+             ...],
+   "syntax": {"error_no": 0, "msg": "...", "line_no": 1, "offset": 1}}
+
+Cells are processed by a pool of worker processes (see
+screenreader.batch_generation). Re-running into an existing bundle is
+incremental: cells whose hash (of their source, the bundle and speech
+versions and the chunk length) is already in the bundle are not processed
+again, and audio files already in the store are not synthesized again.
+
+Usage:
+  python -m jupytervox.interface.notebook_bundle -o bundle lab1.ipynb ...
+'''
+
+# system packages
+import argparse
+import concurrent.futures
+import contextlib
+import hashlib
+import io
+import json
+import os
+import sys
+import types
+
+from .jvox_interface import jvox_interface
+from ..commons.tts_backend import get_tts_interface
+from ..commons import audio_cache
+from ..commons import config as jvox_config
+from ..screenreader import batch_generation
+from ..screenreader.screenreader import split_cell_lines
+from ..screenreader.speech_cache import SPEECH_VERSION
+
+# Version of the bundle format. Bump it when the cell records change, so that
+# records of an older version are never reused.
+BUNDLE_VERSION = "1"
+
+# default number of tokens per chunk, as in chunked navigation
+DEFAULT_CHUNK_LEN = 3
+
+# file name extensions of the audio store, by MIME type
+_audio_extensions = {"audio/mpeg": "mp3", "audio/wav": "wav",
+                     "audio/ogg": "ogg"}
+
+# the jvox_interface of a worker process, created by _init_worker
+_worker_jvox = None
+
+def read_code_cells(notebook_path):
+    '''
+    Read the code cells of a notebook.
+
+    Input parameters:
+    1. notebook_path: path of the .ipynb file
+
+    Return: a list of (cell index, cell id, source) of the code cells. The
+    cell index counts all cells of the notebook; the cell id is "" for
+    notebooks older than nbformat 4.5
+    '''
+    with open(notebook_path, "r", encoding="utf-8") as f:
+        notebook = json.load(f)
+
+    cells = []
+    for cell_index, cell in enumerate(notebook.get("cells", [])):
+        if cell.get("cell_type") != "code":
+            continue
+        source = cell.get("source", "")
+        if isinstance(source, list):
+            source = "".join(source)
+        cells.append((cell_index, cell.get("id", ""), source))
+
+    return cells
+
+def cell_hash(source, chunk_len):
+    '''
+    Generate the hash of a cell's record: everything that changes the record
+    except the audio, which is looked up in the audio store on every run
+    '''
+    data = json.dumps([BUNDLE_VERSION, SPEECH_VERSION, chunk_len, source],
+                      ensure_ascii=False)
+    return hashlib.sha256(data.encode("utf-8")).hexdigest()
+
+def line_chunks(jvox, line, chunk_len, verbose):
+    '''
+    Break a line into chunks and read them.
+
+    Return: a list of {"start", "stop", "speech"} of the chunks, in order;
+    "start" and "stop" are column offsets in the line. Empty and comment
+    lines have no chunks
+    '''
+    result = jvox.chunkify_statement(line, 0, "current", chunk_len, verbose)
+
+    chunks = []
+    stop = 0
+    for chunk_string in result.chunks:
+        # the chunks of the token fallback of chunkify_statement leave out
+        # the spaces between tokens, so find each chunk in the line
+        start = line.find(chunk_string, stop)
+        if start < 0:
+            start = stop
+        stop = start + len(chunk_string)
+        chunks.append({"start": start, "stop": stop,
+                       "speech": jvox.read_chunk(chunk_string, verbose)})
+
+    return chunks
+
+def process_cell(jvox, source, chunk_len, verbose=False):
+    '''
+    Generate the line speeches, chunks and syntax check of one code cell.
+
+    Input parameters:
+    1. jvox: the jvox_interface
+    2. source: the code of the cell
+    3. chunk_len: number of tokens per chunk
+    4. verbose: print debugging information; otherwise the output of the
+       parsers is discarded
+
+    Return: the "lines" and "syntax" fields of the cell record, as a dict
+    '''
+    output = sys.stdout if verbose else io.StringIO()
+    with contextlib.redirect_stdout(output):
+        speeches = jvox.gen_speech_for_cell(source, verbose)
+        lines = []
+        for line_no, (line, speech) in enumerate(
+                zip(split_cell_lines(source), speeches), 1):
+            lines.append({"line_no": line_no, "speech": speech, "audio": "",
+                          "chunks": line_chunks(jvox, line, chunk_len,
+                                                verbose)})
+
+        check = jvox.code_snippet_parsing_check(source, verbose)
+
+    return {"lines": lines,
+            "syntax": {"error_no": int(check.error_no), "msg": check.msg,
+                       "line_no": check.line_no, "offset": check.offset}}
+
+def _init_worker():
+    '''
+    Initialize a worker process: create its jvox_interface and prewarm the
+    parser
+    '''
+    global _worker_jvox
+
+    _worker_jvox = jvox_interface("default")
+    batch_generation.prewarm_worker()
+
+def _process_cell_in_worker(source, chunk_len, verbose):
+    '''
+    Process one code cell in a worker process
+    '''
+    return process_cell(_worker_jvox, source, chunk_len, verbose)
+
+def process_cells(sources, chunk_len, workers=None, verbose=False):
+    '''
+    Process code cells with a pool of worker processes.
+
+    Input parameters:
+    1. sources: the code of the cells
+    2. chunk_len: number of tokens per chunk
+    3. workers: number of worker processes; None for one per CPU. With one
+       worker, or with one cell, the cells are processed in this process
+    4. verbose: print debugging information
+
+    Return: the results of process_cell, in the order of "sources"
+    '''
+    if workers is None:
+        workers = os.cpu_count() or 1
+
+    if workers <= 1 or len(sources) <= 1:
+        jvox = jvox_interface("default")
+        return [process_cell(jvox, source, chunk_len, verbose)
+                for source in sources]
+
+    workers = min(workers, len(sources))
+    with concurrent.futures.ProcessPoolExecutor(
+            max_workers=workers, mp_context=batch_generation.pool_context(),
+            initializer=_init_worker) as pool:
+        # map returns the results in the order of the cells
+        return list(pool.map(_process_cell_in_worker, sources,
+                             [chunk_len] * len(sources),
+                             [verbose] * len(sources),
+                             chunksize=max(len(sources) // (workers * 4), 1)))
+
+def load_previous_records(bundle_dir):
+    '''
+    Load the cell records of an existing bundle, keyed by cell hash. Returns
+    an empty dict if there is no bundle (or it is unreadable)
+    '''
+    records = {}
+    try:
+        with open(os.path.join(bundle_dir, "cells.jsonl"), "r",
+                  encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                if "hash" in record:
+                    records[record["hash"]] = record
+    except OSError:
+        pass
+
+    return records
+
+def add_audio(records, bundle_dir, tts_engine=None, workers=None):
+    '''
+    Add the audio of the line speeches to the audio store of the bundle, and
+    set the "audio" field (file name in the store) of the lines. Each distinct
+    speech is synthesized once, and only if its file is not in the store yet.
+
+    Input parameters:
+    1. records: the cell records
+    2. bundle_dir: the bundle directory
+    3. tts_engine: "gtts", "espeak" or "fake"; None for the configured default
+    4. workers: number of synthesis threads; None for the tts_workers of the
+       [server] table of jvox_config.toml
+
+    Return: a SimpleNamespace of "engine", "mime_type", "file_names" (the set
+    of file names referenced by the records) and "synthesized" (number of
+    files synthesized)
+    '''
+    tts = get_tts_interface(tts_engine)
+    settings = tts.voice_settings()
+    extension = _audio_extensions.get(tts.mime_type, "bin")
+    audio_dir = os.path.join(bundle_dir, "audio")
+    os.makedirs(audio_dir, exist_ok=True)
+    if workers is None:
+        workers = jvox_config.jvox_server_config()["tts_workers"]
+
+    file_names = {}
+    for record in records:
+        for line in record["lines"]:
+            if line["speech"] not in file_names:
+                key = audio_cache.make_audio_key(line["speech"], settings)
+                file_names[line["speech"]] = f"{key}.{extension}"
+            line["audio"] = file_names[line["speech"]]
+
+    missing = [(speech, file_name) for speech, file_name in file_names.items()
+               if not os.path.exists(os.path.join(audio_dir, file_name))]
+
+    def synthesize(speech, file_name):
+        audio = tts.synthesize(speech)
+        # write then rename, so that an interrupted run leaves no partial file
+        path = os.path.join(audio_dir, file_name)
+        with open(path + ".tmp", "wb") as f:
+            f.write(audio)
+        os.replace(path + ".tmp", path)
+
+    with concurrent.futures.ThreadPoolExecutor(
+            max_workers=max(workers, 1)) as pool:
+        for future in [pool.submit(synthesize, speech, file_name)
+                       for speech, file_name in missing]:
+            future.result()
+
+    ret_val = types.SimpleNamespace()
+    ret_val.engine = tts.engine_name
+    ret_val.mime_type = tts.mime_type
+    ret_val.file_names = set(file_names.values())
+    ret_val.synthesized = len(missing)
+
+    return ret_val
+
+def remove_unused_audio(bundle_dir, file_names):
+    '''
+    Remove the files of the audio store that are not in "file_names", e.g.,
+    the audio of edited lines. Returns the number of files removed
+    '''
+    audio_dir = os.path.join(bundle_dir, "audio")
+    removed = 0
+    for file_name in os.listdir(audio_dir):
+        if file_name not in file_names:
+            os.remove(os.path.join(audio_dir, file_name))
+            removed += 1
+
+    return removed
+
+def write_bundle(bundle_dir, records, manifest):
+    '''
+    Write the cell records and the manifest of a bundle. Each file is written
+    to a temporary file and renamed, so readers never see a partial bundle
+    file
+    '''
+    os.makedirs(bundle_dir, exist_ok=True)
+
+    path = os.path.join(bundle_dir, "cells.jsonl")
+    with open(path + ".tmp", "w", encoding="utf-8") as f:
+        for record in records:
+            f.write(json.dumps(record, ensure_ascii=False,
+                               separators=(",", ":")))
+            f.write("\n")
+    os.replace(path + ".tmp", path)
+
+    path = os.path.join(bundle_dir, "manifest.json")
+    with open(path + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+    os.replace(path + ".tmp", path)
+
+def build_bundle(notebook_paths, bundle_dir, workers=None,
+                 chunk_len=DEFAULT_CHUNK_LEN, audio=False, tts_engine=None,
+                 tts_workers=None, verbose=False):
+    '''
+    Generate (or update) the bundle of notebooks.
+
+    Input parameters:
+    1. notebook_paths: paths of the .ipynb files
+    2. bundle_dir: the bundle directory; an existing bundle is updated
+       incrementally
+    3. workers: number of worker processes; None for one per CPU
+    4. chunk_len: number of tokens per chunk
+    5. audio: also generate the audio of the line speeches
+    6. tts_engine: "gtts", "espeak" or "fake"; None for the configured default
+    7. tts_workers: number of synthesis threads; None for the configured
+       default
+    8. verbose: print debugging information
+
+    Return: a dict of statistics, i.e., the numbers of notebooks, cells,
+    reused cells, lines and synthesized/removed audio files
+    '''
+    previous = load_previous_records(bundle_dir)
+
+    # collect the code cells, and find the ones to process
+    records = []
+    notebooks = []
+    to_process = {} # hash -> source, each distinct cell processed once
+    for notebook_path in notebook_paths:
+        cells = read_code_cells(notebook_path)
+        notebooks.append({"path": notebook_path, "code_cells": len(cells)})
+        for cell_index, cell_id, source in cells:
+            record_hash = cell_hash(source, chunk_len)
+            records.append({"notebook": notebook_path,
+                            "cell_index": cell_index, "cell_id": cell_id,
+                            "hash": record_hash})
+            if record_hash not in previous:
+                to_process[record_hash] = source
+
+    results = dict(zip(to_process.keys(),
+                       process_cells(list(to_process.values()), chunk_len,
+                                     workers, verbose)))
+
+    for record in records:
+        result = results.get(record["hash"]) or previous[record["hash"]]
+        record["lines"] = [dict(line, audio="") for line in result["lines"]]
+        record["syntax"] = result["syntax"]
+
+    manifest = {"format": "jvox-notebook-bundle",
+                "version": BUNDLE_VERSION,
+                "speech_version": SPEECH_VERSION,
+                "chunk_len": chunk_len,
+                "notebooks": notebooks,
+                "cells": len(records),
+                "tts_engine": None,
+                "audio_type": None}
+    stats = {"notebooks": len(notebooks), "cells": len(records),
+             "reused": sum(1 for record in records
+                           if record["hash"] not in results),
+             "lines": sum(len(record["lines"]) for record in records),
+             "synthesized": 0, "removed": 0}
+
+    if audio:
+        audio_result = add_audio(records, bundle_dir, tts_engine, tts_workers)
+        manifest["tts_engine"] = audio_result.engine
+        manifest["audio_type"] = audio_result.mime_type
+        stats["synthesized"] = audio_result.synthesized
+        stats["removed"] = remove_unused_audio(bundle_dir,
+                                               audio_result.file_names)
+
+    write_bundle(bundle_dir, records, manifest)
+
+    return stats
+
+def main(argv=None):
+    '''
+    Command-line entry point
+    '''
+    parser = argparse.ArgumentParser(
+        description='Generate the speech bundle (line speeches, chunks, '
+        'syntax checks and audio) of Jupyter notebooks')
+    parser.add_argument('notebooks', nargs='+', help='.ipynb files')
+    parser.add_argument('-o', '--output', dest='output', required=True,
+                        help='bundle directory; an existing bundle is '
+                        'updated, skipping unchanged cells')
+    parser.add_argument('-j', '--jobs', dest='jobs', type=int, default=0,
+                        help='number of worker processes (default 0, one '
+                        'per CPU)')
+    parser.add_argument('--chunk-len', dest='chunk_len', type=int,
+                        default=DEFAULT_CHUNK_LEN,
+                        help=f'number of tokens per chunk (default '
+                        f'{DEFAULT_CHUNK_LEN})')
+    parser.add_argument('--audio', dest='audio', action='store_true',
+                        help='also generate the audio of the line speeches')
+    parser.add_argument('--tts-engine', dest='tts_engine', default=None,
+                        help='gtts, espeak or fake (default: the engine of '
+                        'jvox_config.toml)')
+    parser.add_argument('--tts-workers', dest='tts_workers', type=int,
+                        default=None, help='number of synthesis threads '
+                        '(default: tts_workers of jvox_config.toml)')
+    parser.add_argument('-v', '--verbose', dest='verbose',
+                        action='store_true', help='verbose output')
+    args = parser.parse_args(argv)
+
+    stats = build_bundle(args.notebooks, args.output,
+                         workers=(args.jobs if args.jobs > 0 else None),
+                         chunk_len=args.chunk_len, audio=args.audio,
+                         tts_engine=args.tts_engine,
+                         tts_workers=args.tts_workers, verbose=args.verbose)
+
+    print(f"{stats['notebooks']} notebooks, {stats['cells']} code cells "
+          f"({stats['reused']} unchanged), {stats['lines']} lines")
+    if args.audio:
+        print(f"{stats['synthesized']} audio files synthesized, "
+              f"{stats['removed']} unused removed")
+
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1 +1,7 @@
-from .converter import antlr2pyast
\ No newline at end of file
+# antlr2pyast pulls in the ANTLR4 runtime and the generated Python3Parser.
+# It is imported on first access, e.g., "from ..parser import antlr2pyast"
+def __getattr__(name):
+    if name == "antlr2pyast":
+        from .converter import antlr2pyast
+        return antlr2pyast
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
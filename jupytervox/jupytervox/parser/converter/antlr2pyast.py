@@ -1,5 +1,10 @@
+# system packages
+import threading
+
 # antlr4 packages
 import antlr4
+from antlr4.error.Errors import ParseCancellationException
+from antlr4.atn.PredictionMode import PredictionMode
 from ..antlr_parser.Python3Lexer import Python3Lexer
 from ..antlr_parser.Python3Parser import Python3Parser
 
@@ -9,23 +14,69 @@ import ast
 # node/rule-specific translation functions
 from .antlr2pyast_listener import antlr2pyast_listener
 from .antlr2pyast_listener import antlr2pyast_error_listener
+from .antlr2pyast_listener import antlr2pyast_sll_error_listener
+
+# process-wide cache of parsing/conversion results
+from . import parse_cache
+
+# thread-local pool of lexer/parser instances
+from . import parser_pool
+
+# Two-stage parsing: first try the faster SLL prediction mode, which gives up
+# on the first real error; then fall back to the full LL prediction mode only
+# if SLL fails. Set to False to always use full LL.
+two_stage_parsing = True
+
+# counters for the two-stage parsing
+prediction_stats = {"sll_success": 0, "ll_fallback": 0}
+prediction_stats_lock = threading.Lock()
+
+def count_prediction(name):
+  with prediction_stats_lock:
+    prediction_stats[name] += 1
+
+# return the counters of the two-stage parsing, including the fallback rate
+def get_prediction_stats():
+  with prediction_stats_lock:
+    stats = dict(prediction_stats)
+  total = stats["sll_success"] + stats["ll_fallback"]
+  stats["fallback_rate"] = (stats["ll_fallback"] / total) if total else 0.0
+  return stats
 
 # generate the AST tree
 def generate_ast_tree(stmt):
-  # create the parser instance
-  input_stream = antlr4.InputStream(stmt)
-  lexer = Python3Lexer(input_stream)
-  stream = antlr4.CommonTokenStream(lexer)
-  parser = Python3Parser(stream)
-
-  # replace the default console printing error handler with our
-  # custom error listener
+  # custom error listener to replace the default console printing error
+  # handler, used for full LL parsing
   error_listener = antlr2pyast_error_listener()
-  error_listener.disable_builtin_console_output(parser)
-  parser.addErrorListener(error_listener)
-  
-  # start parsing
-  tree = parser.single_input()
+
+  if not two_stage_parsing:
+    # take a parser instance from the pool, and start parsing
+    with parser_pool.pooled_parser(stmt, [error_listener]) as parser:
+      tree = parser.single_input()
+    return tree
+
+  # stage 1: SLL prediction. The error listener bails out on any error other
+  # than the early EOF of partial statements
+  sll_error_listener = antlr2pyast_sll_error_listener()
+  with parser_pool.pooled_parser(stmt, [sll_error_listener]) as parser:
+    parser._interp.predictionMode = PredictionMode.SLL
+    try:
+      tree = parser.single_input()
+      count_prediction("sll_success")
+      return tree
+    except ParseCancellationException:
+      # SLL failed, could be a real syntax error, or a statement that SLL
+      # cannot predict correctly. Retry with full LL.
+      count_prediction("ll_fallback")
+
+    # stage 2: full LL prediction. Resetting the parser rewinds the token
+    # stream, so the tokens lexed in stage 1 are reused instead of lexing the
+    # statement again
+    parser.reset()
+    parser.removeErrorListeners()
+    parser.addErrorListener(error_listener)
+    parser._interp.predictionMode = PredictionMode.LL
+    tree = parser.single_input()
 
   return tree
 
@@ -45,11 +96,76 @@ def convert_tree(tree):
 
     return pyast_tree, converter
 
-def tokenize_stmt(stmt):
-    input_stream = antlr4.InputStream(stmt)
-    lexer = Python3Lexer(input_stream)
+# generate_and_convert_tree: parse and convert a statement in one call
+# Returns the ANTLR4 tree, the Python AST tree and the converter listener.
+# Results are kept in the process-wide parse cache, so repeated requests on the
+# same statement (e.g., navigating within one line) are parsed only once.
+def generate_and_convert_tree(stmt, use_cache=True):
+    if use_cache:
+        result = parse_cache.shared_cache.get(stmt)
+        if result is not None:
+            return result
+
+    tree = generate_ast_tree(stmt)
+    pyast_tree, converter = convert_tree(tree)
+    result = (tree, pyast_tree, converter)
+
+    if use_cache:
+        parse_cache.shared_cache.put(stmt, result)
+
+    return result
+
+# return the statistics of the process-wide parse cache
+def parse_cache_stats():
+    return parse_cache.shared_cache.stats()
 
-    tokens = lexer.getAllTokens()
+# PyAST node types that the converter generates. A tree from Python's own
+# ast.parse that only has these node types is the same tree as the one from
+# the converter. (String atoms are converted with ast.parse by the converter,
+# hence JoinedStr/FormattedValue.)
+converter_node_types = frozenset([
+  # statements and module
+  ast.Module, ast.Expr, ast.Assign, ast.AugAssign, ast.If, ast.For,
+  ast.While, ast.FunctionDef, ast.ClassDef, ast.Return, ast.Raise,
+  ast.Break, ast.Continue, ast.Import, ast.ImportFrom,
+  # expressions
+  ast.BoolOp, ast.BinOp, ast.UnaryOp, ast.Compare, ast.IfExp, ast.Call,
+  ast.Await, ast.Attribute, ast.Subscript, ast.Slice, ast.Starred, ast.Name,
+  ast.Constant, ast.JoinedStr, ast.FormattedValue, ast.List, ast.Tuple,
+  ast.Set, ast.Dict, ast.ListComp, ast.SetComp, ast.DictComp,
+  ast.GeneratorExp,
+  # contexts
+  ast.Load, ast.Store,
+  # operators
+  ast.And, ast.Or, ast.Add, ast.Sub, ast.Mult, ast.MatMult, ast.Div,
+  ast.Mod, ast.Pow, ast.LShift, ast.RShift, ast.BitOr, ast.BitXor,
+  ast.BitAnd, ast.FloorDiv, ast.Invert, ast.Not, ast.UAdd, ast.USub,
+  ast.Eq, ast.NotEq, ast.Lt, ast.LtE, ast.Gt, ast.GtE, ast.Is, ast.IsNot,
+  ast.In, ast.NotIn,
+  # misc
+  ast.alias, ast.arg, ast.arguments, ast.comprehension, ast.keyword,
+])
+
+# parse_with_pyast: fast path for complete statements.
+# Parse "stmt" with Python's C-implemented ast.parse. Returns the PyAST tree if
+# the statement is complete and the tree only has node types generated by the
+# converter; otherwise returns None, and the caller should parse the statement
+# with ANTLR4 (e.g., partial statement "if a > b:", or lambdas).
+def parse_with_pyast(stmt):
+    try:
+        tree = ast.parse(stmt)
+    except (SyntaxError, ValueError):
+        return None
+
+    for node in ast.walk(tree):
+        if type(node) not in converter_node_types:
+            return None
+
+    return tree
+
+def tokenize_stmt(stmt):
+    with parser_pool.pooled_lexer(stmt) as lexer:
+        tokens = lexer.getAllTokens()
 
     token_strings = [token.text for token in tokens]
 
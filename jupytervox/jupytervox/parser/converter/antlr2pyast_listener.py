@@ -265,6 +265,22 @@ class antlr2pyast_error_listener(ErrorListener.ErrorListener):
                 parser._listeners.remove(l)
                 break
 
+# error listener for the first (SLL) stage of the two-stage parsing.
+# Early EOF errors from matching tokens (i.e., partial statements, or the
+# missing trailing NEWLINE) are tolerated, since full LL parsing would report
+# and recover from them in the same way. All other errors, including failed
+# predictions at EOF, cancel the SLL parsing, so that it is retried with full
+# LL prediction.
+class antlr2pyast_sll_error_listener(ErrorListener.ErrorListener):
+
+    def syntaxError(self, recognizer, offendingSymbol, line, column, msg, e):
+        if (offendingSymbol.type == -1 and
+            not isinstance(e, antlr4.error.Errors.NoViableAltException)):
+            # -1 is EOF, statement terminates early.
+            pass
+        else:
+            raise antlr4.error.Errors.ParseCancellationException(msg)
+
   # ignore other errors for now
   # def reportAmbiguity(self, recognizer, dfa, startIndex, stopIndex, exact,
   #                     ambigAlts, configs):
@@ -0,0 +1,52 @@
+'''
+Lexer ATN simulator that caches the DFA start states of Python3Lexer.
+
+The NEWLINE rule of the Python3 grammar has the semantic predicate
+"atStartOfInput()". Because of this predicate, ANTLR4's LexerATNSimulator
+never caches the DFA start state (dfa.s0), and recomputes the start state
+closure over every lexer rule for every single token. This is where most of
+the lexing time goes, and no amount of DFA warming helps.
+
+However, the predicate only depends on whether the token starts at character
+index 0. Therefore, the start state is cached per (mode, at start of input),
+which makes the lexer DFA effectively cacheable again.
+'''
+
+# antlr4 packages
+from antlr4.atn.LexerATNSimulator import LexerATNSimulator
+
+class start_state_caching_lexer_atn_simulator(LexerATNSimulator):
+    '''
+    LexerATNSimulator that caches the start states whose closure has semantic
+    predicates. Only use it with Python3Lexer, whose only predicate is
+    "atStartOfInput()".
+    '''
+
+    # cached DFA start states, keyed by (mode, at start of input). Shared by
+    # all Python3Lexer instances, like the DFAs themselves
+    start_states = {}
+
+    def matchATN(self, input):
+        key = (self.mode, input.index == 0)
+        ds0 = self.start_states.get(key)
+        if ds0 is None:
+            start_state = self.atn.modeToStartState[self.mode]
+            s0_closure = self.computeStartState(input, start_state)
+            has_predicates = s0_closure.hasSemanticContext
+            s0_closure.hasSemanticContext = False
+            ds0 = self.addDFAState(s0_closure)
+            if has_predicates:
+                self.start_states[key] = ds0
+            else:
+                # no predicates, the default caching works
+                self.decisionToDFA[self.mode].s0 = ds0
+
+        return self.execATN(input, ds0)
+
+def install(lexer):
+    '''
+    Replace the ATN simulator of a newly created Python3Lexer with
+    start_state_caching_lexer_atn_simulator
+    '''
+    lexer._interp = start_state_caching_lexer_atn_simulator(
+        lexer, lexer.atn, lexer.decisionsToDFA, lexer._interp.sharedContextCache)
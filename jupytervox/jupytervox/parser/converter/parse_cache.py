@@ -0,0 +1,119 @@
+'''
+Process-wide cache of parsing/conversion results.
+
+Token/lexeme navigation, chunked reading and the screen reader all parse the
+same statement over and over, e.g., when a user presses "next chunk" several
+times on the same line. This module keeps a size-bounded LRU cache of the
+ANTLR4 tree and the converted PyAST tree for each statement, so that only the
+first request on a line pays for parsing.
+
+Note that the cached trees are shared by all callers. Callers may add speech
+fields to the trees (e.g., jvox_speech), but should not change the structure
+of the trees.
+'''
+
+# system packages
+import collections
+import hashlib
+import threading
+
+# antlr4 packages
+from ..antlr_parser.Python3Parser import serializedATN
+
+# Version of the grammar that generated the cached trees. Computed from the
+# serialized ATN, so that a regenerated parser never reuses stale trees.
+GRAMMAR_VERSION = hashlib.sha1(str(serializedATN()).encode()).hexdigest()[:12]
+
+# default maximum number of statements kept in the cache
+DEFAULT_MAX_SIZE = 256
+
+class parse_result_cache:
+    '''
+    Size-bounded LRU cache of parse results keyed by (grammar version,
+    statement text). Each entry is a tuple of (ANTLR4 tree, PyAST tree,
+    converter listener).
+
+    Hit/miss/eviction counters are kept to evaluate the cache's effectiveness.
+    All operations are protected by a lock, so one instance can be shared by
+    all threads of a process.
+    '''
+
+    def __init__(self, max_size=DEFAULT_MAX_SIZE):
+        self.max_size = max_size
+        self.entries = collections.OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def make_key(self, stmt):
+        '''
+        Generate the cache key for a statement
+        '''
+        return (GRAMMAR_VERSION, stmt)
+
+    def get(self, stmt):
+        '''
+        Return the cached parse result of "stmt", or None if not cached.
+        '''
+        key = self.make_key(stmt)
+        with self.lock:
+            result = self.entries.get(key)
+            if result is None:
+                self.misses += 1
+                return None
+
+            # hit, mark as most recently used
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return result
+
+    def put(self, stmt, result):
+        '''
+        Add the parse result of "stmt" to the cache, evicting the least
+        recently used entries if the cache is full.
+        '''
+        if self.max_size <= 0:
+            return
+
+        key = self.make_key(stmt)
+        with self.lock:
+            self.entries[key] = result
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        '''
+        Drop all cached entries. Counters are kept.
+        '''
+        with self.lock:
+            self.entries.clear()
+
+    def resize(self, max_size):
+        '''
+        Change the maximum number of cached statements
+        '''
+        with self.lock:
+            self.max_size = max_size
+            while len(self.entries) > max(self.max_size, 0):
+                self.entries.popitem(last=False)
+                self.evictions += 1
+
+    def stats(self):
+        '''
+        Return the cache statistics as a dictionary
+        '''
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {"size": len(self.entries),
+                    "max_size": self.max_size,
+                    "hits": self.hits,
+                    "misses": self.misses,
+                    "evictions": self.evictions,
+                    "hit_rate": (self.hits / lookups) if lookups else 0.0,
+                    "grammar_version": GRAMMAR_VERSION}
+
+# the process-wide cache instance
+shared_cache = parse_result_cache()
@@ -0,0 +1,120 @@
+'''
+Thread-local pool of ANTLR4 lexer/parser instances.
+
+Creating a Python3Lexer/Python3Parser sets up a new ATN simulator every time.
+Instead of constructing them for every statement, this module keeps warmed
+instances per thread, and resets and re-feeds them with the new input.
+
+Usage:
+    with parser_pool.pooled_lexer(stmt) as lexer:
+        tokens = lexer.getAllTokens()
+
+    with parser_pool.pooled_parser(stmt, [error_listener]) as parser:
+        tree = parser.single_input()
+'''
+
+# system packages
+import contextlib
+import threading
+
+# antlr4 packages
+import antlr4
+from antlr4.error.ErrorStrategy import DefaultErrorStrategy
+from antlr4.atn.PredictionMode import PredictionMode
+from ..antlr_parser.Python3Lexer import Python3Lexer
+from ..antlr_parser.Python3Parser import Python3Parser
+from . import lexer_simulator
+
+# per-thread free lists of lexers and parsers
+_local = threading.local()
+
+def _free_list(name):
+    '''
+    Return the free list "name" of the current thread
+    '''
+    free_list = getattr(_local, name, None)
+    if free_list is None:
+        free_list = []
+        setattr(_local, name, free_list)
+
+    return free_list
+
+def _acquire_lexer(stmt):
+    '''
+    Take a lexer from the pool (or create one) and feed it with "stmt"
+    '''
+    free_lexers = _free_list("lexers")
+    input_stream = antlr4.InputStream(stmt)
+    if len(free_lexers) > 0:
+        lexer = free_lexers.pop()
+        # setting the input stream also resets the lexer, including the
+        # INDENT/DEDENT states in Python3LexerBase
+        lexer.inputStream = input_stream
+    else:
+        lexer = Python3Lexer(input_stream)
+        # cache the lexer's DFA start states, see lexer_simulator
+        lexer_simulator.install(lexer)
+
+    return lexer
+
+def _acquire_parser(lexer):
+    '''
+    Take a parser from the pool (or create one) and connect it to "lexer"
+    '''
+    free_parsers = _free_list("parsers")
+    if len(free_parsers) > 0:
+        parser = free_parsers.pop()
+        token_stream = parser.getTokenStream()
+        token_stream.setTokenSource(lexer)
+        # setting the token stream resets the parser
+        parser.setTokenStream(token_stream)
+    else:
+        parser = Python3Parser(antlr4.CommonTokenStream(lexer))
+
+    # restore the default settings in case the last user changed them
+    parser._errHandler = DefaultErrorStrategy()
+    parser._interp.predictionMode = PredictionMode.LL
+    parser.buildParseTrees = True
+
+    return parser
+
+@contextlib.contextmanager
+def pooled_lexer(stmt):
+    '''
+    Context manager that provides a pooled Python3Lexer fed with "stmt".
+    The lexer goes back to the pool when the "with" block exits, so do not
+    keep a reference to it afterwards. Tokens created by the lexer stay valid.
+    '''
+    lexer = _acquire_lexer(stmt)
+    try:
+        yield lexer
+    finally:
+        _free_list("lexers").append(lexer)
+
+@contextlib.contextmanager
+def pooled_parser(stmt, error_listeners=None):
+    '''
+    Context manager that provides a pooled Python3Parser fed with "stmt".
+
+    Input parameters:
+    1. stmt: the statement to parse
+    2. error_listeners: the error listeners for the parser. They replace all
+       existing error listeners (including ANTLR4's console listener)
+
+    The parser (and its lexer) goes back to the pool when the "with" block
+    exits. Parse trees created by the parser stay valid.
+    '''
+    lexer = _acquire_lexer(stmt)
+    parser = _acquire_parser(lexer)
+
+    parser.removeErrorListeners()
+    for listener in (error_listeners or []):
+        parser.addErrorListener(listener)
+
+    try:
+        yield parser
+    finally:
+        # drop the listeners so that they are not kept alive by the pool
+        parser.removeErrorListeners()
+        _free_list("parsers").append(parser)
+        _free_list("lexers").append(lexer)
@@ -0,0 +1,187 @@
+'''
+Prewarming of the ANTLR4 lexer/parser DFAs.
+
+The Python ANTLR4 runtime builds its DFA caches lazily, so the first
+statements parsed after a server restart are much slower than the steady
+state. This module parses a bundled corpus of statements (built from the test
+cases in test/parser) to fill the DFA caches, usually in a background thread
+started when a server loads.
+
+Usage:
+    prewarm.start_prewarm_thread(log=server_app.log.info)
+
+To rebuild the bundled corpus:
+    python -m jupytervox.parser.converter.prewarm --build path/to/test/parser
+'''
+
+# system packages
+import argparse
+import glob
+import os
+import threading
+import time
+import types
+
+# the parser
+from . import antlr2pyast
+from . import parser_pool
+
+# the bundled corpus, one statement per line. Newlines and tabs inside a
+# statement are escaped as "\n" and "\t", same as unit_test_cases.txt
+corpus_path = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                           "prewarm_corpus.txt")
+
+def unescape_stmt(line):
+    '''
+    Replace the escaped "\\n" and "\\t" in a corpus line with the actual
+    newline and tab
+    '''
+    return line.replace("\\n", "\n").replace("\\t", "\t")
+
+def load_corpus(path=None, max_statements=0):
+    '''
+    Load the prewarming corpus.
+
+    Input parameters:
+    1. path: the corpus file, default to the bundled corpus
+    2. max_statements: only load the first "max_statements" statements;
+       0 means all statements
+
+    Return: the list of statements
+    '''
+    if path is None:
+        path = corpus_path
+
+    stmts = []
+    with open(path, "r") as f:
+        for line in f:
+            line = line.rstrip("\n")
+            if line.strip() == "":
+                continue
+            stmts.append(unescape_stmt(line))
+            if max_statements > 0 and len(stmts) >= max_statements:
+                break
+
+    return stmts
+
+def prewarm(stmts=None, log=None):
+    '''
+    Parse and convert each statement to fill the DFA caches. Results are not
+    added to the parse cache. Parsing errors are ignored.
+
+    Input parameters:
+    1. stmts: the statements to parse, default to the bundled corpus
+    2. log: function to report the prewarming results, e.g., print
+
+    Return: a SimpleNamespace with fields:
+    1. statements: number of statements parsed
+    2. seconds: total prewarming time
+    3. first_ms: time to parse the first (cold) statement, in milliseconds
+    4. last_ms: average time to parse the last 10% (warm) statements, in
+       milliseconds
+    '''
+    if stmts is None:
+        stmts = load_corpus()
+
+    times = []
+    start = time.perf_counter()
+    for stmt in stmts:
+        stmt_start = time.perf_counter()
+        try:
+            antlr2pyast.generate_and_convert_tree(stmt, use_cache=False)
+        except Exception:
+            # partial statements that can't be converted still warm the DFA
+            pass
+        times.append(time.perf_counter() - stmt_start)
+
+    ret_val = types.SimpleNamespace()
+    ret_val.statements = len(stmts)
+    ret_val.seconds = time.perf_counter() - start
+    ret_val.first_ms = times[0] * 1000 if times else 0.0
+    last = times[-max(len(times) // 10, 1):]
+    ret_val.last_ms = sum(last) / len(last) * 1000 if times else 0.0
+
+    if log is not None:
+        log(f"JVox parser prewarmed with {ret_val.statements} statements in "
+            f"{ret_val.seconds:.2f} s (first statement {ret_val.first_ms:.1f}"
+            f" ms, last statements {ret_val.last_ms:.1f} ms on average)")
+
+    return ret_val
+
+def start_prewarm_thread(max_statements=0, log=None):
+    '''
+    Prewarm with the bundled corpus in a background (daemon) thread.
+
+    Input parameters:
+    1. max_statements: only use the first "max_statements" statements of the
+       corpus; 0 means all statements
+    2. log: function to report the prewarming results, e.g., print
+
+    Return: the started thread
+    '''
+    def run():
+        try:
+            prewarm(load_corpus(max_statements=max_statements), log)
+        except Exception as e:
+            if log is not None:
+                log(f"JVox parser prewarming failed: {e}")
+
+    thread = threading.Thread(target=run, name="jvox-prewarm", daemon=True)
+    thread.start()
+
+    return thread
+
+def build_corpus(source_files):
+    '''
+    Build the corpus from test case files. Statements with the same token
+    type sequence go through the same parser DFA paths, so only the first one
+    of them is kept. Statements with syntax errors are dropped, so that
+    prewarming does not print error messages.
+
+    Input parameters:
+    1. source_files: the test case files, one statement per line
+
+    Return: the list of corpus lines (escaped)
+    '''
+    corpus = []
+    seen_shapes = set()
+    for file_name in source_files:
+        with open(file_name, "r") as f:
+            for line in f:
+                line = line.strip()
+                if line == "" or line.startswith("#"):
+                    continue
+
+                stmt = unescape_stmt(line)
+                with parser_pool.pooled_lexer(stmt) as lexer:
+                    shape = tuple(token.type for token in lexer.getAllTokens())
+                if shape in seen_shapes:
+                    continue
+
+                try:
+                    antlr2pyast.generate_ast_tree(stmt)
+                except Exception:
+                    continue
+
+                seen_shapes.add(shape)
+                corpus.append(stmt.replace("\n", "\\n").replace("\t", "\\t"))
+
+    return corpus
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='JVox parser prewarming')
+    parser.add_argument('-b', '--build', metavar='TEST_DIR', dest='test_dir',
+                        help=('rebuild the bundled corpus from the test '
+                              'cases in TEST_DIR (i.e., test/parser)'))
+    args = parser.parse_args()
+
+    if args.test_dir is not None:
+        source_files = sorted(glob.glob(os.path.join(args.test_dir,
+                                                     "test_cases", "*")))
+        source_files.append(os.path.join(args.test_dir, "unit_test_cases.txt"))
+        corpus = build_corpus(source_files)
+        with open(corpus_path, "w") as f:
+            f.write("\n".join(corpus) + "\n")
+        print(f"Wrote {len(corpus)} statements to {corpus_path}")
+    else:
+        prewarm(log=print)
@@ -15,6 +15,7 @@ from ....parser.antlr_parser.Python3Parser import Python3Parser
 # AST tree generation/conversion packages
 from ....parser.converter import antlr2pyast
 from ....parser.converter import tools
+from ....parser.converter import parser_pool
 import ast
 
 # import sibling packages
@@ -63,9 +64,8 @@ def get_operand_type_error_column(error_msg, code, line_no, verbose=True):
     error_line = code.split('\n')[line_no-1]
     
     # tokenize the string
-    input_stream = antlr4.InputStream(error_line)
-    lexer = Python3Lexer(input_stream)
-    tokens = lexer.getAllTokens()
+    with parser_pool.pooled_lexer(error_line) as lexer:
+        tokens = lexer.getAllTokens()
 
     # iterate over the tokens to find the name
     founds = []
@@ -14,6 +14,7 @@ from ..antlr_parser.Python3Parser import Python3Parser
 # AST tree generation/conversion packages
 from ..converter import antlr2pyast
 from ..converter import tools
+from ..converter import parser_pool
 import ast
 
 # Error listener support for ANTLR4
@@ -186,23 +187,14 @@ def is_correct_partial_statement(stmt, syntax_error, verbose=True):
     if not stmt.endswith('\n'):
         stmt += '\n'
 
-    # create the ANTLR4 parser class
-    input_stream = antlr4.InputStream(stmt)
-    lexer = Python3Lexer(input_stream)
-    stream = antlr4.CommonTokenStream(lexer)
-    parser = Python3Parser(stream)
-
-    # supress the console error reporting, necessary?
-    # for l in parser._listeners: 
-    #     if isinstance(l, antlr4.error.ErrorListener.ConsoleErrorListener):
-    #         parser._listeners.remove(l)
-    #         break
-
+    # take an ANTLR4 parser from the pool, keep the console error reporting and
     # add JVox error listener
-    parser.addErrorListener(JVox_Single_Line_Error_Listener(verbose))
+    error_listeners = [ErrorListener.ConsoleErrorListener.INSTANCE,
+                       JVox_Single_Line_Error_Listener(verbose)]
 
     try:
-        tree = parser.single_input()
+        with parser_pool.pooled_parser(stmt, error_listeners) as parser:
+            tree = parser.single_input()
     except JVoxIncompleteSyntaxError as e:
         # Incomplete statement, but parse correctly so far. But we Need to first
         # check if this statement is really correct or not using the
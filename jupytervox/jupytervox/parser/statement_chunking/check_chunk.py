@@ -2,6 +2,7 @@
 Code for checking if a chunk is readable. 
 '''
 # import system packages
+import array
 import ast
 
 # antlr4 packages
@@ -185,4 +186,52 @@ def all_tokens_in_node(node):
          token_count += all_tokens_in_node(node.getChild(i))
 
    return token_count
-    
\ No newline at end of file
+    
+
+class subtree_token_counts:
+   '''
+   Token counts of all subtrees of an ANTLR4 tree, computed once in a single
+   post-order pass, instead of recounting a subtree (all_tokens_in_node) every
+   time a node is checked.
+
+   Nodes are numbered in pre-order. The counts and the subtree ranges are kept
+   in compact arrays indexed by the node numbers:
+   1. nodes: the tree nodes in pre-order
+   2. counts: the number of tokens (terminal nodes) in each subtree
+   3. ends: the number after the last node of each subtree, i.e., the nodes
+      of subtree i are nodes[i:ends[i]]
+   '''
+
+   def __init__(self, root):
+      # number the nodes in pre-order
+      self.nodes = []
+      parents = array.array('l')
+      stack = [(root, -1)]
+      while len(stack) > 0:
+         node, parent = stack.pop()
+         idx = len(self.nodes)
+         self.nodes.append(node)
+         parents.append(parent)
+         if not isinstance(node, antlr4.tree.Tree.TerminalNodeImpl):
+            for i in range(node.getChildCount() - 1, -1, -1):
+               stack.append((node.getChild(i), idx))
+
+      # post-order accumulation: in reversed pre-order, a node is visited
+      # after all of its descendants
+      count = len(self.nodes)
+      self.counts = array.array('l', [0] * count)
+      self.ends = array.array('l', range(1, count + 1))
+      for i in range(count - 1, -1, -1):
+         if isinstance(self.nodes[i], antlr4.tree.Tree.TerminalNodeImpl):
+            self.counts[i] = 1
+         parent = parents[i]
+         if parent >= 0:
+            self.counts[parent] += self.counts[i]
+            if self.ends[i] > self.ends[parent]:
+               self.ends[parent] = self.ends[i]
+
+   def is_readable_with_chunk_len(self, idx, chunk_len):
+      '''
+      Same as is_node_readable_with_chunk_len, for node number "idx"
+      '''
+      return self.counts[idx] <= chunk_len
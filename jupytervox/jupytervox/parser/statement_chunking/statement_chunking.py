@@ -2,6 +2,9 @@
 Code for breaking down a statement into smaller readable chunks. 
 '''
 
+# system packages
+import array
+
 # antlr4 packages
 import antlr4
 from ..antlr_parser.Python3Lexer import Python3Lexer
@@ -10,11 +13,28 @@ from ..antlr_parser.Python3Parser import Python3Parser
 # AST tree generation/conversion packages
 from ..converter import antlr2pyast
 from ..converter import tools
+from ..converter import parse_cache
 import ast
 
 # import check_chunk for readability check
 from . import check_chunk as cc
 
+# token counts of the recently chunked trees, keyed by statement
+token_counts_cache = parse_cache.parse_result_cache()
+
+def get_subtree_token_counts(stmt, a4tree):
+    '''
+    Return the (cached) subtree token counts of the ANTLR4 tree of "stmt"
+    '''
+    cached = token_counts_cache.get(stmt)
+    if cached is not None and cached[0] is a4tree:
+        return cached[1]
+
+    counts = cc.subtree_token_counts(a4tree)
+    token_counts_cache.put(stmt, (a4tree, counts))
+
+    return counts
+
 def chunk_statement(stmt, cur_pos=0, chunk_len=5,verbose=False):
     '''
     Chunk a statement into smaller readable chunks. 
@@ -31,32 +51,42 @@ def chunk_statement(stmt, cur_pos=0, chunk_len=5,verbose=False):
 
     ### Parse the statement
     
-    # parse the statement in to an ANTLR4 AST tree
-    a4tree = antlr2pyast.generate_ast_tree(stmt)
+    # parse the statement in to an ANTLR4 AST tree, and convert the ANTLR4
+    # tree into Python AST tree. Repeated requests on the same statement reuse
+    # the cached trees.
+    a4tree, pyast_tree, converter = antlr2pyast.generate_and_convert_tree(stmt)
 
     if verbose:
         print("Anltr4 AST tree is:")
         tools.print_a4ast_tree(a4tree)
-
-    # convert the ANTLR4 tree into Python AST tree
-    pyast_tree, converter = antlr2pyast.convert_tree(a4tree)
-    if verbose:
         print("Python AST tree is:")
         tools.ast_visit(pyast_tree)
 
+    # find all readable chunks in one tree traversal. If that fails (e.g., an
+    # incomplete tree node), search the tree for each chunk instead, which
+    # also reports the error
+    try:
+        counts = get_subtree_token_counts(stmt, a4tree)
+        chunk_map = map_readable_chunks(counts, chunk_len, len(stmt))
+    except Exception:
+        chunk_map = None
+
     # from cursor position 0, iteratively find the next readable chunk
     chunk_nodes = []
     chunk_ends = []
     cursor_pos = cur_pos
     while cursor_pos < len(stmt):
         print("Cursor position:", cursor_pos)
-        # skip spaces
-        while cursor_pos < len(stmt) and stmt[cursor_pos] == ' ':
+        # skip white spaces (spaces, tabs)
+        while cursor_pos < len(stmt) and stmt[cursor_pos].isspace():
             cursor_pos += 1 
 
         # find the next readable chunk
-        chunk_node = find_readable_chunk(a4tree, cursor_pos, chunk_len, 
-                                         verbose)
+        if chunk_map is not None:
+            chunk_node = chunk_map.chunk_at(cursor_pos)
+        else:
+            chunk_node = find_readable_chunk(a4tree, cursor_pos, chunk_len,
+                                             verbose)
         if isinstance(chunk_node, antlr4.tree.Tree.TerminalNodeImpl):
            # a terminal node is returned, record this node,
            # and move cursor to the next position
@@ -88,8 +118,8 @@ def chunk_statement(stmt, cur_pos=0, chunk_len=5,verbose=False):
 
         # add trailing space to the chunk. Here we assume that spaces
         # goes with the previous chunk
-        while cursor_pos < len(stmt) and stmt[cursor_pos] == ' ':
-            chunk += ' '
+        while cursor_pos < len(stmt) and stmt[cursor_pos].isspace():
+            chunk += stmt[cursor_pos]
             cursor_pos += 1
 
         # append the chunk text
@@ -99,6 +129,89 @@ def chunk_statement(stmt, cur_pos=0, chunk_len=5,verbose=False):
     return text_chunks 
         
 
+class readable_chunk_map:
+  '''
+  Map from cursor positions to readable chunks, i.e., the result of
+  find_readable_chunk for every position.
+
+  Fields:
+  1. chunks: list of (start, stop, ANTLR4 node) of the uppermost readable
+     nodes, in tree order. The start/stop are clipped to the ancestors'
+     start/stop, i.e., the positions whose search reaches the node
+  2. chunk_at_pos: array of chunk indices for positions from "offset"; -1 if
+     no readable chunk at the position
+  3. offset: the position of chunk_at_pos[0]
+  '''
+
+  def __init__(self, chunks, stmt_len):
+    self.chunks = chunks
+    self.offset = min([0] + [chunk[0] for chunk in chunks])
+    last = max([stmt_len] + [chunk[1] for chunk in chunks])
+    self.chunk_at_pos = array.array('l', [-1] * (last - self.offset + 1))
+    # the first chunk in tree order wins
+    for i in range(len(chunks) - 1, -1, -1):
+      start, stop, node = chunks[i]
+      for p in range(start, stop + 1):
+        self.chunk_at_pos[p - self.offset] = i
+
+  def chunk_at(self, cur_pos):
+    '''
+    Return the readable chunk node at cur_pos, or None
+    '''
+    p = cur_pos - self.offset
+    if p < 0 or p >= len(self.chunk_at_pos) or self.chunk_at_pos[p] < 0:
+      return None
+    return self.chunks[self.chunk_at_pos[p]][2]
+
+def map_readable_chunks(counts, chunk_len, stmt_len):
+  '''
+  Find all readable chunks in one pre-order traversal of the tree, with the
+  same rules as find_readable_chunk: a node is a chunk if it's a terminal
+  node, or has at most "chunk_len" tokens; the uppermost chunk is used.
+
+  Input parameters:
+    counts: the subtree_token_counts of the tree
+    chunk_len: maximum number of tokens for a readable chunk
+    stmt_len: length of the statement
+
+  Return:
+    1. a readable_chunk_map
+  '''
+  chunks = []
+  # (end of subtree, start, stop) of the ancestors of the current node
+  ancestors = []
+  i = 0
+  while i < len(counts.nodes):
+    while len(ancestors) > 0 and ancestors[-1][0] <= i:
+      ancestors.pop()
+
+    node = counts.nodes[i]
+    is_terminal = isinstance(node, antlr4.tree.Tree.TerminalNodeImpl)
+    if is_terminal:
+      start = node.symbol.start
+      stop = node.symbol.stop
+    else:
+      start = node.start.start
+      stop = node.stop.stop
+
+    # only the positions in all ancestors can reach this node
+    if len(ancestors) > 0:
+      start = max(start, ancestors[-1][1])
+      stop = min(stop, ancestors[-1][2])
+
+    if start > stop:
+      # no position reaches this node, skip the subtree
+      i = counts.ends[i]
+    elif is_terminal or counts.is_readable_with_chunk_len(i, chunk_len):
+      # uppermost readable node, no need to check its children
+      chunks.append((start, stop, node))
+      i = counts.ends[i]
+    else:
+      ancestors.append((counts.ends[i], start, stop))
+      i += 1
+
+  return readable_chunk_map(chunks, stmt_len)
+
 def find_readable_chunk(node, cur_pos, chunk_len, verbose=True):
   '''
   Return the uppermost-level ANTRL4 AST tree node of the lexeme at current
@@ -2,6 +2,9 @@
 Code for navigating through the lexemes within a statement. 
 '''
 
+# system packages
+import array
+
 # antlr4 packages
 import antlr4
 from ..antlr_parser.Python3Lexer import Python3Lexer
@@ -10,6 +13,7 @@ from ..antlr_parser.Python3Parser import Python3Parser
 # AST tree generation/conversion packages
 from ..converter import antlr2pyast
 from ..converter import tools
+from ..converter import parse_cache
 import ast
 
 # import token navigation as a fallback solution for
@@ -241,16 +245,14 @@ def find_cur_readable_lexeme(stmt, cur_pos, verbose=False):
        uppermost-level ANTLR4 node for current readable lexeme
 
     '''
-    # parse the statement in to an ANTLR4 AST tree
-    a4tree = antlr2pyast.generate_ast_tree(stmt)
+    # parse the statement in to an ANTLR4 AST tree, and convert the ANTLR4
+    # tree into Python AST tree. Repeated requests on the same statement reuse
+    # the cached trees.
+    a4tree, pyast_tree, converter = antlr2pyast.generate_and_convert_tree(stmt)
 
     if verbose:
         print("Anltr4 AST tree is:")
         tools.print_a4ast_tree(a4tree)
-
-    # convert the ANTLR4 tree into Python AST tree
-    pyast_tree, converter = antlr2pyast.convert_tree(a4tree)
-    if verbose:
         print("Python AST tree is:")
         tools.ast_visit(pyast_tree)
 
@@ -275,10 +277,12 @@ def find_cur_readable_lexeme(stmt, cur_pos, verbose=False):
     return readable_a4_node
 
 
-def find_lexeme_token_at_pos(stmt, pos, verbose=False):
+def search_lexeme_token_at_pos(stmt, pos, verbose=False):
     '''
-    Find the readable lexeme at cursor position . If there is no readable
-    lexeme, return the current token.
+    Find the readable lexeme at cursor position by searching the parse tree
+    from the top. If there is no readable lexeme, return the current token.
+    This is the fallback of find_lexeme_token_at_pos, when the lexeme index
+    can't be built.
 
     Input parameters:
     1. stmt: the statement to parse
@@ -315,6 +319,197 @@ def find_lexeme_token_at_pos(stmt, pos, verbose=False):
 
     return ret_dict
 
+class lexeme_index:
+    '''
+    Span index of the readable lexemes of one statement.
+
+    The parse tree is traversed once. Every uppermost readable node is
+    recorded with its span clipped to the spans of its ancestors, which is
+    exactly the set of cursor positions whose top-down search
+    (find_readable_antlr4_node) reaches the node. Then, for every cursor
+    position, the first recorded node (in tree order) covering the position is
+    stored in "lexeme_at", so current/next/previous lexeme queries are array
+    lookups. Positions not covered by any lexeme fall back to the current
+    token, looked up in the statement's token_index.
+
+    Fields:
+    1. stmt: the statement
+    2. lexemes: list of (start, stop, ANTLR4 node) of the readable lexemes
+    3. lexeme_at: array of lexeme indices for positions from "offset";
+       -1 means no readable lexeme at the position
+    4. offset: the position of lexeme_at[0]
+    5. tokens: the token_index of the statement
+    '''
+
+    def __init__(self, stmt):
+        self.stmt = stmt
+        self.tokens = tnav.get_token_index(stmt)
+
+        # parse tree, cached
+        a4tree, pyast_tree, converter = (
+            antlr2pyast.generate_and_convert_tree(stmt))
+
+        # collect the uppermost readable nodes in tree order
+        self.lexemes = []
+        stack = [(a4tree, None, None)]
+        while len(stack) > 0:
+            node, lo, hi = stack.pop()
+            if isinstance(node, antlr4.tree.Tree.TerminalNodeImpl):
+                continue
+
+            # positions reaching this node are in all ancestors' spans
+            start = node.start.start
+            stop = node.stop.stop
+            if lo is not None:
+                start = max(start, lo)
+                stop = min(stop, hi)
+            if start > stop:
+                continue
+
+            if is_node_readable(node.pyast_tree):
+                self.lexemes.append((start, stop, node))
+                continue
+
+            # visit the children from left to right
+            for i in range(node.getChildCount() - 1, -1, -1):
+                stack.append((node.getChild(i), start, stop))
+
+        # map positions to lexemes. The first lexeme in tree order wins
+        self.offset = min([0] + [lexeme[0] for lexeme in self.lexemes])
+        last = max([len(stmt)] + [lexeme[1] for lexeme in self.lexemes])
+        self.lexeme_at = array.array('l', [-1] * (last - self.offset + 1))
+        for i in range(len(self.lexemes) - 1, -1, -1):
+            start, stop, node = self.lexemes[i]
+            for p in range(start, stop + 1):
+                self.lexeme_at[p - self.offset] = i
+
+    def lexeme_index_at(self, pos):
+        '''
+        Return the index (in "lexemes") of the readable lexeme at "pos", or -1
+        '''
+        p = pos - self.offset
+        if p < 0 or p >= len(self.lexeme_at):
+            return -1
+        return self.lexeme_at[p]
+
+    def at(self, pos):
+        '''
+        Return the readable lexeme, or the current token, at "pos". Same return
+        value as find_lexeme_token_at_pos.
+        '''
+        ret_dict = {}
+
+        i = self.lexeme_index_at(pos)
+        if i >= 0:
+            node = self.lexemes[i][2]
+            ret_dict["is_lexeme"] = True
+            ret_dict["a4node"] = node
+            ret_dict["text"] = node.getText()
+            ret_dict["start"] = node.start.start
+            ret_dict["stop"] = node.stop.stop
+        else:
+            cur_token = self.tokens.token(self.tokens.current_index(pos))
+            ret_dict["is_lexeme"] = False
+            ret_dict["a4node"] = None
+            ret_dict["text"] = cur_token["text"]
+            ret_dict["start"] = cur_token["start"]
+            ret_dict["stop"] = cur_token["stop"]
+
+        return ret_dict
+
+    def spans(self):
+        '''
+        Return all the navigation stops of the statement, sorted by position,
+        for callers that navigate locally. Each item is a dictionary with
+        "is_lexeme", "text", "start" and "stop". The readable lexemes are
+        included, as well as the tokens outside the readable lexemes.
+        '''
+        spans = []
+        for start, stop, node in self.lexemes:
+            spans.append({"is_lexeme": True, "text": node.getText(),
+                          "start": node.start.start, "stop": node.stop.stop})
+
+        for i in range(len(self.tokens)):
+            start = self.tokens.starts[i]
+            stop = self.tokens.stops[i]
+            if start > stop or self.lexeme_index_at(start) >= 0:
+                # zero-length token, or token inside a lexeme
+                continue
+            spans.append({"is_lexeme": False, "text": self.tokens.texts[i],
+                          "start": start, "stop": stop})
+
+        spans.sort(key=lambda span: (span["start"], span["stop"]))
+
+        return spans
+
+# cache of the lexeme indices of recent statements. A statement whose index
+# can't be built is cached as False
+lexeme_index_cache = parse_cache.parse_result_cache()
+
+def get_lexeme_index(stmt):
+    '''
+    Return the (cached) lexeme_index of a statement. Returns None if the index
+    can't be built, e.g., the statement can't be parsed.
+    '''
+    index = lexeme_index_cache.get(stmt)
+    if index is None:
+        try:
+            index = lexeme_index(stmt)
+        except Exception:
+            index = False
+        lexeme_index_cache.put(stmt, index)
+
+    if index is False:
+        return None
+    return index
+
+def get_lexeme_token_spans(stmt):
+    '''
+    Return all the readable lexemes and tokens of a statement, sorted by
+    position, so that callers can navigate locally. Each item is a dictionary
+    with "is_lexeme", "text", "start" and "stop". If the statement can't be
+    parsed, only tokens are returned.
+    '''
+    index = get_lexeme_index(stmt)
+    if index is not None:
+        return index.spans()
+
+    tokens = tnav.get_token_index(stmt)
+    return [{"is_lexeme": False, "text": tokens.texts[i],
+             "start": tokens.starts[i], "stop": tokens.stops[i]}
+            for i in range(len(tokens)) if tokens.starts[i] <= tokens.stops[i]]
+
+def find_lexeme_token_at_pos(stmt, pos, verbose=False):
+    '''
+    Find the readable lexeme at cursor position . If there is no readable
+    lexeme, return the current token.
+
+    Input parameters:
+    1. stmt: the statement to parse
+    2. cur_pos: current cursor position in the statement
+ 
+    Return a dictionary:
+    1. "is_lexeme": True, if return readable lexeme, False if return
+    2. "a4node": if returns lexeme, this is the ANTRL4 tree node with PyAST tree
+    3. "text": text of the token or lexeme
+    4. "start": the beginning cursor position of returned token/lexeme
+    5. "stop": the ending cursor position of returned token/lexeme
+    '''
+
+    index = get_lexeme_index(stmt)
+    if index is None:
+        # no index (e.g., parsing error), search the tree instead, which
+        # also reports the error
+        return search_lexeme_token_at_pos(stmt, pos, verbose)
+
+    ret_dict = index.at(pos)
+
+    if verbose:
+        print("Readable lexemes and tokens are:", index.spans())
+        print(f"Lexeme/token at position {pos} is:", ret_dict)
+
+    return ret_dict
+
 def find_next_lexeme_token(stmt, pos, verbose):
     '''
     Find the start of next lexeme/token from cursor position "pos". This is
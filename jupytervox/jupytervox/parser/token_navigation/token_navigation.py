@@ -2,11 +2,20 @@
 Class for navigating through the tokens within a statement. 
 '''
 
+# system packages
+import array
+import bisect
+
 # antlr4 packages
 import antlr4
 from ..antlr_parser.Python3Lexer import Python3Lexer
 from ..antlr_parser.Python3Parser import Python3Parser
 
+# pooled lexer instances
+from ..converter import parser_pool
+
+# size-bounded LRU cache, reused for the token indices
+from ..converter import parse_cache
 
 
 # tokenize a statement (i.e., lexical analysis)
@@ -21,10 +30,8 @@ def tokenize(stmt: str):
     The list of tokens (list of Antlr4 CommonToken-typed items)
     '''
 
-    input_stream = antlr4.InputStream(stmt)
-    lexer = Python3Lexer(input_stream)
-
-    tokens = lexer.getAllTokens()
+    with parser_pool.pooled_lexer(stmt) as lexer:
+        tokens = lexer.getAllTokens()
 
     return tokens
 
@@ -35,6 +42,116 @@ def print_tokens(tokens: list):
 
     return
 
+class token_index:
+    '''
+    Index of the tokens of one statement for position lookups in O(log n).
+
+    Token starts/stops, types and texts are kept in compact arrays, in the
+    order produced by the lexer. Note that the lexer order is not always sorted
+    by position, e.g., for a statement with leading white spaces, the NEWLINE
+    and INDENT tokens come first. Therefore, besides the starts/stops, the
+    lookups use monotonic running maximums/minimums of them, which give the
+    same answers as scanning the tokens in lexer order:
+    1. first token with start > pos: first token whose prefix-max start > pos
+    2. last token with stop < pos: last token whose suffix-min stop < pos
+    3. last token with start <= pos: last token whose suffix-min start <= pos
+    '''
+
+    def __init__(self, stmt: str):
+        tokens = tokenize(stmt)
+
+        self.starts = array.array('l', [t.start for t in tokens])
+        self.stops = array.array('l', [t.stop for t in tokens])
+        self.types = array.array('l', [t.type for t in tokens])
+        self.texts = [t.text for t in tokens]
+
+        count = len(tokens)
+        self.prefix_max_starts = array.array('l', self.starts)
+        for i in range(1, count):
+            if self.prefix_max_starts[i] < self.prefix_max_starts[i-1]:
+                self.prefix_max_starts[i] = self.prefix_max_starts[i-1]
+        self.suffix_min_starts = array.array('l', self.starts)
+        self.suffix_min_stops = array.array('l', self.stops)
+        for i in range(count - 2, -1, -1):
+            if self.suffix_min_starts[i] > self.suffix_min_starts[i+1]:
+                self.suffix_min_starts[i] = self.suffix_min_starts[i+1]
+            if self.suffix_min_stops[i] > self.suffix_min_stops[i+1]:
+                self.suffix_min_stops[i] = self.suffix_min_stops[i+1]
+
+        # whether the tokens are sorted by position
+        self.is_sorted = (list(self.starts) == list(self.prefix_max_starts) and
+                          list(self.stops) == list(self.suffix_min_stops))
+
+    def __len__(self):
+        return len(self.starts)
+
+    def token(self, idx: int):
+        '''
+        Return the token at "idx" as a dictionary of start, stop, text and type
+        '''
+        return {"start": self.starts[idx], "stop": self.stops[idx],
+                "text": self.texts[idx], "type": self.types[idx]}
+
+    def next_index(self, cur_pos: int):
+        '''
+        Return the index of the first token that starts after cur_pos, or None
+        '''
+        idx = bisect.bisect_right(self.prefix_max_starts, cur_pos)
+        if idx >= len(self):
+            return None
+        return idx
+
+    def previous_index(self, cur_pos: int):
+        '''
+        Return the index of the last token that stops before cur_pos, or None
+        '''
+        idx = bisect.bisect_left(self.suffix_min_stops, cur_pos) - 1
+        if idx < 0:
+            return None
+        return idx
+
+    def current_index(self, cur_pos: int):
+        '''
+        Return the index of the last token that starts at or before cur_pos.
+        If there is no such token (cur_pos out of range), use the first token.
+        '''
+        idx = bisect.bisect_right(self.suffix_min_starts, cur_pos) - 1
+        return max(idx, 0)
+
+    def containing_index(self, cur_pos: int):
+        '''
+        Return the index of the first token that covers cur_pos, or None
+        '''
+        if self.is_sorted:
+            # tokens [0, last] start at or before cur_pos, and the first of
+            # them that stops at or after cur_pos covers cur_pos
+            last = bisect.bisect_right(self.starts, cur_pos) - 1
+            idx = bisect.bisect_left(self.stops, cur_pos)
+            if idx <= last:
+                return idx
+            return None
+
+        # unsorted tokens, rare, just scan
+        for i in range(len(self)):
+            if self.starts[i] <= cur_pos <= self.stops[i]:
+                return i
+        return None
+
+# cache of the token indices of recent statements
+token_index_cache = parse_cache.parse_result_cache()
+
+def get_token_index(stmt: str):
+    '''
+    Return the (cached) token index of a statement. Holding an arrow key on a
+    line navigates the same statement many times, which is lexed only once.
+    '''
+    index = token_index_cache.get(stmt)
+    if index is None:
+        index = token_index(stmt)
+        token_index_cache.put(stmt, index)
+
+    return index
+
 # find the current token index
 def current_token_index(tokens: list, cur_pos: int):
     '''
@@ -42,12 +159,15 @@ def current_token_index(tokens: list, cur_pos: int):
     current cursor position
 
     Input parameters:
-    1. tokens: a list of tokens (CommonToken type)
+    1. tokens: a list of tokens (CommonToken type), or a token_index
     2. cur_pos: current (cursor) position
 
     Return value:
     The list index of current token. If the cur_pos is wrong, then return None.
     '''
+
+    if isinstance(tokens, token_index):
+        return tokens.containing_index(cur_pos)
    
     for i in range(len(tokens)):
         t = tokens[i]
@@ -75,26 +195,21 @@ def next_token(stmt: str, cur_pos: int, verbose: bool):
     if verbose:
         print(f"find next token in {stmt} from current position {cur_pos}")
 
-    # tokenize the stmt
-    tokens = tokenize(stmt)
+    # get the token index of the stmt
+    index = get_token_index(stmt)
     if verbose:
         print("Tokens are:")
-        print_tokens(tokens)
+        print_tokens(tokenize(stmt))
 
     # find the token that starts after current cursor position
-    found = False
-    for t in tokens:
-        if cur_pos < t.start:
-            # next token should start after the cursor
-            found = True
-            break
+    idx = index.next_index(cur_pos)
 
-    if found:
+    if idx is not None:
         # find the next token
-        ret_val = {"next_start": t.start,
-                   "next_stop": t.start,
-                   "next_text": t.text,
-                   "next_type": t.type}
+        ret_val = {"next_start": index.starts[idx],
+                   "next_stop": index.starts[idx],
+                   "next_text": index.texts[idx],
+                   "next_type": index.types[idx]}
     else:
         # reach the end of the token list
         # no next token, current token is the last, return -1
@@ -153,26 +268,21 @@ def previous_token(stmt: str, cur_pos: int, verbose: bool):
         print(f"find the previous token in {stmt} from current position "
               f"{cur_pos}")
 
-    # tokenize the stmt
-    tokens = tokenize(stmt)
+    # get the token index of the stmt
+    index = get_token_index(stmt)
     if verbose:
         print("Tokens are:")
-        print_tokens(tokens)
+        print_tokens(tokenize(stmt))
 
-    # find the token that starts after current cursor position
-    found = False
-    for t in reversed(tokens):
-        if t.stop < cur_pos:
-            # previous token should stop before the cursor
-            found = True
-            break
-
-    if found:
+    # find the last token that stops before the cursor
+    idx = index.previous_index(cur_pos)
+
+    if idx is not None:
         # there is a previous token
-        ret_val = {"pre_start": t.start,
-                   "pre_stop": t.start,
-                   "pre_text": t.text,
-                   "pre_type": t.type}
+        ret_val = {"pre_start": index.starts[idx],
+                   "pre_stop": index.starts[idx],
+                   "pre_text": index.texts[idx],
+                   "pre_type": index.types[idx]}
     else:
         # no previous token, current token is the first, return -1
         ret_val = {"pre_start": -1,
@@ -231,26 +341,19 @@ def current_token_start_stop(stmt: str, cur_pos: int, verbose: bool):
         print(f"find the start/stop of the current token in {stmt} at current "
               f"position {cur_pos}")
 
-    # tokenize the stmt
-    tokens = tokenize(stmt)
+    # get the token index of the stmt
+    index = get_token_index(stmt)
     if verbose:
         print("Tokens are:")
-        print_tokens(tokens)
+        print_tokens(tokenize(stmt))
 
-    # find the token that starts after current cursor position
-    for t in reversed(tokens):
-        # search reversely, the first token that starts before cur_pos
-        # is the current token. This assumes white spaces are part of
-        # their immediate previous token
-        # if cur_pos is out-of-range, than we are using the first
-        # or last token as current token
-        if t.start <= cur_pos:
-            break
-
-    ret_val = {"start": t.start,
-               "stop": t.stop,
-               "text": t.text,
-               "type": t.type}
+    # the last token that starts before cur_pos is the current token. This
+    # assumes white spaces are part of their immediate previous token.
+    # if cur_pos is out-of-range, than we are using the first
+    # or last token as current token
+    idx = index.current_index(cur_pos)
+
+    ret_val = index.token(idx)
         
     if verbose:
         print(f"Current token start and stop are {ret_val}")
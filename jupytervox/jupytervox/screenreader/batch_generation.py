@@ -0,0 +1,127 @@
+'''
+Bulk speech generation with a process pool.
+
+Generating the transcripts of many notebooks is CPU bound on the pure-Python
+ANTLR4 runtime, and threads do not help because of the GIL. generate_many
+splits the statements into chunks and dispatches the chunks to a pool of
+worker processes. Each worker has its own screen reader with prewarmed
+parser DFAs (the [prewarm] table of jvox_config.toml). The results are
+returned in input order.
+
+Workers are started with "forkserver" where available, otherwise "spawn",
+never with a plain fork: the caller may be a process with running threads
+that hold locks, e.g., a Jupyter server with its prewarm, speculation and
+executor threads, and a forked worker would inherit those locks held
+forever. Each worker therefore starts from a fresh interpreter, and scripts
+that call generate_many with workers need an "if __name__ == '__main__'"
+guard.
+'''
+
+# system packages
+import concurrent.futures
+import multiprocessing
+import os
+
+# default number of statements dispatched to a worker at a time
+DEFAULT_CHUNK_SIZE = 32
+
+# the screen reader of a worker process, created by _init_worker
+_worker_reader = None
+# the style selection of the batch, for the worker's screen reader
+_worker_speech_styles = None
+
+def _init_worker(reader_options, speech_styles):
+    '''
+    Initialize a worker process: create its screen reader and prewarm the
+    parser
+    '''
+    global _worker_reader, _worker_speech_styles
+
+    from .screenreader import jvox_screenreader
+
+    _worker_reader = jvox_screenreader(**reader_options)
+    _worker_speech_styles = speech_styles
+
+    prewarm_worker()
+
+def prewarm_worker():
+    '''
+    Prewarm the parser DFAs of a worker process, as set in the [prewarm]
+    table of jvox_config.toml
+    '''
+    from ..commons import config as jvox_config
+    from ..parser.converter import prewarm
+
+    prewarm_config = jvox_config.jvox_prewarm_config()
+    if prewarm_config["enabled"]:
+        prewarm.prewarm(prewarm.load_corpus(
+            max_statements=prewarm_config["max_statements"]))
+
+def _generate_chunk(stmts, verbose):
+    '''
+    Generate the speeches of a chunk of statements in a worker process
+    '''
+    return [_worker_reader.generate_for_one_with_fallback(
+              stmt, verbose, _worker_speech_styles)
+            for stmt in stmts]
+
+def pool_context():
+    '''
+    Return the multiprocessing context of the worker processes:
+    "forkserver" if available, otherwise "spawn"
+    '''
+    if "forkserver" in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context("forkserver")
+    return multiprocessing.get_context("spawn")
+
+def generate_many(reader, stmts, workers=None, verbose=False,
+                  speech_styles=None, chunk_size=DEFAULT_CHUNK_SIZE):
+    '''
+    Generate the speeches of many statements, see
+    jvox_screenreader.generate_many.
+
+    Input parameters:
+    1. reader: the jvox_screenreader whose options (and, if
+       "speech_styles" is None, style selection) the workers use
+    2. stmts: the statements
+    3. workers: number of worker processes; None for one per CPU. With one
+       worker, or with no more statements than one chunk, the statements are
+       generated in this process by "reader"
+    4. verbose: print debugging information
+    5. speech_styles: overrides the style selection for this call only
+    6. chunk_size: number of statements dispatched to a worker at a time
+
+    Return: the list of speeches, in the order of "stmts"
+    '''
+    stmts = list(stmts)
+    if workers is None:
+        workers = os.cpu_count() or 1
+    chunk_size = max(chunk_size, 1)
+
+    if workers <= 1 or len(stmts) <= chunk_size:
+        return [reader.generate_for_one_with_fallback(stmt, verbose,
+                                                      speech_styles)
+                for stmt in stmts]
+
+    if speech_styles is None:
+        speech_styles = dict(reader.vox_gen.speech_styles)
+    reader_options = {"use_antlr4": reader.use_antlr4,
+                      "use_pyast_fast_path": reader.use_pyast_fast_path,
+                      "use_speech_cache": reader.use_speech_cache,
+                      "memoize_subtrees": reader.vox_gen.memoize_subtrees}
+
+    chunks = [stmts[i:i + chunk_size] for i in range(0, len(stmts),
+                                                     chunk_size)]
+    workers = min(workers, len(chunks))
+
+    speeches = []
+    with concurrent.futures.ProcessPoolExecutor(
+            max_workers=workers, mp_context=pool_context(),
+            initializer=_init_worker,
+            initargs=(reader_options, speech_styles)) as pool:
+        # map returns the results in the order of the chunks
+        for chunk_speeches in pool.map(_generate_chunk, chunks,
+                                       [verbose] * len(chunks)):
+            speeches.extend(chunk_speeches)
+
+    return speeches
@@ -226,6 +226,12 @@ class binops_mixin:
 
     style_name = "alternate"
 
+    # the operands' "alternate" speech sets their jvox_data, make sure it is
+    # generated (with lazy styles, it may not be yet)
+    for operand in (node.left, node.right):
+      if style_name in operand.jvox_speech:
+        operand.jvox_speech[style_name]
+
     # determine what style to use
     use_style = "indirect"
     if ((hasattr(node.left, "jvox_data") and
@@ -412,18 +418,13 @@ class binops_mixin:
     '''
     Generate speech for ast.BinOp. Call the generator for each style.
     '''
-    node.jvox_speech = {}
-    
-    # style: plain
-    self.gen_ast_BinOp_style_default(node)
-    # style: indirect
-    self.gen_ast_BinOp_style_indirect(node)
-    # style: alternate
-    self.gen_ast_BinOp_style_alternate(node)
-    # style: semantic oriented
-    self.gen_ast_BinOp_style_semantic_oriented(node)
-    # style: alternate
-    self.gen_ast_BinOp_style_alternate_v2(node)
+    self.gen_styles(node, {
+      "default": self.gen_ast_BinOp_style_default,
+      "indirect": self.gen_ast_BinOp_style_indirect,
+      "alternate": self.gen_ast_BinOp_style_alternate,
+      "semantic_oriented": self.gen_ast_BinOp_style_semantic_oriented,
+      "alternatev2": self.gen_ast_BinOp_style_alternate_v2,
+    })
 
     return
     
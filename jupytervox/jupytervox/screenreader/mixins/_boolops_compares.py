@@ -248,12 +248,11 @@ class boolops_compares_mixin:
     '''
     '''
 
-    # style default
-    self.gen_ast_BoolOp_default(node)
-    # style indirect
-    self.gen_ast_BoolOp_indirect(node)
-    # style alternatev2
-    self.gen_ast_BoolOp_alternate_v2(node)
+    self.gen_styles(node, {
+      "default": self.gen_ast_BoolOp_default,
+      "indirect": self.gen_ast_BoolOp_indirect,
+      "alternatev2": self.gen_ast_BoolOp_alternate_v2,
+    })
 
     return
 
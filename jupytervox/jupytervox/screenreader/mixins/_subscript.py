@@ -108,8 +108,8 @@ class subscript_mixin:
         Generate speech for ast.Subscript
         '''
 
-        # style default
-        self.gen_ast_Subscript_default(node)
-        # style indirect
-        self.gen_ast_Subscript_reversed(node)
+        self.gen_styles(node, {
+            "default": self.gen_ast_Subscript_default,
+            "reversed": self.gen_ast_Subscript_reversed,
+        })
             
@@ -106,9 +106,9 @@ class unaryops_mixin:
     Generate speech for ast.UnaryOp
     '''
 
-    # default style
-    self.gen_ast_UnaryOp_default(node)
-    # indirect style
-    self.gen_ast_UnaryOp_indirect(node)
+    self.gen_styles(node, {
+      "default": self.gen_ast_UnaryOp_default,
+      "indirect": self.gen_ast_UnaryOp_indirect,
+    })
 
     return
@@ -4,6 +4,10 @@ Module jvox_screenreader: entry point class for JupyterVox screen reader
 
 # Python packages
 import ast
+import collections
+import copy
+import re
+import threading
 import traceback
 
 # for ASTVox_Anltr4
@@ -31,10 +35,40 @@ from .mixins import _loops
 from . import utils
 from .speech_generator import pyastvox_speech_generator
 from .speech_styles import pyastvox_speech_styles
+from . import speech_cache
+from . import batch_generation
 
 # package for JVox parser based on Antlr4
 # from converter import antlr2pyast
 
+# speech generation writes the speech into the tree nodes, and parsed trees
+# are shared through the process-wide parse cache. This lock keeps threads
+# from generating on the same tree at the same time.
+_speech_generation_lock = threading.Lock()
+
+# punctuation that ends a speech segment, e.g., the comma after "x" in
+# "x, is assigned with value, 1"
+_punctuation_re = re.compile(r"[,.;:]*")
+
+# line breaks of a cell, as counted by the Python parser
+_line_break_re = re.compile(r"\r\n|\r|\n")
+
+def split_cell_lines(cell):
+  '''
+  Split the code of a cell into lines, at the same line breaks as the Python
+  parser, i.e., the line numbers of the cell's tree
+  '''
+  return _line_break_re.split(cell)
+
+# compound statements whose header line is read from the tree of the whole
+# cell, with the first keyword of the header line; "elif" lines are read
+# line by line
+_cell_header_keywords = {ast.If: "if", ast.For: "for", ast.While: "while",
+                         ast.FunctionDef: "def", ast.ClassDef: "class"}
+
+# fields of the compound statements that are not on the header line
+_cell_body_fields = ("body", "orelse", "decorator_list")
+
 
 class jvox_screenreader():
   '''
@@ -53,18 +87,37 @@ class jvox_screenreader():
   use_antlr4: bool # whether to use ANTLR4 parser or not. If no,
                    # then use Python AST. Python AST should only be use for
                    # debugging, since it can't parse partial statements
+  use_pyast_fast_path: bool # hybrid mode: when using ANTLR4, first try the
+                            # much faster Python AST for complete statements,
+                            # and only use ANTLR4 for partial statements
+  use_speech_cache: bool # reuse the speech of statements read before
+  speech_cache = None # the speech_result_cache instance
+  # memoize_subtrees (constructor option): see
+  # pyastvox_speech_generator.memoize_subtrees, off by default
   
 
-  def __init__(self, use_antlr4 = True):
-      self.vox_gen = pyastvox_speech_generator()
+  def __init__(self, use_antlr4 = True, use_pyast_fast_path = True,
+               use_speech_cache = True, memoize_subtrees = False):
+      self.vox_gen = pyastvox_speech_generator(
+        memoize_subtrees=memoize_subtrees)
       self.use_antlr4 = use_antlr4
+      self.use_pyast_fast_path = use_pyast_fast_path
+      self.use_speech_cache = use_speech_cache
+      self.speech_cache = speech_cache.speech_result_cache()
+      # changing the styles invalidates the cached speeches
+      self.vox_gen.style_change_listeners.append(
+        self.speech_cache.invalidate)
       
       return
 
 
   # generate speech for one "stmt". If "verbose" is true, then
-  # print out the debugging information (e.g., AST tree)
-  def generate_for_one(self, stmt, verbose=False):        
+  # print out the debugging information (e.g., AST tree). "speech_styles"
+  # overrides the generator's style selection for this call only
+  # "tree" is the already parsed tree of the statement, e.g., from the tree
+  # of a whole cell (see generate_for_cell); if None, the statement is parsed
+  def generate_for_one(self, stmt, verbose=False, speech_styles=None,
+                       tree=None):
     # first, check if it is an empty line
     if stmt.lstrip() == "":
       return "empty line" # reading is "empty line"
@@ -75,45 +128,261 @@ class jvox_screenreader():
       whitespace_speech += ", "
 
     # remove leading white spaces. Otherwise, parsing will fail, since
-    # indents have meanings semantically.
-    stmt = stmt.lstrip()
+    # indents have meanings semantically. The indentation is read
+    # separately, so indented copies of a line share one cache entry
+    stmt = speech_cache.normalize_statement(stmt.lstrip())
+
+    # reuse the speech of a statement read before with the same styles.
+    # "verbose" only controls the debugging prints; a cached statement is
+    # not parsed again, so there is no tree to print. A tree from a cell can
+    # be read differently from the line parsed by itself, so the two are
+    # cached separately
+    if self.use_speech_cache:
+      styles_key = self.current_styles_key(speech_styles)
+      source = (speech_cache.SOURCE_LINE if tree is None
+                else speech_cache.SOURCE_CELL)
+      speech = self.speech_cache.get(stmt, styles_key, source)
+      if speech is not None:
+        if verbose:
+          print("Speech cache hit:", speech)
+        return whitespace_speech + speech
+
+    speech = self.gen_statement_speech(stmt, verbose, speech_styles, tree)
+
+    if self.use_speech_cache:
+      self.speech_cache.put(stmt, styles_key, speech, source)
+
+    # final speech including both indent reading and statement reading
+    return whitespace_speech + speech
 
+  def current_styles_key(self, speech_styles=None):
+    '''
+    Return the speech cache's style profile of a call: of "speech_styles"
+    if given, otherwise of the generator's current styles
+    '''
+    return speech_cache.make_styles_key(
+      self.vox_gen.speech_styles if speech_styles is None else speech_styles)
+
+  def gen_statement_speech(self, stmt, verbose=False, speech_styles=None,
+                           tree=None):
+    '''
+    Generate the speech of one statement without leading white spaces,
+    i.e., without the indentation reading. "tree" is the already parsed
+    tree of the statement, or None to parse it.
+    '''
     # second, check if it is comment
     if stmt[0] == '#':
-      speech = self.gen_comment_speech(stmt)
-      return whitespace_speech + speech
+      return self.gen_comment_speech(stmt)
         
     # third, check if it is a standalone non-parse-able statement,
     # e.g., "try", "else", "except". They will be read without
     # parsing.
     standalone_speech = self.gen_standalone_statements(stmt)
     if standalone_speech != "":
-      return whitespace_speech + standalone_speech
+      return standalone_speech
         
     # This is a normal statement, parse the statement to generate the
     # AST tree first
-    # generate and convert tree
     try:
-      if self.use_antlr4:
-        # parse with antlr4 and converter
-        antlr4_tree = antlr2pyast.generate_ast_tree(stmt)
-        tree, converter = antlr2pyast.convert_tree(antlr4_tree)
-      else: 
-        # parse with Python AST
-        tree = ast.parse(stmt)
+      if tree is None:
+        tree = self.parse_statement(stmt, verbose)
     except Exception as e:
       # parsing error, this could be due to a completely unparse-able
       # partial statement, e.g., "else:\n"
       print("Statement parsing error")
-      antlr4_parse_error = True
       if verbose:
         traceback.print_exc()
         
       # error parsing, tokenize the statement
       token_strings = antlr2pyast.tokenize_stmt(stmt) 
    
-      return whitespace_speech + self.gen_speech_based_on_tokens(token_strings)
-    
+      return self.gen_speech_based_on_tokens(token_strings)
+
+    # generate speech
+    with _speech_generation_lock:
+      self.vox_gen.generate(tree, speech_styles)
+      speech = tree.jvox_speech["selected_style"]
+
+    return speech
+
+  def generate_for_cell(self, cell, verbose=False, speech_styles=None):
+    '''
+    Generate the speech of every line of a cell (code snippet). The cell is
+    parsed once as a whole (Python's file_input), and each line that is a
+    complete statement, or the header of a compound statement (e.g.,
+    "for i in range(10):"), is read from the cell's tree. The other lines,
+    e.g., "else:", "except:", comments and the continuation lines of
+    multi-line statements, are read line by line. If the cell cannot be
+    parsed, all lines are read line by line. The speeches are the same as
+    those of generate_for_one, except that:
+    1. a header that the line parser fails to convert, e.g.,
+       "if a is None:", is read from the cell's tree instead of token by
+       token
+    2. a line whose speech generation fails is read token by token instead
+       of failing the whole cell, see generate_for_one_with_fallback
+
+    Input parameters:
+    1. cell: the code of the cell
+    2. verbose: print debugging information
+    3. speech_styles: overrides the style selection for this call only
+
+    Return: list of speeches, one for each line of the cell
+    '''
+    lines = split_cell_lines(cell)
+    line_trees = self.parse_cell(cell, lines)
+
+    return [self.generate_for_one_with_fallback(line, verbose, speech_styles,
+                                                line_trees.get(line_no))
+            for line_no, line in enumerate(lines, 1)]
+
+  def generate_for_one_with_fallback(self, stmt, verbose=False,
+                                     speech_styles=None, tree=None):
+    '''
+    Same as generate_for_one, but a statement whose speech generation fails
+    is read token by token instead of raising, e.g., when reading many
+    statements at once
+    '''
+    try:
+      return self.generate_for_one(stmt, verbose, speech_styles, tree)
+    except Exception as e:
+      print("Speech generation error")
+      if verbose:
+        traceback.print_exc()
+
+    whitespace_speech = self.gen_leading_whitespace_speech(stmt)
+    if whitespace_speech != "":
+      whitespace_speech += ", "
+    token_strings = antlr2pyast.tokenize_stmt(stmt.lstrip())
+
+    return whitespace_speech + self.gen_speech_based_on_tokens(token_strings)
+
+  def generate_many(self, stmts, workers=None, verbose=False,
+                    speech_styles=None,
+                    chunk_size=batch_generation.DEFAULT_CHUNK_SIZE):
+    '''
+    Generate the speeches of many statements, e.g., the transcripts of all
+    notebooks of a course. The statements are split into chunks of
+    "chunk_size", and the chunks are generated by a pool of "workers" worker
+    processes (None for one per CPU), each with a prewarmed parser. See
+    batch_generation.
+
+    A statement whose speech generation fails is read token by token, see
+    generate_for_one_with_fallback.
+
+    Return: the list of speeches, in the order of "stmts"
+    '''
+    return batch_generation.generate_many(self, stmts, workers, verbose,
+                                          speech_styles, chunk_size)
+
+  def parse_cell(self, cell, lines):
+    '''
+    Parse a cell once and split its tree into the trees of its lines.
+
+    Input parameters:
+    1. cell: the code of the cell
+    2. lines: the lines of the cell
+
+    Return: dict of line number (1-based) -> tree (ast.Module) of the
+    statement on that line, for the lines that can be read from the cell's
+    tree. Empty if the cell cannot be parsed.
+    '''
+    try:
+      cell_tree = ast.parse(cell)
+    except (SyntaxError, ValueError):
+      return {}
+
+    # statements per line; lines with several statements, e.g.,
+    # "if a: b = 1" or "a = 1; b = 2", are read line by line
+    stmt_counts = collections.Counter()
+    line_trees = {}
+    for node in ast.walk(cell_tree):
+      if not isinstance(node, ast.stmt):
+        continue
+      stmt_counts[node.lineno] += 1
+      tree = self.gen_cell_line_tree(node, lines[node.lineno - 1])
+      if tree is not None:
+        line_trees[node.lineno] = tree
+
+    return {line_no: tree for line_no, tree in line_trees.items()
+            if stmt_counts[line_no] == 1}
+
+  def gen_cell_line_tree(self, node, line):
+    '''
+    Generate the tree of one line from a statement "node" of a cell's tree
+    starting on that line. Return None if the line should be parsed by
+    itself instead, i.e., if the tree could differ from the line's tree.
+    '''
+    # the statement must start the line
+    indent = len(line) - len(line.lstrip())
+    if node.col_offset != indent:
+      return None
+
+    node_class = node.__class__
+    if node_class in _cell_header_keywords:
+      # the header is read without the body, as the partial statement
+      # (e.g., "if a > b:") would be
+      keyword = _cell_header_keywords[node_class]
+      if not re.match(keyword + r"\b", line[indent:]):
+        return None
+      stmt_node = copy.copy(node)
+      for field in _cell_body_fields:
+        if hasattr(stmt_node, field):
+          setattr(stmt_node, field, [])
+    elif node.end_lineno == node.lineno:
+      stmt_node = node
+    else:
+      # a statement over several lines is read line by line
+      return None
+
+    tree = ast.Module(body=[stmt_node], type_ignores=[])
+    for sub_node in ast.walk(tree):
+      # the same node types as the Python AST fast path of
+      # parse_statement, so that the tree equals the line's tree
+      if type(sub_node) not in antlr2pyast.converter_node_types:
+        return None
+      # the header must be on one line
+      if (sub_node is not stmt_node and
+          getattr(sub_node, "end_lineno", node.lineno) != node.lineno):
+        return None
+
+    return tree
+
+  def set_speech_style(self, node_class, style):
+    '''
+    Set the speech style for a type of AST node (i.e., ast node class), see
+    pyastvox_speech_generator.set_speech_style. The cached speeches are
+    invalidated.
+    '''
+    self.vox_gen.set_speech_style(node_class, style)
+
+  def speech_cache_stats(self):
+    '''
+    Return the statistics of the speech cache, e.g., hit rate
+    '''
+    return self.speech_cache.stats()
+
+  def parse_statement(self, stmt, verbose=False):
+    '''
+    Parse one statement (without leading white spaces) into a tree. Raises
+    an exception if the statement cannot be parsed.
+    '''
+    tree = None
+    if self.use_antlr4 and self.use_pyast_fast_path:
+      # hybrid mode: complete statements with only converter-supported
+      # node types give the same tree with Python AST, which is much faster
+      tree = antlr2pyast.parse_with_pyast(stmt)
+
+    if self.use_antlr4:
+      # parse with antlr4 and converter, reusing cached results for
+      # statements that have been parsed before. This handles the partial
+      # statements, e.g., "if a > b:"
+      if tree is None:
+        antlr4_tree, tree, converter = (
+          antlr2pyast.generate_and_convert_tree(stmt))
+    else:
+      # parse with Python AST
+      tree = ast.parse(stmt)
+
     # print the tree
     if verbose:
       ast_tree_str = []
@@ -121,13 +390,158 @@ class jvox_screenreader():
       for tree_line in ast_tree_str:
         print(tree_line)
 
-    # generate speech
-    self.vox_gen.generate(tree)
+    return tree
 
-    # final speech including both indent reading and statement reading
-    speech = whitespace_speech + tree.jvox_speech["selected_style"]
+  # generate the speech for one "stmt" as a stream of segments in reading
+  # order, e.g., "x" and then "equals the sum of a and b" for
+  # "x = a + b". The segments, joined with spaces, give the same reading as
+  # generate_for_one (up to white spaces). Segments that need no parsing,
+  # e.g., the indentation reading, are yielded before the statement is
+  # parsed, so that a caller can start synthesizing them right away
+  def generate_stream(self, stmt, verbose=False, speech_styles=None):
+    # first, check if it is an empty line
+    if stmt.lstrip() == "":
+      yield "empty line"
+      return
 
-    return speech
+    # indentation reading
+    whitespace_speech = self.gen_leading_whitespace_speech(stmt)
+    if whitespace_speech != "":
+      yield whitespace_speech + ","
+
+    # the statement without its indentation, normalized as in
+    # generate_for_one
+    stmt = speech_cache.normalize_statement(stmt.lstrip())
+
+    # reuse the segments of a statement streamed before with the same
+    # styles. The segments are cached separately from the line speeches,
+    # since they can't be recovered from a joined speech
+    if self.use_speech_cache:
+      styles_key = self.current_styles_key(speech_styles)
+      segments = self.speech_cache.get(stmt, styles_key,
+                                       speech_cache.SOURCE_SEGMENTS)
+      if segments is not None:
+        if verbose:
+          print("Speech cache hit:", segments)
+        yield from segments
+        return
+
+    segments, speech = self.gen_statement_segments(stmt, verbose,
+                                                   speech_styles)
+
+    if self.use_speech_cache:
+      self.speech_cache.put(stmt, styles_key, tuple(segments),
+                            speech_cache.SOURCE_SEGMENTS)
+      # the joined speech of a parsed statement is its line speech, so a
+      # later line reading is a hit as well
+      if speech is not None:
+        self.speech_cache.put(stmt, styles_key, speech)
+
+    yield from segments
+
+  def gen_statement_segments(self, stmt, verbose=False, speech_styles=None):
+    '''
+    Generate the speech segments of one statement without leading white
+    spaces, i.e., without the indentation reading.
+
+    Return:
+    1. The list of segments
+    2. The speech of the statement's tree, or None if the statement is not
+       parsed (comments, standalone statements, parsing errors)
+    '''
+    # comment and standalone statements are read as one segment
+    if stmt[0] == '#':
+      return [self.gen_comment_speech(stmt)], None
+
+    standalone_speech = self.gen_standalone_statements(stmt)
+    if standalone_speech != "":
+      return [standalone_speech], None
+
+    try:
+      tree = self.parse_statement(stmt, verbose)
+    except Exception as e:
+      print("Statement parsing error")
+      if verbose:
+        traceback.print_exc()
+
+      token_strings = antlr2pyast.tokenize_stmt(stmt)
+      return [self.gen_speech_based_on_tokens(token_strings)], None
+
+    # the segments are read from the speech stored in the (shared) tree, so
+    # split them under the generation lock as well
+    with _speech_generation_lock:
+      self.vox_gen.generate(tree, speech_styles)
+      segments = self.split_speech_segments(tree)
+      speech = tree.jvox_speech["selected_style"]
+
+    return segments, speech
+
+  def split_speech_segments(self, tree):
+    '''
+    Split the selected speech of a tree into segments in reading order, at
+    the speeches of the statement's children, e.g., the assignment target
+    and value. The text between two children (e.g., "equals") goes with the
+    following child.
+
+    Input parameters:
+    1. tree: the tree with speech generated
+
+    Return:
+    1. The list of segments (non-empty strings)
+    '''
+    speech = tree.jvox_speech["selected_style"]
+
+    # go down to the statement node, e.g., Module -> Expr -> Call, as long
+    # as the node has only one child with the same speech
+    node = tree
+    while True:
+      children = [child for child in ast.iter_child_nodes(node)
+                  if hasattr(child, "jvox_speech") and
+                  self._node_speech(child)]
+      if (len(children) == 1 and
+          self._node_speech(children[0]) == speech):
+        node = children[0]
+        continue
+      break
+
+    # find the children's speeches in the statement speech, in order, as
+    # whole words
+    boundaries = []
+    cursor = 0
+    for child in children:
+      child_speech = self._node_speech(child)
+      if not child_speech or child_speech == speech:
+        continue
+      match = re.compile(r"(?<!\w)" + re.escape(child_speech) +
+                         r"(?!\w)").search(speech, cursor)
+      if match is None:
+        continue
+      # the punctuation right after the child's speech ends the segment
+      end = _punctuation_re.match(speech, match.end()).end()
+      boundaries.append(end)
+      cursor = end
+
+    # each segment ends at a child's speech; the rest goes to the last one
+    segments = []
+    start = 0
+    for end in boundaries:
+      segment = speech[start:end].strip()
+      if segment:
+        segments.append(segment)
+      start = end
+    rest = speech[start:].strip()
+    if rest:
+      if segments and not rest[0].isalnum():
+        # closing punctuation belongs to the last segment
+        segments[-1] += rest
+      else:
+        segments.append(rest)
+
+    return segments
+
+  def _node_speech(self, node):
+    return node.jvox_speech.get("selected_style",
+                                node.jvox_speech.get("default", ""))
   
   def gen_standalone_statements(self, text):
     '''
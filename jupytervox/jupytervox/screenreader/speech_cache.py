@@ -0,0 +1,150 @@
+'''
+Cache of generated statement speeches.
+
+Students re-read the same lines constantly, e.g., "for i in range(10):",
+"print(x)" or "return result". This module keeps a size-bounded LRU cache of
+the speech of each statement, so that re-reading a line skips parsing and
+speech generation.
+
+The key is (SPEECH_VERSION, parse source, normalized statement, style
+profile):
+1. The statement is normalized by removing its leading white spaces (the
+   indentation speech is generated separately, so indented copies of a line
+   share one entry) and the spaces/tabs at its end, which do not change the
+   speech.
+2. The style profile is the selected style of each node type, so different
+   style selections never share an entry.
+3. The parse source tells whether the statement was parsed by itself
+   (SOURCE_LINE) or taken from the tree of a whole cell (SOURCE_CELL). A
+   line that the line parser cannot convert, e.g., "if a is None:", is read
+   differently from the cell's tree, so the two never share an entry.
+   The speech segments of a streamed reading (SOURCE_SEGMENTS, see
+   jvox_screenreader.generate_stream) are cached as tuples of strings.
+'''
+
+# system packages
+import collections
+import re
+import threading
+
+# Version of the speech generation. Bump it when the generated speeches
+# change, so that cached speeches of an older version are never reused.
+SPEECH_VERSION = "1"
+
+# parse sources of a cached speech, see the module docstring
+SOURCE_LINE = "line"
+SOURCE_CELL = "cell"
+SOURCE_SEGMENTS = "segments"
+
+# default maximum number of statements kept in the cache
+DEFAULT_MAX_SIZE = 1024
+
+# spaces/tabs at the end of a statement, before an optional final newline
+_trailing_space_re = re.compile(r"[ \t]+(?=\n?$)")
+
+def normalize_statement(stmt):
+    '''
+    Normalize a statement (without its indentation) for speech generation
+    and caching: remove the spaces/tabs at its end
+    '''
+    return _trailing_space_re.sub("", stmt)
+
+def make_styles_key(speech_styles):
+    '''
+    Generate the style profile part of the cache key from a style selection
+    dict (ast node class -> style name)
+    '''
+    return tuple(sorted((node_class.__name__, style)
+                        for node_class, style in speech_styles.items()))
+
+class speech_result_cache:
+    '''
+    Size-bounded LRU cache of statement speeches keyed by (speech version,
+    parse source, normalized statement, style profile).
+
+    Hit/miss/eviction/invalidation counters are kept to evaluate the cache's
+    effectiveness. All operations are protected by a lock, so one instance
+    can be shared by all threads of a process.
+    '''
+
+    def __init__(self, max_size=DEFAULT_MAX_SIZE):
+        self.max_size = max_size
+        self.entries = collections.OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def make_key(self, stmt, styles_key, source=SOURCE_LINE):
+        '''
+        Generate the cache key for a normalized statement, a style profile and
+        a parse source
+        '''
+        return (SPEECH_VERSION, source, stmt, styles_key)
+
+    def get(self, stmt, styles_key, source=SOURCE_LINE):
+        '''
+        Return the cached speech of "stmt", or None if not cached.
+        '''
+        key = self.make_key(stmt, styles_key, source)
+        with self.lock:
+            speech = self.entries.get(key)
+            if speech is None:
+                self.misses += 1
+                return None
+
+            # hit, mark as most recently used
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return speech
+
+    def put(self, stmt, styles_key, speech, source=SOURCE_LINE):
+        '''
+        Add the speech of "stmt" to the cache, evicting the least recently
+        used entries if the cache is full.
+        '''
+        if self.max_size <= 0:
+            return
+
+        key = self.make_key(stmt, styles_key, source)
+        with self.lock:
+            self.entries[key] = speech
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self):
+        '''
+        Drop all cached speeches, e.g., after the style selection changed.
+        Counters are kept.
+        '''
+        with self.lock:
+            self.entries.clear()
+            self.invalidations += 1
+
+    def resize(self, max_size):
+        '''
+        Change the maximum number of cached statements
+        '''
+        with self.lock:
+            self.max_size = max_size
+            while len(self.entries) > max(self.max_size, 0):
+                self.entries.popitem(last=False)
+                self.evictions += 1
+
+    def stats(self):
+        '''
+        Return the cache statistics as a dictionary
+        '''
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {"size": len(self.entries),
+                    "max_size": self.max_size,
+                    "hits": self.hits,
+                    "misses": self.misses,
+                    "evictions": self.evictions,
+                    "invalidations": self.invalidations,
+                    "hit_rate": (self.hits / lookups) if lookups else 0.0,
+                    "speech_version": SPEECH_VERSION}
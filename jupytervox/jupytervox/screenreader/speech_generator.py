@@ -4,6 +4,7 @@ Module pyastvox: JupyterVox screen reader based on the Python AST module.
 
 # Python packages
 import ast
+import functools
 
 # Speech generation mixin classes, which have the actual implementation
 # for gen_ast_XXX functions
@@ -22,6 +23,72 @@ from .mixins import _class
 from .mixins import _loops
 
 from .speech_styles import pyastvox_speech_styles
+from . import speech_cache
+from . import subtree_memo
+
+class lazy_speech_dict(dict):
+  '''
+  A jvox_speech dict whose style speeches are generated on first access.
+  "style_funcs" maps each style name to a function that generates the speech
+  of that style and stores it in the dict. Checking whether a style exists
+  (e.g., "indirect" in node.jvox_speech) does not generate it.
+  '''
+  def __init__(self, style_funcs):
+    super().__init__()
+    self.style_funcs = dict(style_funcs)
+
+  def __missing__(self, key):
+    func = self.style_funcs.pop(key, None)
+    if func is None:
+      raise KeyError(key)
+    func()
+    return dict.__getitem__(self, key)
+
+  def __contains__(self, key):
+    return dict.__contains__(self, key) or key in self.style_funcs
+
+  def get(self, key, default=None):
+    return self[key] if key in self else default
+
+  def generate_all(self):
+    '''
+    Generate all styles not generated yet
+    '''
+    for key in list(self.style_funcs):
+      if key in self.style_funcs:
+        self[key]
+
+  # the whole-dict views see all styles
+  def keys(self):
+    self.generate_all()
+    return dict.keys(self)
+
+  def values(self):
+    self.generate_all()
+    return dict.values(self)
+
+  def items(self):
+    self.generate_all()
+    return dict.items(self)
+
+  def __iter__(self):
+    self.generate_all()
+    return dict.__iter__(self)
+
+  def __len__(self):
+    return dict.__len__(self) + len(self.style_funcs)
+
+  def __repr__(self):
+    self.generate_all()
+    return dict.__repr__(self)
+
+  def __eq__(self, other):
+    self.generate_all()
+    if isinstance(other, lazy_speech_dict):
+      other.generate_all()
+    return dict.__eq__(self, other)
+
+  __hash__ = None
 
 class pyastvox_speech_generator(_unit_types.unit_types_mixin,
                                 _binops.binops_mixin,
@@ -48,40 +115,193 @@ class pyastvox_speech_generator(_unit_types.unit_types_mixin,
   '''
   # fields
   speech_styles: dict  # speech styles for different type of nodes
+  lazy_styles: bool # generate a node's style speeches only when they are
+                    # read, i.e., only the styles reachable from the selected
+                    # styles. Otherwise, all styles are generated for every
+                    # node
+  lazy_max_depth = 100 # nodes deeper than this are generated eagerly, as
+                       # reading a lazy style of a deep node is recursive
+  memoize_subtrees: bool # reuse the speeches of structurally identical
+                         # subtrees generated before, see subtree_memo. Off
+                         # by default: hashing the subtrees costs about as
+                         # much as generating their speeches (see
+                         # test/benchmark/subtree_memo.py)
+  subtree_memo = None # the subtree_speech_memo instance
 
-  def __init__(self,
-               speech_styles=pyastvox_speech_styles.selected_styles):
-      self.speech_styles = speech_styles
+  def __init__(self, speech_styles=None, lazy_styles=True,
+               memoize_subtrees=False):
+      # each generator has its own copy of the styles, so that
+      # set_speech_style does not change the styles of other generators
+      if speech_styles is None:
+        speech_styles = pyastvox_speech_styles.selected_styles
+      self.speech_styles = dict(speech_styles)
+      self.lazy_styles = lazy_styles
+      self.lazy_this_call = lazy_styles
+      # ast node class -> gen_ast_XXX function, resolved once
+      self.dispatch_table = self.build_dispatch_table()
+      # functions called after set_speech_style, e.g., to invalidate the
+      # speeches cached with the old styles
+      self.style_change_listeners = []
+      self.memoize_subtrees = memoize_subtrees
+      self.subtree_memo = subtree_memo.subtree_speech_memo()
       
       return
 
-  def generate(self, node):
+  def generate(self, node, speech_styles=None):
     '''
     Main entrance function to generate the speech for a tree
     Essentially depth first traversal: visit all desendents, generate speech for
     each of them.
+
+    "speech_styles" overrides the generator's styles for this call only, e.g.,
+    for a per-request style selection on a shared generator.
+
+    The traversal uses an explicit stack instead of recursion, so deeply
+    nested expressions do not hit Python's recursion limit. Children are
+    generated before their parent, in field order.
+
+    With memoize_subtrees, a subtree whose shape was generated before with
+    the same styles gets a copy of the memoized speeches, and its children
+    are not visited.
     '''
-    
-    # visit all desendents, generate speech for each of them
-    for field, value in ast.iter_fields(node):
-      if isinstance(value, list):
-        for item in value:
-          if isinstance(item, ast.AST):
-            self.generate(item)
-      elif isinstance(value, ast.AST):
-        self.generate(value)
-
-    # generate speech for this level of node
-    func = self.resolve_func_name(node.__class__.__name__)
-    if func is None: # fail to find the function, use the generic function
-      self.gen_generic(node)
-    else: # found the function, call it
-      func(node)
-      # set selected style
-      self.set_selected_style_speech_for_node(node)
+    if speech_styles is None:
+      speech_styles = self.speech_styles
+
+    # lazily generated styles are generated recursively when read, so use
+    # eager generation for very deep trees
+    self.lazy_this_call = self.lazy_styles
+
+    memo = self.subtree_memo if self.memoize_subtrees else None
+    if memo is not None:
+      styles_key = speech_cache.make_styles_key(speech_styles)
+      shapes = memo.shape_ids(node)
+      # id(node) -> speech snapshot of the node's subtree, for this call
+      snapshots = {}
+
+    # stack of (node, depth); a negative depth marks a node whose children
+    # have been generated
+    stack = [(node, 1)]
+    while stack:
+      cur, depth = stack.pop()
+
+      if depth > 0:
+        # reuse the speeches of an identical subtree generated before
+        if memo is not None:
+          shape = shapes.get(id(cur))
+          if shape is not None and shape[1] >= memo.min_nodes:
+            snapshot = memo.get(shape, styles_key)
+            if snapshot is not None:
+              self.restore_speech(cur, snapshot)
+              snapshots[id(cur)] = snapshot
+              continue
+
+        # generate the children first; push them in reverse, so that they
+        # are popped in field order
+        stack.append((cur, -depth))
+        for field in reversed(cur._fields):
+          value = getattr(cur, field, None)
+          if isinstance(value, list):
+            for item in reversed(value):
+              if isinstance(item, ast.AST):
+                stack.append((item, depth + 1))
+          elif isinstance(value, ast.AST):
+            stack.append((value, depth + 1))
+
+        if depth > self.lazy_max_depth:
+          self.lazy_this_call = False
+        continue
+
+      # generate speech for this level of node
+      node_class = cur.__class__
+      try:
+        func = self.dispatch_table[node_class]
+      except KeyError:
+        func = self.resolve_func_name(node_class.__name__)
+        self.dispatch_table[node_class] = func
+
+      if func is None: # fail to find the function, use the generic function
+        self.gen_generic(cur)
+      else: # found the function, call it
+        func(cur)
+        # set selected style
+        self.set_selected_style_speech_for_node(cur, speech_styles)
+
+      # memoize the speeches of this subtree
+      if memo is not None and id(cur) in shapes:
+        snapshot = self.snapshot_speech(cur, snapshots)
+        if snapshot is not None:
+          snapshots[id(cur)] = snapshot
+          shape = shapes[id(cur)]
+          if shape[1] >= memo.min_nodes:
+            memo.put(shape, styles_key, snapshot)
+
+    return
+
+  def snapshot_speech(self, node, snapshots):
+    '''
+    Make the memo entry of the subtree of "node", from the node's speeches
+    and the entries of its children in "snapshots". The entry is a tuple of
+    (generated style speeches, not yet generated style functions, jvox_data,
+    children entries). Return None if a child has no entry.
+    '''
+    children = []
+    for child in subtree_memo.child_nodes(node):
+      child_snapshot = snapshots.get(id(child))
+      if child_snapshot is None:
+        return None
+      children.append(child_snapshot)
+
+    speech = node.jvox_speech
+    style_funcs = None
+    if isinstance(speech, lazy_speech_dict) and speech.style_funcs:
+      # the functions are rebound to the node on restore, which only works
+      # for functions of this node (gen_generic shares a child's speeches)
+      if all(func.args[0] is node for func in speech.style_funcs.values()):
+        style_funcs = {style: func.func
+                       for style, func in speech.style_funcs.items()}
+      else:
+        speech.generate_all()
+
+    data = getattr(node, "jvox_data", None)
+    return (dict(dict.items(speech)), style_funcs,
+            dict(data) if data is not None else None, tuple(children))
+
+  def restore_speech(self, node, snapshot):
+    '''
+    Set the speeches of the subtree of "node" from a memo entry made by
+    snapshot_speech for a subtree of the same shape. Each node gets its own
+    copy, and the not yet generated styles are generated for this node.
+    '''
+    stack = [(node, snapshot)]
+    while stack:
+      cur, (speech, style_funcs, data, children) = stack.pop()
+      if style_funcs:
+        cur.jvox_speech = lazy_speech_dict(
+          {style: functools.partial(func, cur)
+           for style, func in style_funcs.items()})
+        dict.update(cur.jvox_speech, speech)
+      else:
+        cur.jvox_speech = dict(speech)
+      if data is not None:
+        cur.jvox_data = dict(data)
+      stack.extend(zip(subtree_memo.child_nodes(cur), children))
 
     return
 
+  def build_dispatch_table(self):
+    '''
+    Build the table of ast node class -> gen_ast_XXX function (None if not
+    implemented) for the ast node classes. Other classes are added on their
+    first visit.
+    '''
+    table = {}
+    for name in dir(ast):
+      node_class = getattr(ast, name)
+      if isinstance(node_class, type) and issubclass(node_class, ast.AST):
+        table[node_class] = self.resolve_func_name(name)
+
+    return table
+
   def resolve_func_name(self, node_type: str):
     '''
     find the speech gen function given a tree node class name. For an ast.XXX
@@ -98,11 +318,32 @@ class pyastvox_speech_generator(_unit_types.unit_types_mixin,
       # does not exist
       return None
 
+  def gen_styles(self, node, style_funcs):
+    '''
+    Generate the speeches of the styles of a node with several styles, e.g.,
+    ast.BinOp. "style_funcs" maps each style name to its generation function,
+    e.g., {"default": self.gen_ast_BinOp_style_default}, in generation
+    order. With lazy_styles, a style is only generated when it is read,
+    e.g., when it is the selected style or a parent's style reads it.
+    '''
+    if self.lazy_this_call:
+      node.jvox_speech = lazy_speech_dict(
+        {style: functools.partial(func, node)
+         for style, func in style_funcs.items()})
+    else:
+      node.jvox_speech = {}
+      for func in style_funcs.values():
+        func(node)
+
+    return
+
   def set_speech_style(self, node_class, style:str):
     '''
     Set speech style for a type of AST node (i.e., ast node class)
     '''
     self.speech_styles[node_class] = style
+    for listener in self.style_change_listeners:
+      listener()
     return
 
   def get_speech_style(self, node_class):
@@ -111,20 +352,23 @@ class pyastvox_speech_generator(_unit_types.unit_types_mixin,
     '''
     return self.speech_styles[node_class]
 
-  def set_selected_style_speech_for_node(self, node):
+  def set_selected_style_speech_for_node(self, node, speech_styles=None):
     '''
     This function is called automatically after each gen_ast_XXX function
     to select the "selected_style" field of jvox_speech.
     If user does not set the speech style for a type of node, "default" is
     used.
     '''
-    if node.__class__ in self.speech_styles:
+    if speech_styles is None:
+      speech_styles = self.speech_styles
+
+    if node.__class__ in speech_styles:
       # user selects a style, use that style
-      if self.speech_styles[node.__class__] in node.jvox_speech:
+      if speech_styles[node.__class__] in node.jvox_speech:
         node.jvox_speech["selected_style"] = (
-          node.jvox_speech[self.speech_styles[node.__class__]])
+          node.jvox_speech[speech_styles[node.__class__]])
       else:
-        raise ValueError(f"Style \"{self.speech_styles[node.__class__]}\" has "
+        raise ValueError(f"Style \"{speech_styles[node.__class__]}\" has "
                          f"not been generated for node {node}")
     else:
       # user does not select a style, use "default"
@@ -6,9 +6,11 @@
 #
 # If a node type does not have selected style, then default will be used.
 #
-# Note that all styles will be generated, the selection should only happen at
-# after all speech styles are generated. This is because the complex
-# inter-dependency between styles. 
+# Note that the selection should only happen after the speech styles are
+# generated, because of the complex inter-dependency between styles. With the
+# generator's lazy_styles (the default), a node's styles are generated when
+# they are read, so only the styles reachable from the selected styles are
+# generated.
 
 import ast
 
@@ -45,4 +47,34 @@ class pyastvox_speech_styles:
         ast.Break: "default",
         ast.Return: "default",
     }
-    
+
+
+def make_speech_styles(overrides=None, base=None):
+    '''
+    Return a new style selection: "base" updated with "overrides". Neither
+    "base" nor the selected_styles dict above is changed.
+
+    Input parameters:
+    1. overrides: dict of node type -> style name. A node type can be an ast
+       node class (e.g., ast.BinOp) or its name (e.g., "BinOp").
+    2. base: the style selection to start from, e.g., a generator's
+       speech_styles; None for the selected_styles above
+
+    Return: the new style selection dict
+    '''
+    if base is None:
+        base = pyastvox_speech_styles.selected_styles
+    styles = dict(base)
+    if overrides is None:
+        return styles
+
+    for node_type, style in overrides.items():
+        if isinstance(node_type, str):
+            node_class = getattr(ast, node_type, None)
+            if not (isinstance(node_class, type) and
+                    issubclass(node_class, ast.AST)):
+                raise ValueError(f"Unknown AST node type: {node_type}")
+            node_type = node_class
+        styles[node_type] = style
+
+    return styles
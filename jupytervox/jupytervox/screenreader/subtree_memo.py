@@ -0,0 +1,205 @@
+'''
+Memo table of the speeches of AST subtrees, shared across statements.
+
+The same subexpressions recur across the lines of a program, e.g.,
+"len(board[row])", "self.balance" or "i + 1". Their speeches only depend on
+their structure and on the selected styles, so the speech generator keeps the
+speeches of the subtrees it generated in this table, and reuses them for
+structurally identical subtrees of later statements (and cells).
+
+Subtrees are hash-consed: each distinct node shape, i.e., the node class, its
+primitive fields (e.g., a name or a constant) and the shape ids of its
+children, is interned to a small integer id. The ids are computed bottom-up,
+so finding the shape of every node of a tree is linear in the tree's size.
+The memo is a size-bounded LRU table keyed by (shape id, style profile).
+'''
+
+# system packages
+import ast
+import collections
+import threading
+
+# default maximum number of subtrees kept in the memo
+DEFAULT_MAX_SIZE = 4096
+
+# default maximum number of interned shapes. The shape table is cleared (with
+# the memo) when it grows larger
+DEFAULT_MAX_SHAPES = 65536
+
+# subtrees with fewer nodes than this are cheaper to generate than to look up
+DEFAULT_MIN_NODES = 3
+
+def child_nodes(node):
+  '''
+  Return the AST children of "node" in field order, i.e., the order in which
+  the speech generator visits them
+  '''
+  children = []
+  for field in node._fields:
+    value = getattr(node, field, None)
+    if isinstance(value, list):
+      for item in value:
+        if isinstance(item, ast.AST):
+          children.append(item)
+    elif isinstance(value, ast.AST):
+      children.append(value)
+
+  return children
+
+class subtree_speech_memo:
+  '''
+  Size-bounded LRU memo of subtree speeches keyed by (shape id, style
+  profile). The memo stores the entries (speech snapshots) made by the speech
+  generator, it does not look into them.
+
+  Hit/miss/eviction counters are kept to evaluate the memo's effectiveness.
+  All operations are protected by a lock, so one instance can be shared by
+  all threads of a process.
+  '''
+
+  def __init__(self, max_size=DEFAULT_MAX_SIZE, max_shapes=DEFAULT_MAX_SHAPES,
+               min_nodes=DEFAULT_MIN_NODES):
+    self.max_size = max_size
+    self.max_shapes = max_shapes
+    self.min_nodes = min_nodes
+    self.entries = collections.OrderedDict()
+    self.shapes = {} # shape tuple -> shape id
+    self.next_shape_id = 0
+    self.lock = threading.Lock()
+    self.hits = 0
+    self.misses = 0
+    self.evictions = 0
+    self.nodes_reused = 0
+
+  def shape_ids(self, tree):
+    '''
+    Intern the shapes of all nodes of "tree".
+
+    Return
+      A dict of id(node) -> (shape id, number of nodes in the subtree). Nodes
+      with unhashable fields, and their ancestors, are left out.
+    '''
+    result = {}
+    # stack of (node, children done); children are interned before parents
+    stack = [(tree, False)]
+    with self.lock:
+      if len(self.shapes) > self.max_shapes:
+        # the ids in the memo keys refer to the old shapes, drop both
+        self.shapes.clear()
+        self.entries.clear()
+
+      while stack:
+        node, children_done = stack.pop()
+        if not children_done:
+          stack.append((node, True))
+          for field in node._fields:
+            value = getattr(node, field, None)
+            if isinstance(value, list):
+              for item in value:
+                if isinstance(item, ast.AST):
+                  stack.append((item, False))
+            elif isinstance(value, ast.AST):
+              stack.append((value, False))
+          continue
+
+        fields = []
+        size = 1
+        memoizable = True
+        for field in node._fields:
+          value = getattr(node, field, None)
+          if isinstance(value, ast.AST):
+            values = (value,)
+          elif isinstance(value, list):
+            values = value
+            fields.append(len(value))
+          else:
+            # primitive fields keep their type, so that 1, 1.0 and True differ
+            fields.append((value.__class__, value))
+            continue
+
+          for item in values:
+            if isinstance(item, ast.AST):
+              child = result.get(id(item))
+              if child is None:
+                memoizable = False
+                break
+              fields.append(child[0])
+              size += child[1]
+            else:
+              fields.append((item.__class__, item))
+          if not memoizable:
+            break
+
+        if not memoizable:
+          continue
+
+        shape = (node.__class__, tuple(fields))
+        try:
+          shape_id = self.shapes.get(shape)
+        except TypeError:
+          # unhashable primitive field
+          continue
+        if shape_id is None:
+          shape_id = self.next_shape_id
+          self.next_shape_id += 1
+          self.shapes[shape] = shape_id
+        result[id(node)] = (shape_id, size)
+
+    return result
+
+  def get(self, shape, styles_key):
+    '''
+    Return the memo entry of a subtree, or None if not memoized. "shape" is
+    the (shape id, size) of the subtree's root from shape_ids.
+    '''
+    key = (shape[0], styles_key)
+    with self.lock:
+      entry = self.entries.get(key)
+      if entry is None:
+        self.misses += 1
+        return None
+
+      # hit, mark as most recently used
+      self.entries.move_to_end(key)
+      self.hits += 1
+      self.nodes_reused += shape[1]
+      return entry
+
+  def put(self, shape, styles_key, entry):
+    '''
+    Add the memo entry of a subtree, evicting the least recently used entries
+    if the memo is full.
+    '''
+    if self.max_size <= 0:
+      return
+
+    key = (shape[0], styles_key)
+    with self.lock:
+      self.entries[key] = entry
+      self.entries.move_to_end(key)
+      while len(self.entries) > self.max_size:
+        self.entries.popitem(last=False)
+        self.evictions += 1
+
+  def clear(self):
+    '''
+    Drop all memoized subtrees and interned shapes. Counters are kept.
+    '''
+    with self.lock:
+      self.entries.clear()
+      self.shapes.clear()
+
+  def stats(self):
+    '''
+    Return the memo statistics as a dictionary
+    '''
+    with self.lock:
+      lookups = self.hits + self.misses
+      return {"size": len(self.entries),
+              "max_size": self.max_size,
+              "shapes": len(self.shapes),
+              "hits": self.hits,
+              "misses": self.misses,
+              "evictions": self.evictions,
+              "nodes_reused": self.nodes_reused,
+              "hit_rate": (self.hits / lookups) if lookups else 0.0}
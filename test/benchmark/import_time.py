@@ -0,0 +1,89 @@
+#!/usr/bin/python3
+
+# Import-time benchmark for jupytervox.interface.jvox_interface.
+# Each run imports the module in a fresh Python process. A first, unmeasured
+# run writes the bytecode caches, so that the runs measure the import as a
+# server sees it, not the compilation of the sources. The benchmark fails
+# (exit code 1) if the median import time exceeds the budget, or if the
+# import eagerly loads any of the heavy modules (AI backends, TTS, ANTLR4
+# parser, TOML configuration), which should only be loaded on first use.
+
+# system packages
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+# heavy modules that should not be loaded by importing jvox_interface
+heavy_modules = ["google.genai", "requests", "gtts", "antlr4",
+                 "jupytervox.parser.antlr_parser.Python3Parser", "tomllib"]
+
+# code run in the fresh process: import the module and report the import
+# time and the heavy modules loaded
+probe_code = '''
+import json, sys, time
+start = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - start
+heavy = [m for m in {heavy_modules!r} if m in sys.modules]
+print(json.dumps({{"ms": elapsed * 1000, "heavy": heavy}}))
+'''
+
+def measure_once(module, python_path):
+    '''
+    Import "module" in a fresh process, return the import time in ms and the
+    list of heavy modules loaded
+    '''
+    env = dict(os.environ)
+    # use (and write) the bytecode caches
+    env.pop("PYTHONDONTWRITEBYTECODE", None)
+    env["PYTHONPATH"] = python_path + os.pathsep + env.get("PYTHONPATH", "")
+    code = probe_code.format(module=module, heavy_modules=heavy_modules)
+    result = subprocess.run([sys.executable, "-c", code], env=env,
+                            capture_output=True, text=True, check=True)
+    data = json.loads(result.stdout.strip().splitlines()[-1])
+    return data["ms"], data["heavy"]
+
+# parse the input
+parser = argparse.ArgumentParser(description='Import-time benchmark for JVox')
+default_path = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                            "../../jupytervox")
+parser.add_argument('-m', '--module', dest='module',
+                    default='jupytervox.interface.jvox_interface',
+                    help='the module to import')
+parser.add_argument('-b', '--budget', dest='budget', type=float, default=20.0,
+                    help='import time budget in milliseconds (default 20)')
+parser.add_argument('-n', '--runs', dest='runs', type=int, default=5,
+                    help='number of runs (default 5)')
+parser.add_argument('-p', '--path', dest='python_path', default=default_path,
+                    help='path to the jupytervox package')
+args = parser.parse_args()
+
+# warm-up run, writes the bytecode caches
+measure_once(args.module, os.path.abspath(args.python_path))
+
+times = []
+loaded_heavy = set()
+for i in range(args.runs):
+    ms, heavy = measure_once(args.module, os.path.abspath(args.python_path))
+    times.append(ms)
+    loaded_heavy.update(heavy)
+
+median_ms = statistics.median(times)
+print(f"Import {args.module}: median {median_ms:.1f} ms, "
+      f"min {min(times):.1f} ms, max {max(times):.1f} ms "
+      f"over {args.runs} runs (budget {args.budget:.1f} ms)")
+
+failed = False
+if median_ms > args.budget:
+    print("FAILED: median import time exceeds the budget")
+    failed = True
+if len(loaded_heavy) > 0:
+    print(f"FAILED: heavy modules loaded eagerly: {sorted(loaded_heavy)}")
+    failed = True
+
+if failed:
+    sys.exit(1)
+print("Passed.")
@@ -0,0 +1,173 @@
+#!/usr/bin/python3
+
+# Benchmark for lazy per-style speech generation.
+# Parses the statements of the screenreader test case files once, then times
+# the speech generation of the parsed trees with all styles generated for
+# every node (eager) and with only the styles reachable from the selected
+# styles (lazy). Both must give the same speeches. Deeply nested expressions,
+# where the saving is the largest, are timed as well.
+
+# system packages
+import argparse
+import ast
+import contextlib
+import glob
+import io
+import os
+import statistics
+import sys
+import time
+
+# import modules from the jupytervox package
+from jupytervox.screenreader import jvox_screenreader
+from jupytervox.screenreader.speech_generator import lazy_speech_dict
+
+def read_statements(file_names):
+    '''
+    Read the statements of the test case files, skipping empty lines,
+    comments and the test case markers
+    '''
+    stmts = []
+    for file_name in file_names:
+        with open(file_name, "r") as f:
+            for line in f:
+                line = line.rstrip("\n")
+                if (line.strip() == "" or line.lstrip().startswith("#") or
+                    line.startswith("<<<<<<") or line.startswith(">>>>>>")):
+                    continue
+                stmts.append(line.lstrip())
+    return stmts
+
+def parse_statements(reader, stmts):
+    '''
+    Parse the statements, return the (statement, tree) pairs of the
+    statements that can be parsed and read
+    '''
+    trees = []
+    for stmt in stmts:
+        try:
+            # the parsers print their errors
+            with contextlib.redirect_stdout(io.StringIO()):
+                tree = reader.parse_statement(stmt)
+                reader.vox_gen.generate(tree)
+        except Exception:
+            continue
+        if "selected_style" in tree.jvox_speech:
+            trees.append((stmt, tree))
+    return trees
+
+def count_generated_styles(tree):
+    '''
+    Count the style speeches generated in a tree (excluding
+    "selected_style"), and the ones left not generated
+    '''
+    generated = 0
+    skipped = 0
+    seen = set()
+    for node in ast.walk(tree):
+        speech = getattr(node, "jvox_speech", None)
+        if speech is None or id(speech) in seen:
+            continue
+        seen.add(id(speech))
+        generated += sum(1 for k in dict.keys(speech) if k != "selected_style")
+        if isinstance(speech, lazy_speech_dict):
+            skipped += len(speech.style_funcs)
+    return generated, skipped
+
+def time_generation(reader, trees, repeat):
+    '''
+    Time the speech generation of all trees, return the median time in ms of
+    "repeat" runs and the speeches
+    '''
+    times = []
+    speeches = []
+    for i in range(repeat):
+        speeches = []
+        start = time.perf_counter()
+        for stmt, tree in trees:
+            reader.vox_gen.generate(tree)
+            speeches.append(tree.jvox_speech["selected_style"])
+        times.append((time.perf_counter() - start) * 1000)
+    return statistics.median(times), speeches
+
+# parse the input
+parser = argparse.ArgumentParser(
+    description='Benchmark for lazy per-style speech generation')
+default_files = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                             "../screenreader/*.txt")
+parser.add_argument('-f', '--files', dest='files', default=default_files,
+                    help='glob of the test case files '
+                    '(default test/screenreader/*.txt)')
+parser.add_argument('-r', '--repeat', dest='repeat', type=int, default=20,
+                    help='number of timed runs (default 20)')
+parser.add_argument('-d', '--max-depth', dest='max_depth', type=int,
+                    default=40,
+                    help='also time nested expressions up to this depth, '
+                    '0 to skip (default 40)')
+args = parser.parse_args()
+
+file_names = sorted(glob.glob(args.files))
+if len(file_names) == 0:
+    print("No test case files found:", args.files)
+    sys.exit(1)
+
+def deep_statements(max_depth):
+    '''
+    Generate assignments of nested arithmetic expressions, e.g.,
+    "x = ((a + b0) * c0 + b1) * c1", up to "max_depth" levels
+    '''
+    stmts = []
+    depth = 5
+    while depth <= max_depth:
+        stmts.append("x = " + "(" * depth + "a" +
+                     "".join(f" + b{i}) * c{i}" for i in range(depth)))
+        depth *= 2
+    return stmts
+
+def run_benchmark(label, reader, trees, repeat):
+    '''
+    Time the eager and lazy generation of the trees, return True if both
+    give the same speeches
+    '''
+    reader.vox_gen.lazy_styles = False
+    eager_ms, eager_speeches = time_generation(reader, trees, repeat)
+    eager_styles = sum(count_generated_styles(tree)[0]
+                       for stmt, tree in trees)
+
+    reader.vox_gen.lazy_styles = True
+    lazy_ms, lazy_speeches = time_generation(reader, trees, repeat)
+    lazy_counts = [count_generated_styles(tree) for stmt, tree in trees]
+    lazy_styles = sum(c[0] for c in lazy_counts)
+    skipped_styles = sum(c[1] for c in lazy_counts)
+
+    print(f"{label}:")
+    print(f"  Eager: {eager_ms:.2f} ms, {eager_styles} style speeches "
+          "generated")
+    print(f"  Lazy:  {lazy_ms:.2f} ms, {lazy_styles} style speeches "
+          f"generated, {skipped_styles} skipped")
+    print(f"  Saving: {(1 - lazy_ms / eager_ms) * 100:.1f}% of the "
+          "generation time")
+
+    passed = True
+    for (stmt, tree), a, b in zip(trees, eager_speeches, lazy_speeches):
+        if a != b:
+            print(f"FAILED: different speeches for {stmt!r}:\n  {a}\n  {b}")
+            passed = False
+    return passed
+
+reader = jvox_screenreader()
+stmts = read_statements(file_names)
+trees = parse_statements(reader, stmts)
+print(f"{len(trees)} of {len(stmts)} statements from {len(file_names)} "
+      "files parsed")
+passed = run_benchmark("Test case files", reader, trees, args.repeat)
+
+if args.max_depth > 0:
+    deep_trees = parse_statements(reader, deep_statements(args.max_depth))
+    passed = run_benchmark(f"Nested expressions (up to {args.max_depth} "
+                           "levels)", reader, deep_trees,
+                           args.repeat) and passed
+
+if not passed:
+    sys.exit(1)
+print("Passed.")
@@ -0,0 +1,129 @@
+#!/usr/bin/python3
+
+# Benchmark for the subtree speech memo.
+# Parses the lines of the larger test programs once, then times the speech
+# generation of all lines without the memo, with a memo that starts empty
+# (reuse across the lines of the programs) and with a warm memo (re-reading
+# the programs). All must give the same speeches.
+
+# system packages
+import argparse
+import contextlib
+import io
+import os
+import statistics
+import sys
+import time
+
+# import modules from the jupytervox package
+from jupytervox.screenreader import jvox_screenreader
+
+def read_statements(file_names):
+    '''
+    Read the lines of the test programs, skipping empty lines and comments
+    '''
+    stmts = []
+    for file_name in file_names:
+        with open(file_name, "r") as f:
+            for line in f:
+                line = line.rstrip("\n")
+                if line.strip() == "" or line.lstrip().startswith("#"):
+                    continue
+                stmts.append(line.lstrip())
+    return stmts
+
+def parse_statements(reader, stmts):
+    '''
+    Parse the statements, return the (statement, tree) pairs of the
+    statements that can be parsed and read
+    '''
+    trees = []
+    for stmt in stmts:
+        try:
+            # the parsers print their errors
+            with contextlib.redirect_stdout(io.StringIO()):
+                tree = reader.parse_statement(stmt)
+                reader.vox_gen.generate(tree)
+        except Exception:
+            continue
+        if "selected_style" in tree.jvox_speech:
+            trees.append((stmt, tree))
+    return trees
+
+def time_generation(reader, trees, repeat, clear_memo):
+    '''
+    Time the speech generation of all trees, return the median time in ms of
+    "repeat" runs and the speeches. If "clear_memo" is true, the memo is
+    emptied before each run.
+    '''
+    times = []
+    speeches = []
+    for i in range(repeat):
+        if clear_memo:
+            reader.vox_gen.subtree_memo.clear()
+        speeches = []
+        start = time.perf_counter()
+        for stmt, tree in trees:
+            reader.vox_gen.generate(tree)
+            speeches.append(tree.jvox_speech["selected_style"])
+        times.append((time.perf_counter() - start) * 1000)
+    return statistics.median(times), speeches
+
+# parse the input
+parser = argparse.ArgumentParser(
+    description='Benchmark for the subtree speech memo')
+test_case_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                             "../parser/test_cases")
+default_files = [os.path.join(test_case_dir, f) for f in
+                 ["blackjack.py", "sudoku_solver.py",
+                  "netflix_recommendation.py"]]
+parser.add_argument('files', nargs='*', default=default_files,
+                    help='test programs (default blackjack.py, '
+                    'sudoku_solver.py and netflix_recommendation.py in '
+                    'test/parser/test_cases)')
+parser.add_argument('-r', '--repeat', dest='repeat', type=int, default=20,
+                    help='number of timed runs (default 20)')
+args = parser.parse_args()
+
+reader = jvox_screenreader()
+stmts = read_statements(args.files)
+trees = parse_statements(reader, stmts)
+print(f"{len(trees)} of {len(stmts)} lines from {len(args.files)} files "
+      "parsed")
+
+reader.vox_gen.memoize_subtrees = False
+plain_ms, plain_speeches = time_generation(reader, trees, args.repeat, False)
+
+reader.vox_gen.memoize_subtrees = True
+cold_ms, cold_speeches = time_generation(reader, trees, args.repeat, True)
+
+# statistics of a single run with an empty memo
+memo = reader.vox_gen.subtree_memo
+memo.clear()
+before = memo.stats()
+time_generation(reader, trees, 1, False)
+after = memo.stats()
+hits = after["hits"] - before["hits"]
+lookups = hits + after["misses"] - before["misses"]
+nodes_reused = after["nodes_reused"] - before["nodes_reused"]
+
+warm_ms, warm_speeches = time_generation(reader, trees, args.repeat, False)
+
+print(f"No memo:    {plain_ms:.2f} ms")
+print(f"Empty memo: {cold_ms:.2f} ms, saving "
+      f"{(1 - cold_ms / plain_ms) * 100:.1f}%; {hits} of {lookups} subtree "
+      f"lookups hit, {nodes_reused} nodes reused")
+print(f"Warm memo:  {warm_ms:.2f} ms, saving "
+      f"{(1 - warm_ms / plain_ms) * 100:.1f}%")
+
+passed = True
+for (stmt, tree), a, b, c in zip(trees, plain_speeches, cold_speeches,
+                                 warm_speeches):
+    if not (a == b == c):
+        print(f"FAILED: different speeches for {stmt!r}:\n  {a}\n  {b}\n"
+              f"  {c}")
+        passed = False
+
+if not passed:
+    sys.exit(1)
+print("Passed.")
@@ -0,0 +1,148 @@
+#!/usr/bin/python3
+
+# Checks of jupytervox.commons.audio_cache: the in-memory and on-disk tiers,
+# their size limits and eviction, pinning, and the privacy checks of the on-disk
+# store's directory.
+
+# system packages
+import os
+import sys
+import tempfile
+import threading
+import time
+
+# import modules from the jupytervox package
+from jupytervox.commons import audio_cache
+
+failures = []
+
+def check(name, condition):
+    print(("PASS" if condition else "FAIL") + ": " + name)
+    if not condition:
+        failures.append(name)
+
+settings = {"engine": "fake", "lang": "en"}
+
+with tempfile.TemporaryDirectory() as tmp_dir:
+    # memory tier: LRU with an entry limit
+    cache = audio_cache.audio_cache(memory_max_entries=2)
+    cache.put("a", settings, b"audio a")
+    cache.put("b", settings, b"audio b")
+    cache.get("a", settings)  # "a" is now the most recently used
+    cache.put("c", settings, b"audio c")
+    check("memory LRU evicts the least recently used",
+          cache.get("b", settings) is None and
+          cache.get("a", settings) == b"audio a")
+    stats = cache.stats()
+    check("memory eviction is counted", stats["memory_evictions"] == 1)
+    check("memory hits and misses are counted",
+          stats["memory_hits"] == 2 and stats["misses"] == 1)
+
+    # memory tier: byte limit, a clip larger than the limit is not kept
+    cache = audio_cache.audio_cache(memory_max_bytes=4)
+    cache.put("big", settings, b"12345")
+    check("clips over the memory limit are not kept in memory",
+          cache.get("big", settings) is None)
+
+    # different settings never share an entry
+    check("the key depends on the settings",
+          audio_cache.make_audio_key("a", settings) !=
+          audio_cache.make_audio_key("a", {"engine": "gtts", "lang": "en"}))
+
+    # disk tier: shared by caches on the same directory, and promoted to
+    # memory on a hit
+    disk_dir = os.path.join(tmp_dir, "store")
+    cache = audio_cache.audio_cache(disk_dir=disk_dir)
+    check("the store is created private",
+          (os.stat(disk_dir).st_mode & 0o777) == 0o700)
+    cache.put("a", settings, b"audio a")
+    other = audio_cache.audio_cache(disk_dir=disk_dir)
+    check("the disk tier is shared", other.get("a", settings) == b"audio a")
+    check("disk hits are promoted to memory",
+          other.get("a", settings) == b"audio a" and
+          other.stats()["disk_hits"] == 1 and
+          other.stats()["memory_hits"] == 1)
+    key = audio_cache.make_audio_key("a", settings)
+    check("audio is served by key", other.get_by_key(key) == b"audio a")
+    check("bad keys are rejected", other.get_by_key("../" + key) is None)
+
+    # disk tier: eviction down to 90% of the limit
+    cache = audio_cache.audio_cache(memory_max_entries=0,
+                                    disk_dir=os.path.join(tmp_dir, "small"),
+                                    disk_max_bytes=100)
+    for i in range(20):
+        cache.put(str(i), settings, bytes(10))
+    stats = cache.stats()
+    check("the disk tier is kept within its limit",
+          stats["disk_bytes"] <= 100 and stats["disk_evictions"] > 0)
+
+    # the store must be private
+    shared_dir = os.path.join(tmp_dir, "shared")
+    os.mkdir(shared_dir)
+    os.chmod(shared_dir, 0o777)
+    try:
+        audio_cache.audio_cache(disk_dir=shared_dir)
+        rejected = False
+    except OSError:
+        rejected = True
+    check("a store accessible by others is rejected", rejected)
+
+    link_dir = os.path.join(tmp_dir, "link")
+    os.symlink(disk_dir, link_dir)
+    try:
+        audio_cache.audio_cache(disk_dir=link_dir)
+        rejected = False
+    except OSError:
+        rejected = True
+    check("a symbolic link store is rejected", rejected)
+
+    # pinned audio is served once even if it is not in the tiers
+    cache = audio_cache.audio_cache(memory_max_bytes=4)
+    key = audio_cache.make_audio_key("big", settings)
+    check("audio is pinned", cache.pin(key, b"12345"))
+    check("pinned audio is served", cache.get_by_key(key) == b"12345")
+    check("pinned audio is released after the fetch",
+          cache.get_by_key(key) is None)
+    cache = audio_cache.audio_cache(pinned_max_entries=0)
+    check("pinning can be disabled", not cache.pin(key, b"12345"))
+
+    # get_or_synthesize only synthesizes on a miss
+    calls = []
+    def synthesize(text):
+        calls.append(text)
+        return text.encode()
+    cache = audio_cache.audio_cache()
+    cache.get_or_synthesize("x", settings, synthesize)
+    cache.get_or_synthesize("x", settings, synthesize)
+    check("audio is synthesized once", calls == ["x"])
+
+    # a get_or_synthesize waiting on another synthesis of pinned audio does
+    # not release the pin: the hash GET still gets the audio after eviction
+    cache = audio_cache.audio_cache()
+    key = audio_cache.make_audio_key("p", settings)
+    cache.pin(key, b"p")
+    release = threading.Event()
+    def slow_synthesize(text):
+        release.wait()
+        return text.encode()
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(
+                   cache.get_or_synthesize("p", settings, slow_synthesize)))
+               for i in range(2)]
+    for thread in threads:
+        thread.start()
+    # both calls missed, so one synthesizes and the other waits on it
+    while cache.stats()["misses"] < 2:
+        time.sleep(0.01)
+    time.sleep(0.05)
+    release.set()
+    for thread in threads:
+        thread.join()
+    cache.clear_memory()
+    check("concurrent calls get the audio", results == [b"p", b"p"])
+    check("a waiting call keeps the pin", cache.get_by_key(key) == b"p")
+
+print(f"Failed: {len(failures)}")
+
+if failures:
+    sys.exit(1)
@@ -0,0 +1,98 @@
+#!/usr/bin/python3
+
+# Checks of jupytervox.commons.phrase_clips: splitting token-by-token
+# speeches into vocabulary phrases, frame-level concatenation of WAV and MP3
+# clips, and the assembly of a reading from cached clips with the fake TTS
+# engine.
+
+# system packages
+import io
+import sys
+import wave
+
+# import modules from the jupytervox package
+from jupytervox.commons import audio_cache
+from jupytervox.commons import phrase_clips
+from jupytervox.commons.tts_backend import fake_interface
+
+failures = []
+
+def check(name, condition):
+    print(("PASS" if condition else "FAIL") + ": " + name)
+    if not condition:
+        failures.append(name)
+
+def wav_frames(audio):
+    with wave.open(io.BytesIO(audio), "rb") as wav:
+        return wav.readframes(wav.getnframes())
+
+# splitting: vocabulary phrases are separate pieces, the other words are
+# grouped, and each comma is a pause
+check("phrases and identifiers are split",
+      phrase_clips.split_speech("foo bar, equals, baz, left paren") ==
+      ["foo bar", None, "equals", None, "baz", None, "left paren"])
+check("the longest phrase wins",
+      phrase_clips.split_speech("function call with arguments x") ==
+      ["function call", "with arguments", "x"])
+check("empty segments have no pause",
+      phrase_clips.split_speech(", x,, y,") == ["x", None, "y"])
+check("keywords are phrases",
+      phrase_clips.split_speech("for i in range") ==
+      ["for", "i", "in", "range"])
+
+# WAV concatenation: the frames follow each other, with a silence of
+# pause_ms for each pause
+clip_a = fake_interface.synthesize("a")
+clip_b = fake_interface.synthesize("bb")
+pause_ms = 100
+joined = phrase_clips.concat_audio([clip_a, None, clip_b], "audio/wav",
+                                   pause_ms)
+silence = b"\x80" * (fake_interface.sample_rate * pause_ms // 1000)
+check("WAV frames are concatenated with a pause",
+      wav_frames(joined) ==
+      wav_frames(clip_a) + silence + wav_frames(clip_b))
+
+other_fp = io.BytesIO()
+with wave.open(other_fp, "wb") as other:
+    other.setnchannels(1)
+    other.setsampwidth(2)
+    other.setframerate(16000)
+    other.writeframes(b"\x00\x00" * 10)
+try:
+    phrase_clips.concat_audio([clip_a, other_fp.getvalue()], "audio/wav")
+    rejected = False
+except ValueError:
+    rejected = True
+check("WAV clips of different formats are rejected", rejected)
+
+# MP3 concatenation: the ID3 tags are stripped, pauses are dropped
+frame = b"\xff\xfb\x90\x00" + bytes(20)
+id3v2 = b"ID3\x04\x00\x00\x00\x00\x00\x05" + bytes(5)
+id3v1 = b"TAG" + bytes(125)
+check("MP3 clips are joined without ID3 tags",
+      phrase_clips.concat_audio([id3v2 + frame, None, frame + id3v1],
+                                "audio/mpeg") == frame + frame)
+
+# assembly: the clips are synthesized once and reused from the cache
+calls = []
+def synthesize(text):
+    calls.append(text)
+    return fake_interface.synthesize(text)
+
+cache = audio_cache.audio_cache()
+settings = fake_interface.voice_settings()
+speech = "x, equals, y"
+audio = phrase_clips.assemble(speech, settings, synthesize, cache,
+                              fake_interface.mime_type, pause_ms)
+expected = phrase_clips.concat_audio(
+    [fake_interface.synthesize("x"), None, fake_interface.synthesize("equals"),
+     None, fake_interface.synthesize("y")], "audio/wav", pause_ms)
+check("the assembled audio is the concatenated clips", audio == expected)
+phrase_clips.assemble("y, equals, x", settings, synthesize, cache,
+                      fake_interface.mime_type, pause_ms)
+check("each clip is synthesized once", sorted(calls) == ["equals", "x", "y"])
+
+print(f"Failed: {len(failures)}")
+
+if failures:
+    sys.exit(1)
@@ -0,0 +1,50 @@
+#!/usr/bin/python3
+
+# Checks of jupytervox.commons.tts_backend: engine selection and the fake
+# engine, which must give the same valid WAV audio for the same text.
+
+# system packages
+import io
+import sys
+import wave
+
+# import modules from the jupytervox package
+from jupytervox.commons import tts_backend
+
+failures = []
+
+def check(name, condition):
+    print(("PASS" if condition else "FAIL") + ": " + name)
+    if not condition:
+        failures.append(name)
+
+fake = tts_backend.get_tts_interface("fake")
+check("the fake engine is selected by name", fake.engine_name == "fake")
+check("the default engine is resolved",
+      tts_backend.get_tts_interface() is not None and
+      tts_backend._default_engine is not None)
+
+try:
+    tts_backend.get_tts_interface("no such engine")
+    rejected = False
+except ValueError:
+    rejected = True
+check("unknown engines are rejected", rejected)
+
+audio = fake.synthesize("x equals 1")
+check("the fake audio is deterministic",
+      audio == fake.synthesize("x equals 1"))
+check("different texts give different audio",
+      audio != fake.synthesize("print x"))
+with wave.open(io.BytesIO(audio), "rb") as wav:
+    duration_ms = wav.getnframes() * 1000 // wav.getframerate()
+check("the fake audio is WAV of the expected length",
+      fake.mime_type == "audio/wav" and
+      duration_ms == fake.ms_per_char * len("x equals 1"))
+check("the voice settings name the engine",
+      fake.voice_settings()["engine"] == "fake")
+
+print(f"Failed: {len(failures)}")
+
+if failures:
+    sys.exit(1)
@@ -0,0 +1,178 @@
+#!/usr/bin/python3
+
+# Checks of the notebook bundle CLI (python -m
+# jupytervox.interface.notebook_bundle, installed as jvox-bundle): a bundle is
+# generated from a small notebook by worker processes with the fake TTS
+# engine, its cell records must be the records of the cells processed in this
+# process, and re-runs must reuse the unchanged cells and audio files.
+
+# system packages
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+# import modules from the jupytervox package
+from jupytervox.interface import notebook_bundle
+from jupytervox.interface.jvox_interface import jvox_interface
+
+failures = []
+
+def check(name, condition):
+    print(("PASS" if condition else "FAIL") + ": " + name)
+    if not condition:
+        failures.append(name)
+
+def write_notebook(path, sources):
+    '''
+    Write a notebook with a markdown cell followed by code cells of "sources"
+    '''
+    cells = [{"cell_type": "markdown", "metadata": {}, "source": "# Lab"}]
+    for i, source in enumerate(sources):
+        cells.append({"cell_type": "code", "id": f"cell-{i}",
+                      "metadata": {}, "execution_count": None, "outputs": [],
+                      "source": source.splitlines(keepends=True)})
+    notebook = {"cells": cells, "metadata": {}, "nbformat": 4,
+                "nbformat_minor": 5}
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(notebook, f)
+
+def run_cli(notebook_path, bundle_dir, timeout=300):
+    '''
+    Run the CLI with two worker processes and the fake TTS engine. Returns
+    the exit code and the output; the exit code is None if the CLI does not
+    finish in "timeout" seconds
+    '''
+    env = dict(os.environ)
+    package_dir = os.path.dirname(os.path.dirname(
+        os.path.abspath(notebook_bundle.__file__)))
+    env["PYTHONPATH"] = (os.path.dirname(package_dir) + os.pathsep +
+                         env.get("PYTHONPATH", ""))
+    try:
+        result = subprocess.run([sys.executable, "-m",
+                                 "jupytervox.interface.notebook_bundle",
+                                 "-o", bundle_dir, "-j", "2", "--audio",
+                                 "--tts-engine", "fake", notebook_path],
+                                env=env, capture_output=True, text=True,
+                                timeout=timeout)
+    except subprocess.TimeoutExpired:
+        print(f"  timed out after {timeout} s")
+        return None, ""
+    print("  " + result.stdout.strip().replace("\n", "\n  "))
+    return result.returncode, result.stdout
+
+def read_bundle(bundle_dir):
+    '''
+    Read the manifest and the cell records of a bundle
+    '''
+    with open(os.path.join(bundle_dir, "manifest.json"), "r") as f:
+        manifest = json.load(f)
+    with open(os.path.join(bundle_dir, "cells.jsonl"), "r") as f:
+        records = [json.loads(line) for line in f]
+    return manifest, records
+
+def main():
+    sources = ["x = 1\nfor i in range(10):\n    x = x * i\n",
+               "def add(a, b):\n    return a + b\n\nprint(add(x, 2))\n",
+               "if x > 1\n    print(x)\n"]
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        notebook_path = os.path.join(tmp_dir, "lab1.ipynb")
+        bundle_dir = os.path.join(tmp_dir, "bundle")
+        audio_dir = os.path.join(bundle_dir, "audio")
+        write_notebook(notebook_path, sources)
+
+        # first run
+        code, output = run_cli(notebook_path, bundle_dir)
+        check("the CLI succeeds", code == 0)
+        manifest, records = read_bundle(bundle_dir)
+        check("the manifest lists the notebook and the code cells",
+              manifest["cells"] == 3 and
+              manifest["notebooks"][0]["code_cells"] == 3 and
+              manifest["tts_engine"] == "fake")
+        check("the cells are recorded in notebook order",
+              [record["cell_index"] for record in records] == [1, 2, 3] and
+              [record["cell_id"] for record in records] ==
+              ["cell-0", "cell-1", "cell-2"])
+
+        # the worker processes give the records of this process
+        jvox = jvox_interface("default")
+        expected = [notebook_bundle.process_cell(jvox, source,
+                                                 manifest["chunk_len"])
+                    for source in sources]
+        check("the records are the cells processed in this process",
+              all([dict(line, audio="") for line in record["lines"]] ==
+                  result["lines"] and record["syntax"] == result["syntax"]
+                  for record, result in zip(records, expected)))
+        check("the syntax error is reported",
+              records[0]["syntax"]["error_no"] == 0 and
+              records[2]["syntax"]["error_no"] != 0)
+
+        speeches = {line["speech"] for record in records
+                    for line in record["lines"]}
+        audio_files = set(os.listdir(audio_dir))
+        check("one audio file per distinct speech",
+              len(audio_files) == len(speeches) and
+              all(line["audio"] in audio_files for record in records
+                  for line in record["lines"]))
+
+        # re-run, nothing changed
+        code, output = run_cli(notebook_path, bundle_dir)
+        check("an unchanged notebook is not processed again",
+              code == 0 and "(3 unchanged)" in output and
+              "0 audio files synthesized, 0 unused removed" in output)
+        check("the re-run gives the same bundle",
+              read_bundle(bundle_dir)[1] == records)
+
+        # re-run, one line of one cell changed
+        sources[1] = sources[1].replace("print(add(x, 2))", "y = add(x, 3)")
+        write_notebook(notebook_path, sources)
+        code, output = run_cli(notebook_path, bundle_dir)
+        check("only the changed cell is processed again",
+              code == 0 and "(2 unchanged)" in output)
+        check("only the changed line is synthesized, its old audio removed",
+              "1 audio files synthesized, 1 unused removed" in output)
+        check("the changed line is read",
+              read_bundle(bundle_dir)[1][1]["lines"][3]["speech"] ==
+              jvox.gen_speech_for_cell(sources[1], False)[3])
+
+        # tabs and mixed white spaces between tokens
+        tab_sources = ["x =\t1\na = [1,\t2]\n",
+                       "b = x \t+  a[0]\nif b:\n\tprint(b)\n"]
+        space_sources = [source.replace("\t", " ") for source in tab_sources]
+        tab_notebook_path = os.path.join(tmp_dir, "tabs.ipynb")
+        tab_bundle_dir = os.path.join(tmp_dir, "tab_bundle")
+        write_notebook(tab_notebook_path, tab_sources)
+        code, output = run_cli(tab_notebook_path, tab_bundle_dir)
+        check("lines with tabs between tokens do not stall the CLI",
+              code == 0)
+        if code == 0:
+            tab_records = read_bundle(tab_bundle_dir)[1]
+            tab_lines = [line for record in tab_records
+                         for line in record["lines"]]
+            space_lines = [line for source in space_sources
+                           for line in notebook_bundle.process_cell(
+                               jvox, source, manifest["chunk_len"])["lines"]]
+            check("a tab between tokens is read as a space",
+                  [chunk["speech"] for chunk in tab_lines[0]["chunks"]] ==
+                  [chunk["speech"] for chunk in space_lines[0]["chunks"]] and
+                  [chunk["speech"] for chunk in tab_lines[1]["chunks"]] ==
+                  [chunk["speech"] for chunk in space_lines[1]["chunks"]])
+            # cell lines, with the empty line at the end of each cell
+            texts = [text for source in tab_sources
+                     for text in source.split("\n")]
+            check("the chunks of mixed white spaces cover the whole line",
+                  all(line["chunks"][-1]["stop"] == len(text)
+                      for line, text in zip(tab_lines, texts)
+                      if text.strip() != ""))
+
+    print(f"Failed: {len(failures)}")
+
+    if failures:
+        sys.exit(1)
+
+# the worker processes may import this script, so only the main process runs
+# the test
+if __name__ == '__main__':
+    main()
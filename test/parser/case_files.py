@@ -0,0 +1,58 @@
+'''
+Test case files shared by the test scripts: the programs in test_cases/ and
+the statements in unit_test_cases.txt.
+
+The scripts in other test directories import this module after adding this
+directory to sys.path.
+'''
+
+# system packages
+import glob
+import os
+
+# directory of the test programs
+test_case_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                             "test_cases")
+
+# file of the unit test statements
+unit_test_case_file = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                   "unit_test_cases.txt")
+
+# file name patterns of the test programs
+test_case_patterns = ["*.py", "*.txt"]
+
+def list_test_case_files(case_dir=test_case_dir):
+    '''
+    Return the test program files of a directory, sorted by name. Only
+    regular .py and .txt files are returned, so directories such as
+    __pycache__ are skipped.
+    '''
+    files = []
+    for pattern in test_case_patterns:
+        files.extend(glob.glob(os.path.join(case_dir, pattern)))
+
+    return sorted(f for f in files if os.path.isfile(f))
+
+def select_test_case_files(test_case_file=None, case_dir=test_case_dir,
+                           with_unit_test_cases=False):
+    '''
+    Return the files to test from the usual -f/-d options of the scripts:
+    the single file "test_case_file" if given, otherwise the test programs
+    of "case_dir", followed by unit_test_cases.txt if
+    "with_unit_test_cases" is True.
+    '''
+    if test_case_file is not None:
+        return [test_case_file]
+
+    files = list_test_case_files(case_dir)
+    if with_unit_test_cases:
+        files.append(unit_test_case_file)
+
+    return files
+
+def read_lines(file_name):
+    '''
+    Return the lines of a file, without the line breaks
+    '''
+    with open(file_name, "r") as f:
+        return [line.rstrip("\n") for line in f]
@@ -0,0 +1,108 @@
+#!/usr/bin/python3
+
+# Differential test for the chunk map of statement_chunking: the subtree token
+# counts must be the counts of all_tokens_in_node, and the readable chunk
+# mapped to every cursor position must be the node found by searching the tree
+# (find_readable_chunk), for chunk lengths 1 to 8.
+
+# system packages
+import argparse
+import contextlib
+import io
+import sys
+
+# import modules from the jupytervox package
+from jupytervox.parser.converter import antlr2pyast
+from jupytervox.parser.statement_chunking import check_chunk as cc
+from jupytervox.parser.statement_chunking import statement_chunking \
+    as stmt_chunk
+
+# the test case files (this script's directory is on sys.path)
+import case_files
+
+def node_text(node):
+    '''
+    Text of a chunk node for printing
+    '''
+    if node is None:
+        return None
+    return node.getText()
+
+def read_statements(file_names):
+    '''
+    Read the non-empty lines of the test files, with the leading white spaces
+    removed, so that statements of code blocks can be parsed alone
+    '''
+    stmts = []
+    for file_name in file_names:
+        for line in case_files.read_lines(file_name):
+            line = line.strip()
+            if line != "" and not line.startswith("#"):
+                stmts.append(line)
+    return stmts
+
+# parse the input
+parser = argparse.ArgumentParser(description=('Differential test of the '
+                                              'readable chunk map'))
+parser.add_argument('-d', '--dir', metavar='DIR', dest='test_case_dir',
+                    default=case_files.test_case_dir,
+                    help='directory of the test case files')
+parser.add_argument('-f', '--file', metavar='FILE', dest='test_case_file',
+                    help='a single test case file to test')
+parser.add_argument('-m', '--max-chunk-len', dest='max_chunk_len', type=int,
+                    default=8, help='largest chunk length to test (default 8)')
+args = parser.parse_args()
+
+files = case_files.select_test_case_files(args.test_case_file,
+                                          args.test_case_dir,
+                                          with_unit_test_cases=True)
+stmts = read_statements(files)
+
+parsed_cnt = 0
+total_cnt = 0
+diff_cnt = 0
+for stmt in stmts:
+    # silence the parsing errors, unparsable statements are skipped
+    with contextlib.redirect_stdout(io.StringIO()), \
+         contextlib.redirect_stderr(io.StringIO()):
+        try:
+            a4tree, pyast_tree, converter = \
+                antlr2pyast.generate_and_convert_tree(stmt)
+            counts = cc.subtree_token_counts(a4tree)
+        except Exception:
+            continue
+    parsed_cnt += 1
+
+    # token counts of every subtree
+    for i in range(len(counts.nodes)):
+        total_cnt += 1
+        expected = cc.all_tokens_in_node(counts.nodes[i])
+        if counts.counts[i] != expected:
+            diff_cnt += 1
+            print(f"Token count mismatch of node {node_text(counts.nodes[i])}:")
+            print("  statement:", repr(stmt))
+            print("  counts:   ", counts.counts[i])
+            print("  recount:  ", expected)
+
+    # readable chunk at every position
+    for chunk_len in range(1, args.max_chunk_len + 1):
+        chunk_map = stmt_chunk.map_readable_chunks(counts, chunk_len,
+                                                   len(stmt))
+        for pos in range(-1, len(stmt) + 1):
+            total_cnt += 1
+            node = chunk_map.chunk_at(pos)
+            expected = stmt_chunk.find_readable_chunk(a4tree, pos, chunk_len,
+                                                      False)
+            if node is not expected:
+                diff_cnt += 1
+                print(f"Chunk mismatch at position {pos}, chunk length "
+                      f"{chunk_len}:")
+                print("  statement:", repr(stmt))
+                print("  map:      ", node_text(node))
+                print("  search:   ", node_text(expected))
+
+print(f"Statements: {len(stmts)} ({parsed_cnt} parsed)")
+print(f"Identical/Total: {total_cnt - diff_cnt}/{total_cnt}")
+
+if diff_cnt > 0:
+    sys.exit(1)
@@ -0,0 +1,89 @@
+#!/usr/bin/python3
+
+# Differential test for lexeme_navigation.lexeme_index: the readable lexeme or
+# token found at a cursor position with the lexeme index
+# (find_lexeme_token_at_pos) must be the one found by searching the parse tree
+# from the top (search_lexeme_token_at_pos), at every position of every test
+# statement.
+
+# system packages
+import argparse
+import contextlib
+import io
+import sys
+
+# import modules from the jupytervox package
+from jupytervox.parser.token_navigation import lexeme_navigation as lex_nav
+
+# the test case files (this script's directory is on sys.path)
+import case_files
+
+def summarize(func, stmt, pos):
+    '''
+    Call func, silencing the debugging prints and the parsing errors, and
+    keep the fields that can be compared across parses. Returns "exception"
+    if func raises
+    '''
+    with contextlib.redirect_stdout(io.StringIO()), \
+         contextlib.redirect_stderr(io.StringIO()):
+        try:
+            ret = func(stmt, pos)
+        except Exception:
+            return "exception"
+    return {"is_lexeme": ret["is_lexeme"],
+            "has_a4node": ret["a4node"] is not None,
+            "text": ret["text"], "start": ret["start"], "stop": ret["stop"]}
+
+def read_statements(file_names):
+    '''
+    Read the non-empty lines of the test files, with the leading white spaces
+    removed, so that statements of code blocks can be parsed alone
+    '''
+    stmts = []
+    for file_name in file_names:
+        for line in case_files.read_lines(file_name):
+            line = line.strip()
+            if line != "" and not line.startswith("#"):
+                stmts.append(line)
+    return stmts
+
+# parse the input
+parser = argparse.ArgumentParser(description=('Differential test of the '
+                                              'lexeme index'))
+parser.add_argument('-d', '--dir', metavar='DIR', dest='test_case_dir',
+                    default=case_files.test_case_dir,
+                    help='directory of the test case files')
+parser.add_argument('-f', '--file', metavar='FILE', dest='test_case_file',
+                    help='a single test case file to test')
+args = parser.parse_args()
+
+files = case_files.select_test_case_files(args.test_case_file,
+                                          args.test_case_dir,
+                                          with_unit_test_cases=True)
+stmts = read_statements(files)
+
+total_cnt = 0
+diff_cnt = 0
+indexed_cnt = 0
+for stmt in stmts:
+    with contextlib.redirect_stdout(io.StringIO()), \
+         contextlib.redirect_stderr(io.StringIO()):
+        if lex_nav.get_lexeme_index(stmt) is not None:
+            indexed_cnt += 1
+    for pos in range(-1, len(stmt) + 1):
+        result = summarize(lex_nav.find_lexeme_token_at_pos, stmt, pos)
+        expected = summarize(lex_nav.search_lexeme_token_at_pos, stmt, pos)
+
+        total_cnt += 1
+        if result != expected:
+            diff_cnt += 1
+            print(f"Mismatch at position {pos}:")
+            print("  statement:", repr(stmt))
+            print("  index:    ", result)
+            print("  search:   ", expected)
+
+print(f"Statements: {len(stmts)} ({indexed_cnt} with a lexeme index)")
+print(f"Identical/Total: {total_cnt - diff_cnt}/{total_cnt}")
+
+if diff_cnt > 0:
+    sys.exit(1)
@@ -0,0 +1,130 @@
+#!/usr/bin/python3
+
+# Differential test for token_navigation.token_index: next_token,
+# previous_token, current_token_start_stop and current_token_index must give
+# the same answers as the linear scans over the token list they replaced, at
+# every position of every test statement.
+
+# system packages
+import argparse
+import sys
+
+# import modules from the jupytervox package
+from jupytervox.parser.token_navigation import token_navigation as tnav
+
+# the test case files (this script's directory is on sys.path)
+import case_files
+
+def scan_next(tokens, cur_pos):
+    '''
+    Reference: first token in lexer order that starts after cur_pos
+    '''
+    for t in tokens:
+        if cur_pos < t.start:
+            return {"next_start": t.start, "next_stop": t.start,
+                    "next_text": t.text, "next_type": t.type}
+    return {"next_start": -1, "next_stop": -1, "next_text": "",
+            "next_type": -1}
+
+def scan_previous(tokens, cur_pos):
+    '''
+    Reference: last token in lexer order that stops before cur_pos
+    '''
+    for t in reversed(tokens):
+        if t.stop < cur_pos:
+            return {"pre_start": t.start, "pre_stop": t.start,
+                    "pre_text": t.text, "pre_type": t.type}
+    return {"pre_start": -1, "pre_stop": -1, "pre_text": "",
+            "pre_type": -1}
+
+def scan_current(tokens, cur_pos):
+    '''
+    Reference: last token in lexer order that starts at or before cur_pos,
+    the first token if there is none
+    '''
+    for t in reversed(tokens):
+        if t.start <= cur_pos:
+            break
+    return {"start": t.start, "stop": t.stop, "text": t.text,
+            "type": t.type}
+
+def scan_current_index(tokens, cur_pos):
+    '''
+    Reference: first token in lexer order that covers cur_pos, or None
+    '''
+    for i in range(len(tokens)):
+        if tokens[i].start <= cur_pos <= tokens[i].stop:
+            return i
+    return None
+
+def call(func, *args):
+    '''
+    Call func, return "exception" if it raises, e.g., the current token of a
+    comment-only line, which has no tokens
+    '''
+    try:
+        return func(*args)
+    except Exception:
+        return "exception"
+
+def read_statements(file_names):
+    '''
+    Read the non-empty lines of the test files, both as they are and with the
+    leading white spaces removed (the lexer emits NEWLINE/INDENT tokens out of
+    position order for indented lines)
+    '''
+    stmts = []
+    for file_name in file_names:
+        for line in case_files.read_lines(file_name):
+            if line.strip() == "":
+                continue
+            stmts.append(line)
+            if line.lstrip() != line:
+                stmts.append(line.lstrip())
+    return stmts
+
+# parse the input
+parser = argparse.ArgumentParser(description=('Differential test of the '
+                                              'token index'))
+parser.add_argument('-d', '--dir', metavar='DIR', dest='test_case_dir',
+                    default=case_files.test_case_dir,
+                    help='directory of the test case files')
+parser.add_argument('-f', '--file', metavar='FILE', dest='test_case_file',
+                    help='a single test case file to test')
+args = parser.parse_args()
+
+files = case_files.select_test_case_files(args.test_case_file,
+                                          args.test_case_dir,
+                                          with_unit_test_cases=True)
+stmts = read_statements(files)
+
+total_cnt = 0
+diff_cnt = 0
+for stmt in stmts:
+    tokens = tnav.tokenize(stmt)
+    index = tnav.get_token_index(stmt)
+    for cur_pos in range(-1, len(stmt) + 2):
+        checks = [("next", call(tnav.next_token, stmt, cur_pos, False),
+                   call(scan_next, tokens, cur_pos)),
+                  ("previous", call(tnav.previous_token, stmt, cur_pos, False),
+                   call(scan_previous, tokens, cur_pos)),
+                  ("current", call(tnav.current_token_start_stop, stmt,
+                                   cur_pos, False),
+                   call(scan_current, tokens, cur_pos)),
+                  ("current index", call(tnav.current_token_index, index,
+                                         cur_pos),
+                   call(scan_current_index, tokens, cur_pos))]
+        for name, result, expected in checks:
+            total_cnt += 1
+            if result != expected:
+                diff_cnt += 1
+                print(f"Mismatch of {name} at position {cur_pos}:")
+                print("  statement:", repr(stmt))
+                print("  index:    ", result)
+                print("  scan:     ", expected)
+
+print(f"Statements: {len(stmts)}")
+print(f"Identical/Total: {total_cnt - diff_cnt}/{total_cnt}")
+
+if diff_cnt > 0:
+    sys.exit(1)
@@ -37,56 +37,78 @@ def read_test_case(file_handle):
     # end of file
     return ""
 
-# parse the input
-parser = argparse.ArgumentParser(description='Testing file for JupyterVox with PyAST')
-
-parser.add_argument('-f', '--file', metavar='FILE', dest='test_case_file',
-                    help='path to the test case file')
-
-parser.add_argument('-s', '--stmt', metavar='STATEMENT', dest='stmt',
-                    help='a single statement to parse')
-
-parser.add_argument('-v', '-verbose', dest='verbose', action='store_true',
-                    help='enable verbose output')
-
-parser.add_argument('-p', '--use_pyast', dest='use_pyast', action='store_true',
-                    help='whether to use python AST for parsing; default use ANTRL4')
-
-args = parser.parse_args()
-
-if (args.test_case_file is None) and (args.stmt is None):
-    print("Please specific test case file or statement")
-    exit(1)
-
-    
-# create the parser
-jvox = jvox_screenreader(not args.use_pyast)
-
-if not args.stmt is None:
-    # parse a single statement
-    speech = jvox.generate_for_one(args.stmt, args.verbose)
-    print("*  ", args.stmt, "=>", speech, "\n")
-else:
-    # parse a test case file
-    # open the file
-    if args.verbose:
-        print("Processing test case file:", args.test_case_file, "\n")
-          
-    f = open(args.test_case_file, "r")
-
-    # generate speech for each line
-    print("Generating speeches ...\n")
-    file_all_parsed = False
-    while not file_all_parsed:
-        test_case = read_test_case(f)
-
-        if test_case == "": # no more test cases
-            break
-        
-        speech = jvox.generate_for_one(test_case, args.verbose)
-        
-        print(">>> Test case:\n", test_case, "=>", speech, '\n')
-
-    print("\nDone.")
-
-    f.close()
+# the worker processes of -j import this script, so only the main process
+# runs the tests
+if __name__ == '__main__':
+    # parse the input
+    parser = argparse.ArgumentParser(description='Testing file for JupyterVox with PyAST')
+
+    parser.add_argument('-f', '--file', metavar='FILE', dest='test_case_file',
+                        help='path to the test case file')
+
+    parser.add_argument('-s', '--stmt', metavar='STATEMENT', dest='stmt',
+                        help='a single statement to parse')
+
+    parser.add_argument('-v', '-verbose', dest='verbose', action='store_true',
+                        help='enable verbose output')
+
+    parser.add_argument('-p', '--use_pyast', dest='use_pyast', action='store_true',
+                        help='whether to use python AST for parsing; default use ANTRL4')
+
+    parser.add_argument('-j', '--jobs', dest='jobs', type=int, default=1,
+                        help='number of worker processes for the test case file; '
+                        'default 1, 0 for one per CPU')
+
+    args = parser.parse_args()
+
+    if (args.test_case_file is None) and (args.stmt is None):
+        print("Please specific test case file or statement")
+        exit(1)
+
+
+    # create the parser
+    jvox = jvox_screenreader(not args.use_pyast)
+
+    if not args.stmt is None:
+        # parse a single statement
+        speech = jvox.generate_for_one(args.stmt, args.verbose)
+        print("*  ", args.stmt, "=>", speech, "\n")
+    else:
+        # parse a test case file
+        # open the file
+        if args.verbose:
+            print("Processing test case file:", args.test_case_file, "\n")
+
+        f = open(args.test_case_file, "r")
+
+        # generate speech for each line
+        print("Generating speeches ...\n")
+        if args.jobs != 1:
+            # read all test cases, and generate their speeches with a pool of
+            # worker processes
+            test_cases = []
+            while True:
+                test_case = read_test_case(f)
+                if test_case == "": # no more test cases
+                    break
+                test_cases.append(test_case)
+
+            workers = args.jobs if args.jobs > 0 else None
+            speeches = jvox.generate_many(test_cases, workers, args.verbose)
+            for test_case, speech in zip(test_cases, speeches):
+                print(">>> Test case:\n", test_case, "=>", speech, '\n')
+
+        file_all_parsed = args.jobs != 1
+        while not file_all_parsed:
+            test_case = read_test_case(f)
+
+            if test_case == "": # no more test cases
+                break
+
+            speech = jvox.generate_for_one(test_case, args.verbose)
+
+            print(">>> Test case:\n", test_case, "=>", speech, '\n')
+
+        print("\nDone.")
+
+        f.close()
@@ -0,0 +1,131 @@
+#!/usr/bin/python3
+
+# Differential test for jvox_screenreader.generate_for_cell: each test case
+# file is read as one cell, and the speech of every line must be the same as
+# the speech of the line read by itself with generate_for_one, except for the
+# lines that cannot be read by themselves. Also checks that the speeches do
+# not depend on whether the cell or the lines are read first (the speech
+# cache is shared by the two).
+
+# system packages
+import argparse
+import contextlib
+import io
+import os
+import sys
+
+# import modules from the jupytervox package
+from jupytervox.screenreader import jvox_screenreader
+from jupytervox.screenreader.screenreader import split_cell_lines
+
+# the test case files are listed by test/parser/case_files.py
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                             "../parser"))
+import case_files
+
+def gen_speech(func, *args):
+    '''
+    Call one of the speech generation functions, silencing the debugging
+    prints
+    '''
+    with contextlib.redirect_stdout(io.StringIO()):
+        try:
+            return func(*args)
+        except Exception as e:
+            return "Exception: " + repr(e)
+
+def line_parses(jvox, line):
+    '''
+    Whether "line" can be parsed by itself
+    '''
+    with contextlib.redirect_stdout(io.StringIO()):
+        try:
+            jvox.parse_statement(line.strip())
+            return True
+        except Exception:
+            return False
+
+# parse the input
+parser = argparse.ArgumentParser(description=('Differential test of cell '
+                                              'reading against line reading'))
+parser.add_argument('-d', '--dir', metavar='DIR', dest='test_case_dir',
+                    default=case_files.test_case_dir,
+                    help='directory of the test case files')
+parser.add_argument('-f', '--file', metavar='FILE', dest='test_case_file',
+                    help='a single test case file to test')
+parser.add_argument('-v', '--verbose', dest='verbose', action='store_true',
+                    help='print every line')
+args = parser.parse_args()
+
+files = case_files.select_test_case_files(args.test_case_file,
+                                          args.test_case_dir)
+
+total_cnt = 0
+diff_cnt = 0
+unparsable_diff_cnt = 0
+changed_cnt = 0
+for file_name in files:
+    with open(file_name, "r") as f:
+        cell = f.read()
+    lines = split_cell_lines(cell)
+
+    # the two readers read the file in different orders, so that the cell
+    # and line readings share the speech cache both ways
+    line_first = jvox_screenreader()
+    line_speeches = [gen_speech(line_first.generate_for_one, line)
+                     for line in lines]
+    line_first_cell = gen_speech(line_first.generate_for_cell, cell)
+
+    cell_first = jvox_screenreader()
+    cell_speeches = gen_speech(cell_first.generate_for_cell, cell)
+    cell_first_lines = [gen_speech(cell_first.generate_for_one, line)
+                        for line in lines]
+
+    if not isinstance(cell_speeches, list):
+        diff_cnt += 1
+        print("Cell reading failed for", file_name)
+        print("  ", cell_speeches)
+        continue
+
+    for (line, line_speech, cell_speech, after_cell_speech,
+         after_line_speech) in zip(lines, line_speeches, cell_speeches,
+                                   cell_first_lines, line_first_cell):
+        total_cnt += 1
+
+        if (after_cell_speech != line_speech or
+            after_line_speech != cell_speech):
+            changed_cnt += 1
+            print("Reading order changed the speech in", file_name)
+            print("  line:                  ", line)
+            print("  line read first:       ", line_speech)
+            print("  line after cell:       ", after_cell_speech)
+            print("  cell read first:       ", cell_speech)
+            print("  cell after line:       ", after_line_speech)
+
+        if cell_speech == line_speech:
+            if args.verbose:
+                print(">>>", line, "=>", cell_speech)
+        elif (line_speech.startswith("Exception: ") or
+              not line_parses(line_first, line)):
+            # e.g., "if a is None:" is read token by token by itself, and
+            # the cell reads a line that fails token by token
+            unparsable_diff_cnt += 1
+            if args.verbose:
+                print("Unparsable line read by the cell in", file_name)
+                print("  line:  ", line)
+                print("  cell:  ", cell_speech)
+                print("  single:", line_speech)
+        else:
+            diff_cnt += 1
+            print("Mismatch in", file_name)
+            print("  line:  ", line)
+            print("  cell:  ", cell_speech)
+            print("  single:", line_speech)
+
+print(f"Identical/Total: {total_cnt - diff_cnt - unparsable_diff_cnt}"
+      f"/{total_cnt} ({unparsable_diff_cnt} unparsable lines read "
+      f"differently by the cell)")
+print(f"Speeches changed by the reading order: {changed_cnt}")
+
+if diff_cnt > 0 or changed_cnt > 0:
+    sys.exit(1)
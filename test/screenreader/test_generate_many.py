@@ -0,0 +1,87 @@
+#!/usr/bin/python3
+
+# Differential test for jvox_screenreader.generate_many: the speeches
+# generated by a pool of worker processes must be the speeches of the
+# statements read one by one, in the order of the statements.
+
+# system packages
+import argparse
+import contextlib
+import io
+import os
+import sys
+import time
+
+# import modules from the jupytervox package
+from jupytervox.screenreader import jvox_screenreader
+
+# the test case files are listed by test/parser/case_files.py
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                             "../parser"))
+import case_files
+
+def read_statements(file_names):
+    '''
+    Read the non-empty lines of the test programs
+    '''
+    stmts = []
+    for file_name in file_names:
+        stmts.extend(line for line in case_files.read_lines(file_name)
+                     if line.strip() != "")
+    return stmts
+
+def main():
+    # parse the input
+    parser = argparse.ArgumentParser(description=('Differential test of bulk '
+                                                  'speech generation'))
+    parser.add_argument('-d', '--dir', metavar='DIR', dest='test_case_dir',
+                        default=case_files.test_case_dir,
+                        help='directory of the test case files')
+    parser.add_argument('-j', '--jobs', dest='jobs', type=int, default=2,
+                        help='number of worker processes (default 2)')
+    parser.add_argument('-c', '--chunk', dest='chunk_size', type=int,
+                        default=16, help='statements per chunk (default 16)')
+    args = parser.parse_args()
+
+    files = case_files.list_test_case_files(args.test_case_dir)
+    stmts = read_statements(files)
+
+    # reference: one by one, in this process
+    reader = jvox_screenreader()
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        expected = [reader.generate_for_one_with_fallback(stmt)
+                    for stmt in stmts]
+    serial_time = time.perf_counter() - start
+
+    # a fresh reader, so that the workers do not start from its speech cache
+    reader = jvox_screenreader()
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        speeches = reader.generate_many(stmts, args.jobs,
+                                        chunk_size=args.chunk_size)
+    pool_time = time.perf_counter() - start
+
+    diff_cnt = 0
+    if len(speeches) != len(expected):
+        print(f"Got {len(speeches)} speeches for {len(stmts)} statements")
+        diff_cnt += 1
+    for stmt, speech, expected_speech in zip(stmts, speeches, expected):
+        if speech != expected_speech:
+            diff_cnt += 1
+            print("Mismatch:")
+            print("  statement:", stmt)
+            print("  pool:     ", speech)
+            print("  serial:   ", expected_speech)
+
+    print(f"Identical/Total: {len(stmts) - diff_cnt}/{len(stmts)}")
+    print(f"Time: serial {serial_time:.2f} s, {args.jobs} workers "
+          f"{pool_time:.2f} s (including the worker start-up)")
+
+    if diff_cnt > 0:
+        sys.exit(1)
+
+# the worker processes import this script, so only the main process runs the
+# test
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,84 @@
+#!/usr/bin/python3
+
+# Differential test for jvox_screenreader.generate_stream: the speech segments
+# of a line, joined with spaces, must be the speech generate_for_one gives for
+# the line, up to white spaces.
+
+# system packages
+import argparse
+import contextlib
+import io
+import os
+import sys
+
+# import modules from the jupytervox package
+from jupytervox.screenreader import jvox_screenreader
+
+# the test case files are listed by test/parser/case_files.py
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                             "../parser"))
+import case_files
+
+def collapse_spaces(speech):
+    '''
+    Collapse the runs of white spaces, which may differ at segment borders
+    '''
+    return " ".join(speech.split())
+
+# parse the input
+parser = argparse.ArgumentParser(description=('Differential test of streamed '
+                                              'speech generation'))
+parser.add_argument('-d', '--dir', metavar='DIR', dest='test_case_dir',
+                    default=case_files.test_case_dir,
+                    help='directory of the test case files')
+parser.add_argument('-f', '--file', metavar='FILE', dest='test_case_file',
+                    help='a single test case file to test')
+parser.add_argument('-v', '--verbose', dest='verbose', action='store_true',
+                    help='print the segments of every line')
+args = parser.parse_args()
+
+files = case_files.select_test_case_files(args.test_case_file,
+                                          args.test_case_dir)
+
+# separate readers, so that the streamed segments are not served from the
+# speech cache of the line readings
+line_reader = jvox_screenreader()
+stream_reader = jvox_screenreader()
+
+total_cnt = 0
+diff_cnt = 0
+split_cnt = 0
+for file_name in files:
+    for line in case_files.read_lines(file_name):
+        total_cnt += 1
+        with contextlib.redirect_stdout(io.StringIO()):
+            try:
+                segments = list(stream_reader.generate_stream(line))
+            except Exception as e:
+                segments = ["Exception: " + repr(e)]
+            try:
+                expected = line_reader.generate_for_one(line)
+            except Exception as e:
+                expected = "Exception: " + repr(e)
+
+        if len(segments) > 1:
+            split_cnt += 1
+        if any(segment.strip() == "" for segment in segments):
+            diff_cnt += 1
+            print("Empty segment in", file_name)
+            print("  statement:", line)
+            print("  segments: ", segments)
+        elif collapse_spaces(" ".join(segments)) != collapse_spaces(expected):
+            diff_cnt += 1
+            print("Mismatch in", file_name)
+            print("  statement:", line)
+            print("  segments: ", segments)
+            print("  one:      ", expected)
+        elif args.verbose:
+            print(">>>", line, "=>", segments)
+
+print(f"Identical/Total: {total_cnt - diff_cnt}/{total_cnt} "
+      f"({split_cnt} lines read in more than one segment)")
+
+if diff_cnt > 0:
+    sys.exit(1)
@@ -0,0 +1,89 @@
+#!/usr/bin/python3
+
+# Differential test for the hybrid (Python AST fast path) mode of
+# jvox_screenreader: the speech generated with the fast path must be identical
+# to the speech generated with ANTLR4 only.
+
+# system packages
+import argparse
+import contextlib
+import io
+import os
+import sys
+import time
+
+# import modules from the jupytervox package
+from jupytervox.screenreader import jvox_screenreader
+
+# the test case files are listed by test/parser/case_files.py
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                             "../parser"))
+import case_files
+
+def gen_speech(jvox, stmt):
+    '''
+    Generate speech for "stmt", silencing the debugging prints. Returns the
+    speech and the time spent (in seconds)
+    '''
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        try:
+            speech = jvox.generate_for_one(stmt)
+        except Exception as e:
+            speech = "Exception: " + repr(e)
+    return speech, time.perf_counter() - start
+
+def median(values):
+    values = sorted(values)
+    if len(values) == 0:
+        return 0.0
+    return values[len(values) // 2]
+
+# parse the input
+parser = argparse.ArgumentParser(description=('Differential test of the '
+                                              'Python AST fast path'))
+parser.add_argument('-d', '--dir', metavar='DIR', dest='test_case_dir',
+                    default=case_files.test_case_dir,
+                    help='directory of the test case files')
+parser.add_argument('-f', '--file', metavar='FILE', dest='test_case_file',
+                    help='a single test case file to test')
+parser.add_argument('-v', '--verbose', dest='verbose', action='store_true',
+                    help='print every statement')
+args = parser.parse_args()
+
+files = case_files.select_test_case_files(args.test_case_file,
+                                          args.test_case_dir)
+
+hybrid = jvox_screenreader(use_antlr4=True, use_pyast_fast_path=True)
+antlr4_only = jvox_screenreader(use_antlr4=True, use_pyast_fast_path=False)
+
+total_cnt = 0
+diff_cnt = 0
+hybrid_times = []
+antlr4_times = []
+for file_name in files:
+    for line in case_files.read_lines(file_name):
+        if line.strip() == "":
+            continue
+
+        total_cnt += 1
+        hybrid_speech, hybrid_time = gen_speech(hybrid, line)
+        antlr4_speech, antlr4_time = gen_speech(antlr4_only, line)
+        hybrid_times.append(hybrid_time)
+        antlr4_times.append(antlr4_time)
+
+        if hybrid_speech != antlr4_speech:
+            diff_cnt += 1
+            print("Mismatch in", file_name)
+            print("  statement:", line)
+            print("  fast path:", hybrid_speech)
+            print("  ANTLR4:   ", antlr4_speech)
+        elif args.verbose:
+            print(">>>", line, "=>", hybrid_speech)
+
+print(f"Identical/Total: {total_cnt - diff_cnt}/{total_cnt}")
+print(f"Median latency: fast path {median(hybrid_times) * 1000:.3f} ms, "
+      f"ANTLR4 {median(antlr4_times) * 1000:.3f} ms")
+
+if diff_cnt > 0:
+    sys.exit(1)
@@ -0,0 +1,155 @@
+#!/usr/bin/python3
+
+# Checks of the speech cache of jvox_screenreader: the LRU of
+# speech_result_cache, the statement normalization and style profile keys,
+# the invalidation when a style is changed, the calls of the readline
+# handlers and of the streamed line reading, and the speeches of all the test
+# programs' lines read with the cache (twice, the second time from the cache)
+# and without it.
+
+# system packages
+import argparse
+import ast
+import contextlib
+import io
+import os
+import sys
+
+# import modules from the jupytervox package
+from jupytervox.interface.jvox_interface import jvox_interface
+from jupytervox.screenreader import jvox_screenreader
+from jupytervox.screenreader import speech_cache
+from jupytervox.screenreader.speech_styles import make_speech_styles
+
+# the test case files are listed by test/parser/case_files.py
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                             "../parser"))
+import case_files
+
+failures = []
+
+def check(name, condition):
+    print(("PASS" if condition else "FAIL") + ": " + name)
+    if not condition:
+        failures.append(name)
+
+def gen_speech(reader, stmt, speech_styles=None):
+    '''
+    Generate the speech of "stmt", silencing the debugging prints
+    '''
+    with contextlib.redirect_stdout(io.StringIO()):
+        try:
+            return reader.generate_for_one(stmt, speech_styles=speech_styles)
+        except Exception as e:
+            return "Exception: " + repr(e)
+
+# parse the input
+parser = argparse.ArgumentParser(description='Checks of the speech cache')
+parser.add_argument('-d', '--dir', metavar='DIR', dest='test_case_dir',
+                    default=case_files.test_case_dir,
+                    help='directory of the test case files')
+args = parser.parse_args()
+
+# LRU with a size limit
+cache = speech_cache.speech_result_cache(max_size=2)
+cache.put("a", (), "speech a")
+cache.put("b", (), "speech b")
+cache.get("a", ())  # "a" is now the most recently used
+cache.put("c", (), "speech c")
+check("the least recently used speech is evicted",
+      cache.get("b", ()) is None and cache.get("a", ()) == "speech a")
+stats = cache.stats()
+check("hits, misses and evictions are counted",
+      stats["hits"] == 2 and stats["misses"] == 1 and stats["evictions"] == 1)
+cache.resize(1)
+check("shrinking evicts", cache.stats()["size"] == 1)
+check("line and cell speeches are separate entries",
+      cache.get("a", (), speech_cache.SOURCE_CELL) is None)
+
+# keys
+check("trailing spaces and tabs are not part of the statement",
+      speech_cache.normalize_statement("x = 1 \t ") == "x = 1")
+styles = make_speech_styles()
+check("the style profile does not depend on the dict order",
+      speech_cache.make_styles_key(styles) ==
+      speech_cache.make_styles_key(dict(reversed(list(styles.items())))))
+other_styles = make_speech_styles({ast.Assign: "default"})
+check("different style selections have different profiles",
+      speech_cache.make_styles_key(styles) !=
+      speech_cache.make_styles_key(other_styles))
+
+# a reader: indented copies share one entry
+reader = jvox_screenreader()
+speech = gen_speech(reader, "x = y + 1")
+indented = gen_speech(reader, "    x = y + 1  ")
+check("indented copies of a line share one entry",
+      reader.speech_cache_stats()["size"] == 1 and
+      reader.speech_cache_stats()["hits"] == 1)
+check("the indentation is read before the cached speech",
+      indented != speech and indented.endswith(", " + speech))
+
+# per-request styles and style changes
+uncached = jvox_screenreader(use_speech_cache=False)
+styled = gen_speech(reader, "x = y + 1", other_styles)
+check("per-request styles are not served the default entry",
+      styled != speech and
+      styled == gen_speech(uncached, "x = y + 1", other_styles))
+invalidations = reader.speech_cache_stats()["invalidations"]
+reader.set_speech_style(ast.Assign, "default")
+uncached.set_speech_style(ast.Assign, "default")
+check("changing a style invalidates the cache",
+      reader.speech_cache_stats()["invalidations"] == invalidations + 1 and
+      reader.speech_cache_stats()["size"] == 0)
+check("the speech follows the changed style",
+      gen_speech(reader, "x = y + 1") == styled)
+
+# the calls of the readline handlers (verbose, with optional per-request
+# styles) and of the streamed line reading are served from the cache
+jvox = jvox_interface("default")
+for speech_styles in [None, {"BinOp": "default"}]:
+    stats = jvox.speech_cache_stats()
+    with contextlib.redirect_stdout(io.StringIO()):
+        first_speech = jvox.gen_speech_for_one("total = a + b * 2", True,
+                                               speech_styles)
+        second_speech = jvox.gen_speech_for_one("total = a + b * 2", True,
+                                                speech_styles)
+    check(f"verbose readline calls are cached (styles {speech_styles})",
+          first_speech == second_speech and
+          jvox.speech_cache_stats()["hits"] == stats["hits"] + 1)
+stats = jvox.speech_cache_stats()
+with contextlib.redirect_stdout(io.StringIO()):
+    first_segments = list(jvox.gen_speech_segments_for_one(
+        "    result = foo(a, b)", False))
+    second_segments = list(jvox.gen_speech_segments_for_one(
+        "        result = foo(a, b)  ", False))
+    line_speech = jvox.gen_speech_for_one("result = foo(a, b)", False)
+check("streamed segments are cached",
+      len(first_segments) > 2 and first_segments[1:] == second_segments[1:] and
+      jvox.speech_cache_stats()["hits"] == stats["hits"] + 2)
+check("a streamed line fills the line speech entry",
+      " ".join(first_segments[1:]).split() == line_speech.split())
+
+# the test programs: read with the cache twice, and without the cache
+lines = []
+for file_name in case_files.list_test_case_files(args.test_case_dir):
+    lines.extend(case_files.read_lines(file_name))
+
+cached = jvox_screenreader()
+uncached = jvox_screenreader(use_speech_cache=False)
+expected = [gen_speech(uncached, line) for line in lines]
+first = [gen_speech(cached, line) for line in lines]
+hits = cached.speech_cache_stats()["hits"]
+second = [gen_speech(cached, line) for line in lines]
+mismatches = [line for line, a, b, c in zip(lines, expected, first, second)
+              if not (a == b == c)]
+for line in mismatches[:10]:
+    print("  mismatch:", repr(line))
+check(f"cached speeches are the uncached speeches ({len(lines)} lines)",
+      len(mismatches) == 0)
+check("re-reading is served from the cache",
+      cached.speech_cache_stats()["hits"] > hits)
+
+print(f"Failed: {len(failures)}")
+
+if failures:
+    sys.exit(1)
@@ -11,6 +11,9 @@ except ImportError:
 
 from .routes import setup_route_handlers
 
+from jupytervox.commons import config as jvox_config
+from jupytervox.parser.converter import prewarm
+
 
 def _jupyter_labextension_paths():
     return [{
@@ -37,5 +40,12 @@ def _load_jupyter_server_extension(server_app):
     name = "jvox_jlab_ext"
     server_app.log.info(f"Registered {name} server extension")
 
+    # prewarm the parser's DFA caches in the background, so that the first
+    # requests after a server restart are not slowed down
+    prewarm_config = jvox_config.jvox_prewarm_config()
+    if prewarm_config["enabled"]:
+        prewarm.start_prewarm_thread(prewarm_config["max_statements"],
+                                     server_app.log.info)
+
 
 
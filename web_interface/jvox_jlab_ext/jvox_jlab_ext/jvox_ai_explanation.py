@@ -3,7 +3,6 @@
 #
 
 import json
-import base64
 
 import tornado
 from jupyter_server.base.handlers import APIHandler
@@ -16,15 +15,23 @@ from jupyter_server.base.handlers import APIHandler
 # if web_api_path not in sys.path:
 #    sys.path.append(web_api_path)
 
-from jupytervox.interface import jvox_interface  
+from jupytervox.interface import get_shared_interface
+
+# thread pools for the blocking work
+from . import jvox_executor
+from . import jvox_audio_transport
 
 class JVoxAIExplanationRouteHandler(APIHandler):
     '''
     JVox AI explanation endpoint for explaining code
     '''
+    def initialize(self, jvox=None):
+        # the process-wide jvox_interface, injected by setup_route_handlers
+        self.jvox = jvox if jvox is not None else get_shared_interface()
+
     @tornado.web.authenticated
-    def post(self):
-        jvox = jvox_interface("default")
+    async def post(self):
+        jvox = self.jvox
         print("hello jvox:", jvox)
         
         # retrieve statement and command
@@ -40,22 +47,24 @@ class JVoxAIExplanationRouteHandler(APIHandler):
 
         ai_response = ""
         if command == "codeExplain":
-            ai_response = jvox.ai_explain_code(stmt, ai_client=ai_client, api_key=api_key) 
+            ai_response = await jvox_executor.run_ai(jvox.ai_explain_code, stmt, ai_client=ai_client, api_key=api_key)
         elif command == "nestedCodeExplain":
-            ai_response = jvox.ai_explain_nested_code(stmt, ai_client=ai_client, api_key=api_key)
+            ai_response = await jvox_executor.run_ai(jvox.ai_explain_nested_code, stmt, ai_client=ai_client, api_key=api_key)
         elif command == "detailedCodeExplain":
-            ai_response = jvox.ai_explain_detailed_code(stmt, cell_content, ai_client=ai_client, api_key=api_key)
+            ai_response = await jvox_executor.run_ai(jvox.ai_explain_detailed_code, stmt, cell_content, ai_client=ai_client, api_key=api_key)
 
-        # generate audio bytes
-        mp3_bytes = jvox.gen_mp3_bytes_from_speech_gtts(ai_response)
+        # generate audio bytes, with the requested TTS engine (default if not given)
+        tts_result = await jvox_executor.run_tts(
+            jvox.gen_audio_from_speech, ai_response, input_data.get("tts_engine"))
 
-        # Encode bytes to Base64 string so that we can send bytes in JSON
-        encoded_audio = base64.b64encode(mp3_bytes).decode('ascii')
+        # the audio, embedded as base64 or referenced by hash, as requested
+        audio_fields = jvox_audio_transport.audio_reply_fields(
+            tts_result, input_data.get("audio_mode"))
 
         # Prepare and send the JSON
         result = {
                 "speech": ai_response,
-                "audio": encoded_audio
+                **audio_fields
             }
 
         # send the JSON
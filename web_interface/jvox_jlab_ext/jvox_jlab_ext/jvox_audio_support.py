@@ -3,7 +3,6 @@
 #
 
 import json
-import base64
 
 import tornado
 from jupyter_server.base.handlers import APIHandler
@@ -18,15 +17,23 @@ from jupyter_server.base.handlers import APIHandler
 
 # import jvox_interface
 # 
-from jupytervox.interface import jvox_interface    
+from jupytervox.interface import get_shared_interface
+
+# thread pools for the blocking work
+from . import jvox_executor
+from . import jvox_audio_transport
 
 class JVoxAudioRouteHandler(APIHandler):
     '''
     JVox endpoint for generating audio MP3 bytes given an input text
     '''
+    def initialize(self, jvox=None):
+        # the process-wide jvox_interface, injected by setup_route_handlers
+        self.jvox = jvox if jvox is not None else get_shared_interface()
+
     @tornado.web.authenticated
-    def post(self):
-        jvox = jvox_interface("default")
+    async def post(self):
+        jvox = self.jvox
         # print("hello jvox:", jvox)
         
         # retrieve statement
@@ -34,16 +41,18 @@ class JVoxAudioRouteHandler(APIHandler):
         jvox_speech = input_data["speech"]
         print("JVox audio web api got speech:", jvox_speech)
 
-        # generate audio bytes
-        mp3_bytes = jvox.gen_mp3_bytes_from_speech_gtts(jvox_speech)
+        # generate audio bytes, with the requested TTS engine (default if not given)
+        tts_result = await jvox_executor.run_tts(
+            jvox.gen_audio_from_speech, jvox_speech, input_data.get("tts_engine"))
         
-        # Encode bytes to Base64 string so that we can send bytes in JSON
-        encoded_audio = base64.b64encode(mp3_bytes).decode('ascii')
+        # the audio, embedded as base64 or referenced by hash, as requested
+        audio_fields = jvox_audio_transport.audio_reply_fields(
+            tts_result, input_data.get("audio_mode"))
 
         # Prepare and send the JSON
         reply = {
                 "speech": jvox_speech,
-                "audio": encoded_audio
+                **audio_fields
             }
 
         # send the JSON
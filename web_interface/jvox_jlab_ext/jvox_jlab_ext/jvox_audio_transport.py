@@ -0,0 +1,77 @@
+#
+# Binary transport of JVox audio
+#
+# By default, the endpoints embed the audio in their JSON replies as base64,
+# which inflates the payload by a third. With "audio_mode": "hash" in a
+# request, the reply only references the audio by its content address in the
+# audio cache ("audio_hash"), and the client fetches the bytes from
+# jvox-lab-ext/audio/<hash>. The audio of a hash never changes, so the
+# browser caches repeated phrases. The audio is pinned in the audio cache
+# until it is fetched, so that the hash is never answered with a 404 because
+# the clip was too large for the cache or was evicted in the meantime.
+#
+
+import base64
+
+import tornado
+from jupyter_server.base.handlers import JupyterHandler
+
+from jupytervox.interface import get_shared_interface
+from jupytervox.commons import audio_cache
+
+from . import jvox_executor
+
+def audio_reply_fields(tts_result, audio_mode=None):
+    '''
+    Generate the audio fields of a JSON reply.
+
+    Input parameters:
+    1. tts_result: the return value of jvox_interface.gen_audio_from_speech
+    2. audio_mode: "inline" (default) to embed the audio as base64, or
+       "hash" to reference it by hash. "hash" falls back to "inline" if the
+       audio can't be pinned in the audio cache, e.g., the cache is
+       disabled.
+
+    Return: dict of "audio" (base64, empty in hash mode), "audio_type" and
+    "audio_hash" (empty in inline mode)
+    '''
+    if audio_mode == "hash" and tts_result.key is not None:
+        cache = audio_cache.shared_cache()
+        if cache is not None and cache.pin(tts_result.key, tts_result.audio):
+            return {"audio": "",
+                    "audio_type": tts_result.mime_type,
+                    "audio_hash": tts_result.key}
+
+    # Encode bytes to Base64 string so that we can send bytes in JSON
+    encoded_audio = base64.b64encode(tts_result.audio).decode('ascii')
+
+    return {"audio": encoded_audio,
+            "audio_type": tts_result.mime_type,
+            "audio_hash": ""}
+
+class JVoxAudioByHashRouteHandler(JupyterHandler):
+    '''
+    JVox endpoint returning the audio bytes of a content hash
+    '''
+    def initialize(self, jvox=None):
+        # the process-wide jvox_interface, injected by setup_route_handlers
+        self.jvox = jvox if jvox is not None else get_shared_interface()
+
+    @tornado.web.authenticated
+    async def get(self, key):
+        # the audio may be read from the on-disk store, off the IOLoop
+        audio = await jvox_executor.run_tts(self.jvox.get_cached_audio, key)
+        if audio is None:
+            raise tornado.web.HTTPError(404, "Audio not found")
+
+        # content-addressed: the audio of a hash never changes
+        self.set_header("Content-Type", audio_cache.audio_mime_type(audio))
+        self.set_header("Cache-Control", "private, max-age=31536000, immutable")
+        self.set_header("Etag", f'"{key}"')
+
+        if self.check_etag_header():
+            self.set_status(304)
+            self.finish()
+            return
+
+        self.finish(audio)
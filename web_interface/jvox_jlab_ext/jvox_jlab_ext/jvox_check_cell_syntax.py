@@ -3,37 +3,47 @@
 #
 
 import json
-import base64
 
 import tornado
 from jupyter_server.base.handlers import APIHandler
 
-from jupytervox.interface import jvox_interface
+from jupytervox.interface import get_shared_interface
+
+# thread pools for the blocking work
+from . import jvox_executor
+from . import jvox_audio_transport
 
 class JVoxCheckCellSyntaxRouteHandler(APIHandler):
     '''
     JVox endpoint for checking the syntax of a code snippet (full cell).
     Calls code_snippet_parsing_check and returns the result with audio.
     '''
+    def initialize(self, jvox=None):
+        # the process-wide jvox_interface, injected by setup_route_handlers
+        self.jvox = jvox if jvox is not None else get_shared_interface()
+
     @tornado.web.authenticated
-    def post(self):
-        jvox = jvox_interface("default")
+    async def post(self):
+        jvox = self.jvox
 
         # extract input information
         input_data = self.get_json_body()
         stmts = input_data["stmts"]
 
         # perform syntax check
-        result = jvox.code_snippet_parsing_check(stmts, True)
+        result = await jvox_executor.run_parse(jvox.code_snippet_parsing_check,
+                                               stmts, True)
         print("Cell syntax check result:", result.msg,
               "line_no:", result.line_no, "offset:", result.offset,
               "error_no:", result.error_no)
 
-        # generate audio bytes from the message
-        mp3_bytes = jvox.gen_mp3_bytes_from_speech_gtts(result.msg)
+        # generate audio bytes from the message, with the requested TTS engine (default if not given)
+        tts_result = await jvox_executor.run_tts(
+            jvox.gen_audio_from_speech, result.msg, input_data.get("tts_engine"))
 
-        # Encode bytes to Base64 string so that we can send bytes in JSON
-        encoded_audio = base64.b64encode(mp3_bytes).decode('ascii')
+        # the audio, embedded as base64 or referenced by hash, as requested
+        audio_fields = jvox_audio_transport.audio_reply_fields(
+            tts_result, input_data.get("audio_mode"))
 
         # Prepare and send the JSON response
         reply = {
@@ -41,7 +51,7 @@ class JVoxCheckCellSyntaxRouteHandler(APIHandler):
             "line_no": result.line_no,
             "offset": result.offset,
             "error_no": result.error_no,
-            "audio": encoded_audio
+            **audio_fields
         }
 
         self.finish(json.dumps(reply))
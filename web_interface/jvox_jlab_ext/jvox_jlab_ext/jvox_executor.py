@@ -0,0 +1,67 @@
+#
+# Bounded thread pools for running the blocking JVox work off the Jupyter
+# server's IOLoop, so that one slow request does not freeze the notebook UI
+# of every user on the server:
+#   1. "parse": ANTLR parsing and speech generation (CPU bound)
+#   2. "tts": text-to-speech synthesis (network calls for gTTS)
+#   3. "ai": LLM calls for AI explanations (slow network calls)
+# The AI calls get their own pool, so that they never hold up the reading
+# requests. Pool sizes are set in the [server] table of jvox_config.toml.
+#
+# The network calls also run in threads rather than in async clients: gTTS
+# (built on requests), the espeak-ng subprocess and the AI backends' SDK
+# clients are all blocking, and a thread waiting on the network does not hold
+# the GIL. The pool sizes bound the calls in flight, and further calls queue
+# in the pool without blocking the IOLoop:
+#   - tts_workers (8): a cell reading synthesizes its lines concurrently, so
+#     8 covers one uncached cell of 8 lines, or a few line/chunk readings of
+#     several users at once (cache hits do not reach the network)
+#   - ai_workers (4): an explanation takes seconds, so 4 lets a few users ask
+#     at the same time; a fifth waits for a free thread
+#   - parse_workers (2): the parsing is CPU bound under the GIL, so more
+#     threads would only add contention
+#
+
+import asyncio
+import concurrent.futures
+import functools
+import threading
+
+from jupytervox.commons import config as jvox_config
+
+# pool name -> ThreadPoolExecutor, created on first use
+_pools = {}
+_pools_lock = threading.Lock()
+
+def get_pool(name):
+    '''
+    Return the thread pool "name" ("parse", "tts" or "ai")
+    '''
+    with _pools_lock:
+        pool = _pools.get(name)
+        if pool is None:
+            server_config = jvox_config.jvox_server_config()
+            workers = max(int(server_config[f"{name}_workers"]), 1)
+            pool = concurrent.futures.ThreadPoolExecutor(
+                max_workers=workers, thread_name_prefix=f"jvox-{name}")
+            _pools[name] = pool
+
+    return pool
+
+async def run_in_pool(name, func, *args, **kwargs):
+    '''
+    Run func(*args, **kwargs) in the thread pool "name", and wait for the
+    result without blocking the IOLoop
+    '''
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_pool(name),
+                                      functools.partial(func, *args, **kwargs))
+
+async def run_parse(func, *args, **kwargs):
+    return await run_in_pool("parse", func, *args, **kwargs)
+
+async def run_tts(func, *args, **kwargs):
+    return await run_in_pool("tts", func, *args, **kwargs)
+
+async def run_ai(func, *args, **kwargs):
+    return await run_in_pool("ai", func, *args, **kwargs)
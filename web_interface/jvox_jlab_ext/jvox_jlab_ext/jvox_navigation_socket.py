@@ -0,0 +1,397 @@
+#
+# Class for JVox navigation over a WebSocket
+#
+# Token, lexeme and chunk navigation happen at keystroke rate, e.g., when a
+# user holds an arrow key to scrub through a line. This endpoint keeps one
+# connection open for all navigation requests, instead of one HTTP POST per
+# keystroke.
+#
+# Request (JSON text message):
+#   {"seq": 12, "type": "token" | "lexeme" | "chunk" | "line",
+#    "command": "next" | "pre" | "cur" (chunk also accepts its own commands),
+#    "statement": "...", "cursor_pos": 3,
+#    "chunk_len": 3,            (chunk only)
+#    "audio": true,             (optional, default true)
+#    "audio_mode": "inline",    (optional, "inline", "hash" or "binary")
+#    "tts_engine": "gtts"}      (optional)
+#
+# Reply (JSON text message, one per request, in request order):
+#   {"seq": 12, "type": ..., "start": ..., "stop": ..., "new_pos": ...,
+#    "speech": "...", "audio": base64 or "", "audio_type": ...,
+#    "audio_hash": ..., "audio_binary": false, "superseded": false,
+#    "error": ""}
+#
+# A "line" request reads the whole statement as a stream of speech segments in
+# reading order (e.g., the assignment target, then the value). The segments'
+# audio is synthesized in parallel, and each segment gets its own reply as soon
+# as its audio (and that of the segments before it) is ready, so the client
+# can start playing the first segment early:
+#   {"seq": 12, "type": "line", "segment": 0, "final": false,
+#    "speech": "x,", "audio": ..., ...}
+# "speech_styles" (optional) selects the speech styles as for readline, and
+# "next_stmts" (optional) are the following lines to pre-synthesize.
+#
+# A "cell" request reads every line of the cell in "statement", parsing the
+# cell once (see jvox_read_cell). The lines' audio is synthesized in
+# parallel, and each line gets its own reply, in line order:
+#   {"seq": 12, "type": "cell", "line_no": 1, "final": false,
+#    "speech": "x, is assigned with value, 1", "audio": ..., ...}
+#
+# Audio modes: "inline" embeds the audio as base64; "hash" only gives the
+# audio_hash (see jvox_audio_transport); "binary" sends the audio in a binary
+# frame right after the JSON reply (with "audio_binary": true). The binary
+# frame is the 4-byte big-endian seq followed by the audio bytes.
+#
+# Requests are processed in order. When a newer request has arrived before
+# the audio of an older one is generated, the older request is superseded:
+# its position is still replied (so the client can follow the cursor), but
+# its audio is dropped, so that holding a key does not queue up speech. A
+# request that is already superseded when its turn comes is not parsed at
+# all, so that stale work does not queue up on the parse pool ahead of the
+# live request; it gets one reply with an empty speech and its own
+# cursor_pos as the new position ("final": true for line/cell readings).
+#
+
+import asyncio
+import json
+import struct
+
+import tornado
+import tornado.websocket
+from jupyter_server.base.handlers import JupyterHandler
+from jupyter_server.base.websocket import WebSocketMixin
+
+from jupytervox.interface import get_shared_interface
+from jupytervox.screenreader import utils
+
+# thread pools for the blocking work
+from . import jvox_executor
+from . import jvox_audio_transport
+from . import jvox_speculation
+
+class JVoxNavigationWebSocketHandler(WebSocketMixin, JupyterHandler,
+                                     tornado.websocket.WebSocketHandler):
+    '''
+    JVox WebSocket endpoint for token, lexeme and chunk navigation
+    '''
+    def initialize(self, jvox=None):
+        # the process-wide jvox_interface, injected by setup_route_handlers
+        self.jvox = jvox if jvox is not None else get_shared_interface()
+        self.latest_seq = -1
+        self.requests = asyncio.Queue()
+        self.worker = None
+
+    async def get(self, *args, **kwargs):
+        # authenticate before upgrading to a WebSocket; no login redirect
+        if self.current_user is None:
+            self.log.warning("Couldn't authenticate JVox WebSocket connection")
+            raise tornado.web.HTTPError(403)
+        return await super().get(*args, **kwargs)
+
+    def open(self, *args, **kwargs):
+        super().open(*args, **kwargs)
+        self.worker = asyncio.ensure_future(self.process_requests())
+
+    def on_message(self, message):
+        try:
+            request = json.loads(message)
+            seq = int(request.get("seq", self.latest_seq + 1))
+        except (ValueError, TypeError) as e:
+            self.write_message(json.dumps({"seq": -1,
+                                           "error": f"Bad request: {e}"}))
+            return
+
+        request["seq"] = seq
+        self.latest_seq = max(self.latest_seq, seq)
+        self.requests.put_nowait(request)
+
+    def on_close(self):
+        if self.worker is not None:
+            self.worker.cancel()
+
+    async def process_requests(self):
+        '''
+        Process the requests one by one, in arrival order
+        '''
+        while True:
+            request = await self.requests.get()
+            try:
+                if self.is_superseded(request):
+                    # a newer request is waiting, skip the parsing
+                    reply = self.superseded_reply(request)
+                elif request.get("type") == "line":
+                    # the segment replies are sent by stream_line
+                    await self.stream_line(request)
+                    continue
+                elif request.get("type") == "cell":
+                    # the line replies are sent by stream_cell
+                    await self.stream_cell(request)
+                    continue
+                else:
+                    reply = await self.navigate(request)
+            except tornado.websocket.WebSocketClosedError:
+                return
+            except Exception as e:
+                reply = {"seq": request["seq"], "type": request.get("type"),
+                         "error": str(e)}
+
+            try:
+                self.send_reply(reply)
+            except tornado.websocket.WebSocketClosedError:
+                return
+
+    def send_reply(self, reply):
+        '''
+        Send one reply; in binary mode, the audio goes in a separate binary
+        frame right after it
+        '''
+        audio = reply.pop("audio_bytes", None)
+        self.write_message(json.dumps(reply))
+        if audio is not None:
+            self.write_message(struct.pack(">I", reply["seq"]) + audio,
+                               binary=True)
+
+    def is_superseded(self, request):
+        return request["seq"] < self.latest_seq
+
+    def superseded_reply(self, request):
+        '''
+        Generate the reply of a request that was superseded before it was
+        processed: no speech, and the cursor stays at the request's position
+        '''
+        nav_type = request.get("type", "token")
+        reply = {"seq": request["seq"], "type": nav_type, "speech": "",
+                 "audio": "", "audio_type": "", "audio_hash": "",
+                 "audio_binary": False, "superseded": True, "error": ""}
+
+        if nav_type == "line":
+            reply.update({"segment": 0, "final": True})
+        elif nav_type == "cell":
+            reply.update({"line_no": 1, "final": True})
+        else:
+            reply["new_pos"] = int(request.get("cursor_pos", 0))
+            if nav_type == "chunk":
+                reply.update({"chunk_to_read": "", "error_message": ""})
+
+        return reply
+
+    async def navigate(self, request):
+        '''
+        Handle one navigation request, return the reply
+        '''
+        jvox = self.jvox
+        nav_type = request.get("type", "token")
+        command = request.get("command", "cur")
+        stmt = request["statement"]
+        cur_pos = int(request["cursor_pos"])
+
+        reply = {"seq": request["seq"], "type": nav_type, "error": ""}
+
+        if nav_type == "chunk":
+            chunk_len = int(request.get("chunk_len", 3))
+            result = await jvox_executor.run_parse(jvox.chunkify_statement,
+                                                   stmt, cur_pos, command,
+                                                   chunk_len, False)
+            reply["new_pos"] = result.new_pos
+            reply["chunk_to_read"] = result.chunk_to_read
+            reply["error_message"] = result.error_message
+            speech = (result.chunk_to_read if result.chunk_to_read
+                      else result.error_message)
+        elif nav_type in ("token", "lexeme"):
+            position = await jvox_executor.run_parse(
+                self.find_position, nav_type, command, stmt, cur_pos)
+            reply.update(position)
+            reply["new_pos"] = position["start"]
+            speech = position["speech"]
+        else:
+            raise ValueError(f"Unknown navigation type: {nav_type}")
+
+        reply["speech"] = speech
+        reply["audio"] = ""
+        reply["audio_type"] = ""
+        reply["audio_hash"] = ""
+        reply["audio_binary"] = False
+        reply["superseded"] = self.is_superseded(request)
+
+        # generate the audio only if no newer request is waiting
+        if request.get("audio", True) and speech and not reply["superseded"]:
+            # token and chunk readings can be assembled from phrase clips;
+            # a lexeme is read as an expression
+            gen_audio = (jvox.gen_audio_from_speech if nav_type == "lexeme"
+                         else jvox.gen_audio_from_token_speech)
+            tts_result = await jvox_executor.run_tts(
+                gen_audio, speech, request.get("tts_engine"))
+            if nav_type == "chunk":
+                self.speculate_next_chunk(request, tts_result,
+                                          reply["new_pos"])
+            self.add_audio_fields(reply, tts_result,
+                                  request.get("audio_mode"))
+
+        return reply
+
+    def add_audio_fields(self, reply, tts_result, audio_mode):
+        '''
+        Add the audio of tts_result to a reply, in the requested audio mode
+        '''
+        if audio_mode == "binary":
+            reply["audio_type"] = tts_result.mime_type
+            reply["audio_binary"] = True
+            reply["audio_bytes"] = tts_result.audio
+        else:
+            reply.update(jvox_audio_transport.audio_reply_fields(
+                tts_result, audio_mode))
+
+    async def stream_line(self, request):
+        '''
+        Read a whole statement as a stream of segments: synthesize the
+        segments' audio in parallel, and send one reply per segment, in
+        reading order, as soon as it is ready
+        '''
+        jvox = self.jvox
+        seq = request["seq"]
+        tts_engine = request.get("tts_engine")
+        with_audio = request.get("audio", True)
+
+        # pull the segments one by one from the generator, and start the TTS
+        # of each segment right away
+        segments = jvox.gen_speech_segments_for_one(
+            request["statement"], False, request.get("speech_styles"))
+        speeches = []
+        tts_tasks = []
+        try:
+            while True:
+                speech = await jvox_executor.run_parse(next, segments, None)
+                if speech is None:
+                    break
+                speeches.append(speech)
+                if with_audio and not self.is_superseded(request):
+                    tts_tasks.append(asyncio.ensure_future(
+                        jvox_executor.run_tts(jvox.gen_audio_from_speech,
+                                              speech, tts_engine)))
+                else:
+                    tts_tasks.append(None)
+        except Exception as e:
+            self.send_reply({"seq": seq, "type": "line", "error": str(e)})
+            return
+
+        # speculatively pre-synthesize the segments of the following lines
+        speculator = jvox_speculation.shared_speculator
+        if speculator is not None and with_audio:
+            speculator.speculate_line_segments(request.get("next_stmts", []),
+                                               tts_engine)
+
+        for i, speech in enumerate(speeches):
+            reply = {"seq": seq, "type": "line", "segment": i,
+                     "final": i == len(speeches) - 1, "speech": speech,
+                     "audio": "", "audio_type": "", "audio_hash": "",
+                     "audio_binary": False, "error": ""}
+            # once superseded, the remaining audio is dropped (its synthesis
+            # still finishes into the audio cache)
+            reply["superseded"] = self.is_superseded(request)
+            if tts_tasks[i] is not None and not reply["superseded"]:
+                try:
+                    tts_result = await tts_tasks[i]
+                    if speculator is not None:
+                        speculator.note_request(tts_result.key)
+                    self.add_audio_fields(reply, tts_result,
+                                          request.get("audio_mode"))
+                except Exception as e:
+                    reply["error"] = str(e)
+            self.send_reply(reply)
+
+    async def stream_cell(self, request):
+        '''
+        Read all lines of a cell: generate the speech of the lines with one
+        parse of the cell, synthesize their audio in parallel, and send one
+        reply per line, in line order, as soon as it is ready
+        '''
+        jvox = self.jvox
+        seq = request["seq"]
+        tts_engine = request.get("tts_engine")
+
+        try:
+            speeches = await jvox_executor.run_parse(
+                jvox.gen_speech_for_cell, request["statement"], False,
+                request.get("speech_styles"))
+        except Exception as e:
+            self.send_reply({"seq": seq, "type": "cell", "error": str(e)})
+            return
+
+        # each distinct speech is synthesized once
+        tts_tasks = {}
+        if request.get("audio", True):
+            for speech in speeches:
+                if speech not in tts_tasks:
+                    tts_tasks[speech] = asyncio.ensure_future(
+                        jvox_executor.run_tts(jvox.gen_audio_from_speech,
+                                              speech, tts_engine))
+
+        for i, speech in enumerate(speeches):
+            reply = {"seq": seq, "type": "cell", "line_no": i + 1,
+                     "final": i == len(speeches) - 1, "speech": speech,
+                     "audio": "", "audio_type": "", "audio_hash": "",
+                     "audio_binary": False, "error": ""}
+            reply["superseded"] = self.is_superseded(request)
+            if speech in tts_tasks and not reply["superseded"]:
+                try:
+                    tts_result = await tts_tasks[speech]
+                    self.add_audio_fields(reply, tts_result,
+                                          request.get("audio_mode"))
+                except Exception as e:
+                    reply["error"] = str(e)
+            self.send_reply(reply)
+
+    def speculate_next_chunk(self, request, tts_result, new_pos):
+        '''
+        Pre-synthesize the chunk after the one just read
+        '''
+        speculator = jvox_speculation.shared_speculator
+        if speculator is None:
+            return
+
+        speculator.note_request(tts_result.key)
+        if request.get("command") in ("next", "cur", "pre"):
+            speculator.speculate_chunk(request["statement"], new_pos,
+                                       int(request.get("chunk_len", 3)),
+                                       request.get("tts_engine"))
+
+    def find_position(self, nav_type, command, stmt, cur_pos):
+        '''
+        Find the next/previous/current token or lexeme, and the speech of it
+        '''
+        jvox = self.jvox
+        if nav_type == "token":
+            if command == "next":
+                position = jvox.find_next_token_start(stmt, cur_pos, False)
+            elif command == "pre":
+                position = jvox.find_previous_token_start(stmt, cur_pos, False)
+            else:
+                position = jvox.find_cur_token_start_stop(stmt, cur_pos, False)
+            # next/previous only give the start of the token, read the whole
+            # token at that start
+            if position["start"] >= 0:
+                position = jvox.find_cur_token_start_stop(
+                    stmt, position["start"], False)
+        else:
+            if command == "next":
+                position = jvox.find_next_lexeme_token(stmt, cur_pos, False)
+            elif command == "pre":
+                position = jvox.find_prev_lexeme_token(stmt, cur_pos, False)
+            else:
+                position = jvox.find_cur_lexeme_token(stmt, cur_pos, False)
+
+        if position["start"] < 0:
+            speech = ("end of statement" if command == "next"
+                      else "start of statement")
+        else:
+            text = stmt[position["start"]:position["stop"] + 1].strip()
+            if not text:
+                speech = "space"
+            elif nav_type == "lexeme":
+                # a lexeme can be an expression, e.g., "a + 1"
+                speech = jvox.gen_speech_for_one(text, False)
+            else:
+                speech = utils.make_token_readable(text)
+
+        return {"start": position["start"], "stop": position["stop"],
+                "speech": speech}
@@ -0,0 +1,75 @@
+#
+# Class for JVox read whole cell
+#
+# Reads every line of a cell with one request: the cell is parsed once (see
+# jvox_screenreader.generate_for_cell), and the audio of the lines is
+# synthesized as a batch in the TTS pool. Identical speeches, e.g., the
+# "empty line"s, are synthesized once.
+#
+# Request (JSON):
+#   {"stmts": "the code of the cell",
+#    "speech_styles": {...},    (optional, as for readline)
+#    "audio": true,             (optional, default true)
+#    "audio_mode": "hash",      (optional, "inline" or "hash")
+#    "tts_engine": "gtts"}      (optional)
+#
+# Reply (JSON):
+#   {"lines": [{"line_no": 1, "speech": "...", "audio": base64 or "",
+#               "audio_type": ..., "audio_hash": ...}, ...]}
+#
+
+import asyncio
+import json
+
+import tornado
+from jupyter_server.base.handlers import APIHandler
+
+from jupytervox.interface import get_shared_interface
+
+# thread pools for the blocking work
+from . import jvox_executor
+from . import jvox_audio_transport
+
+class JVoxReadCellRouteHandler(APIHandler):
+    '''
+    JVox screen reader endpoint for reading all lines of a cell
+    '''
+    def initialize(self, jvox=None):
+        # the process-wide jvox_interface, injected by setup_route_handlers
+        self.jvox = jvox if jvox is not None else get_shared_interface()
+
+    @tornado.web.authenticated
+    async def post(self):
+        jvox = self.jvox
+
+        # retrieve the cell
+        input_data = self.get_json_body()
+        cell = input_data["stmts"]
+
+        # generate the speech of all lines with one parse of the cell
+        speeches = await jvox_executor.run_parse(
+            jvox.gen_speech_for_cell, cell, False,
+            input_data.get("speech_styles"))
+
+        lines = [{"line_no": line_no, "speech": speech, "audio": "",
+                  "audio_type": "", "audio_hash": ""}
+                 for line_no, speech in enumerate(speeches, 1)]
+
+        if input_data.get("audio", True):
+            # synthesize each distinct speech once, in parallel
+            distinct_speeches = list(dict.fromkeys(speeches))
+            tts_results = await asyncio.gather(
+                *[jvox_executor.run_tts(jvox.gen_audio_from_speech, speech,
+                                        input_data.get("tts_engine"))
+                  for speech in distinct_speeches])
+            audio_fields = {
+                speech: jvox_audio_transport.audio_reply_fields(
+                    tts_result, input_data.get("audio_mode"))
+                for speech, tts_result in zip(distinct_speeches, tts_results)}
+
+            for line in lines:
+                line.update(audio_fields[line["speech"]])
+
+        # send the JSON
+        self.set_header("Content-Type", "application/json")
+        self.finish(json.dumps({"lines": lines}))
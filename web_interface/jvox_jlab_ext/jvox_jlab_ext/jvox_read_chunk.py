@@ -3,7 +3,6 @@
 #
 
 import json
-import base64
 
 import tornado
 from jupyter_server.base.handlers import APIHandler
@@ -18,15 +17,24 @@ if web_api_path not in sys.path:
 
 import jvox_interface    """
 
-from jupytervox.interface import jvox_interface 
+from jupytervox.interface import get_shared_interface
+
+# thread pools for the blocking work
+from . import jvox_executor
+from . import jvox_audio_transport
+from . import jvox_speculation
 
 class JVoxChunkedReadingRouteHandler(APIHandler):
     '''
     JVox endpoint for generating audio MP3 bytes given an input text
     '''
+    def initialize(self, jvox=None):
+        # the process-wide jvox_interface, injected by setup_route_handlers
+        self.jvox = jvox if jvox is not None else get_shared_interface()
+
     @tornado.web.authenticated
-    def post(self):
-        jvox = jvox_interface("default")
+    async def post(self):
+        jvox = self.jvox
         # print("hello jvox:", jvox)
 
         # extract input information
@@ -36,7 +44,9 @@ class JVoxChunkedReadingRouteHandler(APIHandler):
         command = input_data["command"]
         chunk_len = int(input_data["chunk_len"])
 
-        result = jvox.chunkify_statement(statement, cursor_pos, command, chunk_len, True)
+        result = await jvox_executor.run_parse(jvox.chunkify_statement, statement,
+                                               cursor_pos, command, chunk_len,
+                                               True)
         print(result)
 
         print(result.chunk_to_read)
@@ -49,18 +59,32 @@ class JVoxChunkedReadingRouteHandler(APIHandler):
 
         print("Chunk to read:", audioText)
 
-        # generate audio bytes
-        mp3_bytes = jvox.gen_mp3_bytes_from_speech_gtts(audioText)
+        # generate audio bytes, with the requested TTS engine (default if not
+        # given); chunks are token-by-token readings, which can be assembled
+        # from phrase clips
+        tts_result = await jvox_executor.run_tts(
+            jvox.gen_audio_from_token_speech, audioText,
+            input_data.get("tts_engine"))
         
-        # Encode bytes to Base64 string so that we can send bytes in JSON
-        encoded_audio = base64.b64encode(mp3_bytes).decode('ascii')
+        # the audio, embedded as base64 or referenced by hash, as requested
+        audio_fields = jvox_audio_transport.audio_reply_fields(
+            tts_result, input_data.get("audio_mode"))
+
+        # speculatively pre-synthesize the next chunk
+        speculator = jvox_speculation.shared_speculator
+        if speculator is not None:
+            speculator.note_request(tts_result.key)
+            if result.chunk_to_read:
+                speculator.speculate_chunk(statement, result.new_pos,
+                                           chunk_len,
+                                           input_data.get("tts_engine"))
 
          # Prepare and send the JSON
         reply = {
             "new_pos": result.new_pos,
             "chunk_to_read": result.chunk_to_read,
             "error_message": result.error_message,
-            "audio": encoded_audio
+            **audio_fields
             }
 
         # send the JSON
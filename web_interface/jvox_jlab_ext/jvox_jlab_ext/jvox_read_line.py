@@ -3,7 +3,6 @@
 #
 
 import json
-import base64
 
 import tornado
 from jupyter_server.base.handlers import APIHandler
@@ -18,15 +17,24 @@ if web_api_path not in sys.path:
 
 import jvox_interface """
 
-from jupytervox.interface import jvox_interface 
+from jupytervox.interface import get_shared_interface
+
+# thread pools for the blocking work
+from . import jvox_executor
+from . import jvox_audio_transport
+from . import jvox_speculation
 
 class JVoxScreenReaderRouteHandler(APIHandler):
     '''
     JVox screen reader endpoint for reading a single line
     '''
+    def initialize(self, jvox=None):
+        # the process-wide jvox_interface, injected by setup_route_handlers
+        self.jvox = jvox if jvox is not None else get_shared_interface()
+
     @tornado.web.authenticated
-    def post(self):
-        jvox = jvox_interface("default")
+    async def post(self):
+        jvox = self.jvox
         print("hello jvox:", jvox)
         
         # retrieve statement
@@ -35,20 +43,33 @@ class JVoxScreenReaderRouteHandler(APIHandler):
         print("JVox readline web api got statement", stmt)
 
         # generate speech with jvox
-        jvox_speech = jvox.gen_speech_for_one(stmt, True)
+        # optional per-request speech styles, e.g., {"BinOp": "default"}
+        speech_styles = input_data.get("speech_styles")
+        jvox_speech = await jvox_executor.run_parse(jvox.gen_speech_for_one,
+                                                    stmt, True, speech_styles)
         print(jvox_speech)
 
-        # generate audio bytes
-        mp3_bytes = jvox.gen_mp3_bytes_from_speech_gtts(jvox_speech)
+        # generate audio bytes, with the requested TTS engine (default if not given)
+        tts_result = await jvox_executor.run_tts(
+            jvox.gen_audio_from_speech, jvox_speech, input_data.get("tts_engine"))
         
 
-        # Encode bytes to Base64 string so that we can send bytes in JSON
-        encoded_audio = base64.b64encode(mp3_bytes).decode('ascii')
+        # the audio, embedded as base64 or referenced by hash, as requested
+        audio_fields = jvox_audio_transport.audio_reply_fields(
+            tts_result, input_data.get("audio_mode"))
+
+        # speculatively pre-synthesize the following lines, if the client
+        # sent them
+        speculator = jvox_speculation.shared_speculator
+        if speculator is not None:
+            speculator.note_request(tts_result.key)
+            speculator.speculate_lines(input_data.get("next_stmts", []),
+                                       input_data.get("tts_engine"))
 
         # Prepare and send the JSON
         result = {
                 "speech": jvox_speech,
-                "audio": encoded_audio
+                **audio_fields
             }
 
         # send the JSON
@@ -0,0 +1,194 @@
+#
+# Speculative pre-synthesis of the next line and the next chunk
+#
+# After a user reads a line or a chunk, the next request is most likely the
+# following line or chunk. The speculator generates their speech text and
+# audio in a low-priority background thread, and the audio lands in the audio
+# cache, so that the next request is (almost) a cache hit.
+#
+# Speculation jobs go to a bounded LIFO queue: the newest job is the most
+# likely to be useful, and when the queue is full the oldest job is dropped.
+# A single worker thread runs the jobs, so speculation never takes more than
+# one thread away from the real requests.
+#
+# Hit-rate instrumentation: the audio keys of speculated speech are
+# remembered. When a real request gets audio with one of these keys, it is a
+# speculation hit.
+#
+
+import collections
+import threading
+
+from jupytervox.commons import config as jvox_config
+
+class jvox_speculator:
+    '''
+    Background pre-synthesis of the speech audio of likely next requests
+    '''
+    def __init__(self, jvox, max_queue=16, max_remembered=1024):
+        '''
+        Input parameters:
+        1. jvox: the jvox_interface to generate speech and audio with
+        2. max_queue: max number of waiting jobs, older jobs are dropped
+        3. max_remembered: number of speculated audio keys to remember for
+           hit-rate instrumentation
+        '''
+        self.jvox = jvox
+        self.max_queue = max_queue
+        self.jobs = collections.deque()
+        self.condition = threading.Condition()
+        self.worker = None
+
+        # audio key -> True, of recently speculated audio, in insertion order
+        self.speculated_keys = collections.OrderedDict()
+        self.max_remembered = max_remembered
+
+        # statistics
+        self.submitted = 0
+        self.dropped = 0
+        self.completed = 0
+        self.failed = 0
+        self.hits = 0
+        self.requests = 0
+
+    def submit(self, gen_speech, tts_engine=None, token_speech=False):
+        '''
+        Queue a speculation job. "gen_speech" is a function returning the
+        speech text to pre-synthesize (or "" for nothing), or a list of
+        speech texts, e.g., the segments of a streamed reading.
+        "token_speech" is True for token-by-token readings, e.g., chunks,
+        whose audio may be assembled from phrase clips.
+        '''
+        with self.condition:
+            self.jobs.append((gen_speech, tts_engine, token_speech))
+            self.submitted += 1
+            while len(self.jobs) > self.max_queue:
+                self.jobs.popleft()
+                self.dropped += 1
+
+            if self.worker is None:
+                self.worker = threading.Thread(target=self.run,
+                                               name="jvox-speculation",
+                                               daemon=True)
+                self.worker.start()
+            self.condition.notify()
+
+    def speculate_lines(self, stmts, tts_engine=None):
+        '''
+        Pre-synthesize the readings of the following lines, e.g., the line
+        after the one just read
+        '''
+        def make_gen_speech(stmt):
+            return lambda: self.jvox.gen_speech_for_one(stmt, False)
+
+        # submit the farthest line first, so the nearest one runs first
+        for stmt in reversed(stmts):
+            self.submit(make_gen_speech(stmt), tts_engine)
+
+    def speculate_line_segments(self, stmts, tts_engine=None):
+        '''
+        Pre-synthesize the segments of the streamed readings of the following
+        lines (see jvox_screenreader.generate_stream)
+        '''
+        def make_gen_speech(stmt):
+            return lambda: list(self.jvox.gen_speech_segments_for_one(stmt,
+                                                                      False))
+
+        for stmt in reversed(stmts):
+            self.submit(make_gen_speech(stmt), tts_engine)
+
+    def speculate_chunk(self, stmt, cur_pos, chunk_len, tts_engine=None):
+        '''
+        Pre-synthesize the next chunk after cur_pos of stmt
+        '''
+        def gen_speech():
+            result = self.jvox.chunkify_statement(stmt, cur_pos, "next",
+                                                  chunk_len, False)
+            if result.chunk_to_read:
+                return result.chunk_to_read
+            return result.error_message
+
+        self.submit(gen_speech, tts_engine, token_speech=True)
+
+    def note_request(self, audio_key):
+        '''
+        Record the audio key of a real request, for hit-rate instrumentation
+        '''
+        with self.condition:
+            self.requests += 1
+            if audio_key is not None and audio_key in self.speculated_keys:
+                self.hits += 1
+                # count each speculation at most once
+                del self.speculated_keys[audio_key]
+
+    def run(self):
+        '''
+        The worker thread: run the newest job first
+        '''
+        while True:
+            with self.condition:
+                while len(self.jobs) == 0:
+                    self.condition.wait()
+                gen_speech, tts_engine, token_speech = self.jobs.pop()
+
+            try:
+                speeches = gen_speech()
+                if isinstance(speeches, str):
+                    speeches = [speeches]
+                gen_audio = (self.jvox.gen_audio_from_token_speech
+                             if token_speech
+                             else self.jvox.gen_audio_from_speech)
+                keys = [gen_audio(speech, tts_engine).key
+                        for speech in speeches if speech]
+            except Exception:
+                with self.condition:
+                    self.failed += 1
+                continue
+
+            with self.condition:
+                self.completed += 1
+                for key in keys:
+                    if key is None:
+                        continue
+                    self.speculated_keys[key] = True
+                    self.speculated_keys.move_to_end(key)
+                    while len(self.speculated_keys) > self.max_remembered:
+                        self.speculated_keys.popitem(last=False)
+
+    def stats(self):
+        '''
+        Return the speculation statistics as a dictionary. "hit_rate" is the
+        fraction of completed speculations that a later request used;
+        "request_hit_rate" is the fraction of requests served by speculation.
+        '''
+        with self.condition:
+            return {"submitted": self.submitted,
+                    "dropped": self.dropped,
+                    "completed": self.completed,
+                    "failed": self.failed,
+                    "queued": len(self.jobs),
+                    "requests": self.requests,
+                    "hits": self.hits,
+                    "hit_rate": ((self.hits / self.completed)
+                                 if self.completed else 0.0),
+                    "request_hit_rate": ((self.hits / self.requests)
+                                         if self.requests else 0.0)}
+
+# the process-wide speculator, created by setup_speculator
+shared_speculator = None
+
+def setup_speculator(jvox):
+    '''
+    Create the process-wide speculator if enabled in the [speculation] table
+    of jvox_config.toml. Returns the speculator, or None if disabled.
+    '''
+    global shared_speculator
+
+    speculation_config = jvox_config.jvox_speculation_config()
+    if speculation_config["enabled"]:
+        shared_speculator = jvox_speculator(jvox,
+                                            speculation_config["max_queue"])
+    else:
+        shared_speculator = None
+
+    return shared_speculator
@@ -20,6 +20,9 @@ import jvox_interface
 
 # from jupytervox.interface import jvox_interface 
 
+# the process-wide JVox engine shared by all handlers
+from jupytervox.interface import get_shared_interface
+
 # this should be put into a common configuration file
 EXTENSION_URL = "jvox-lab-ext"
 
@@ -27,9 +30,14 @@ EXTENSION_URL = "jvox-lab-ext"
 from . import jvox_read_chunk
 from . import jvox_audio_support
 from . import jvox_read_line
+from . import jvox_read_cell
 from . import jvox_ai_explanation
 from . import jvox_check_syntax
 from . import jvox_check_cell_syntax
+from . import jvox_navigation_socket
+from . import jvox_audio_transport
+from . import jvox_speculation
+from . import jvox_executor
 
 class HelloRouteHandler(APIHandler):
     # The following decorator should be present on all verb methods (head, get, post,
@@ -44,10 +52,42 @@ class HelloRouteHandler(APIHandler):
             ),
         }))
 
+class StatsRouteHandler(APIHandler):
+    '''
+    Statistics of the speech and audio caches and the speculative
+    pre-synthesis
+    '''
+    def initialize(self, jvox=None):
+        self.jvox = jvox if jvox is not None else get_shared_interface()
+
+    @tornado.web.authenticated
+    def get(self):
+        speculator = jvox_speculation.shared_speculator
+        self.finish(json.dumps({
+            "speech_cache": self.jvox.speech_cache_stats(),
+            "audio_cache": self.jvox.audio_cache_stats(),
+            "speculation": (speculator.stats() if speculator is not None
+                            else None),
+        }))
+
 def setup_route_handlers(web_app):
     host_pattern = ".*$"
     base_url = web_app.settings["base_url"]
 
+    # create the JVox engine once at extension load, and inject it into the
+    # handlers, so that it (and its warm parsers and caches) is reused by all
+    # requests
+    jvox_kwargs = {"jvox": get_shared_interface()}
+
+    # speculative pre-synthesis of the next line/chunk, with the same engine
+    jvox_speculation.setup_speculator(jvox_kwargs["jvox"])
+
+    # pre-render the phrase clips of the fixed vocabulary in the background,
+    # so that the first chunk readings do not wait for them
+    if jvox_kwargs["jvox"].use_phrase_clips:
+        jvox_executor.get_pool("tts").submit(
+            jvox_kwargs["jvox"].prerender_phrase_clips)
+
     # register the hello testing interface
     hello_route_pattern = url_path_join(base_url, EXTENSION_URL, "hello")
     handlers = [(hello_route_pattern, HelloRouteHandler)]
@@ -56,32 +96,50 @@ def setup_route_handlers(web_app):
 
     # add JVox screen reader endpoint
     jvox_screenreader_route_pattern = url_path_join(base_url, EXTENSION_URL, "readline")
-    handlers = [(jvox_screenreader_route_pattern, jvox_read_line.JVoxScreenReaderRouteHandler)]
+    handlers = [(jvox_screenreader_route_pattern, jvox_read_line.JVoxScreenReaderRouteHandler, jvox_kwargs)]
+    web_app.add_handlers(host_pattern, handlers)
+
+    # add JVox whole-cell reading endpoint
+    jvox_read_cell_route_pattern = url_path_join(base_url, EXTENSION_URL, "readCell")
+    handlers = [(jvox_read_cell_route_pattern, jvox_read_cell.JVoxReadCellRouteHandler, jvox_kwargs)]
     web_app.add_handlers(host_pattern, handlers)
 
     # add JVox audio endpoint
     jvox_audio_route_pattern = url_path_join(base_url, EXTENSION_URL, "audio")
-    handlers = [(jvox_audio_route_pattern, jvox_audio_support.JVoxAudioRouteHandler)]
+    handlers = [(jvox_audio_route_pattern, jvox_audio_support.JVoxAudioRouteHandler, jvox_kwargs)]
     web_app.add_handlers(host_pattern, handlers)
 
     # Add JVox chunked reading endpoint
     jvox_chunked_route_pattern = url_path_join(base_url, EXTENSION_URL, "readChunk")
-    handlers = [(jvox_chunked_route_pattern, jvox_read_chunk.JVoxChunkedReadingRouteHandler)]
+    handlers = [(jvox_chunked_route_pattern, jvox_read_chunk.JVoxChunkedReadingRouteHandler, jvox_kwargs)]
     web_app.add_handlers(host_pattern, handlers)
 
     # Add JVox AI explanation endpoint
     jvox_ai_explanation_route_pattern = url_path_join(base_url, EXTENSION_URL, "AIExplain")
-    handlers = [(jvox_ai_explanation_route_pattern, jvox_ai_explanation.JVoxAIExplanationRouteHandler)]
+    handlers = [(jvox_ai_explanation_route_pattern, jvox_ai_explanation.JVoxAIExplanationRouteHandler, jvox_kwargs)]
     web_app.add_handlers(host_pattern, handlers)
 
     # Add JVox single-line syntax check endpoint
     jvox_check_syntax_route_pattern = url_path_join(base_url, EXTENSION_URL, "checkLineSyntax")
-    handlers = [(jvox_check_syntax_route_pattern, jvox_check_syntax.JVoxCheckLineSyntaxRouteHandler)]
+    handlers = [(jvox_check_syntax_route_pattern, jvox_check_syntax.JVoxCheckLineSyntaxRouteHandler, jvox_kwargs)]
     web_app.add_handlers(host_pattern, handlers)
 
     # Add JVox cell-level syntax check endpoint
     jvox_check_cell_syntax_route_pattern = url_path_join(base_url, EXTENSION_URL, "checkCellSyntax")
-    handlers = [(jvox_check_cell_syntax_route_pattern, jvox_check_cell_syntax.JVoxCheckCellSyntaxRouteHandler)]
+    handlers = [(jvox_check_cell_syntax_route_pattern, jvox_check_cell_syntax.JVoxCheckCellSyntaxRouteHandler, jvox_kwargs)]
+    web_app.add_handlers(host_pattern, handlers)
+
+    # Add JVox WebSocket navigation endpoint
+    jvox_navigation_route_pattern = url_path_join(base_url, EXTENSION_URL, "navigate")
+    handlers = [(jvox_navigation_route_pattern, jvox_navigation_socket.JVoxNavigationWebSocketHandler, jvox_kwargs)]
+    web_app.add_handlers(host_pattern, handlers)
+
+    # Add JVox audio-by-hash endpoint, for replies that reference audio by hash
+    jvox_audio_hash_route_pattern = url_path_join(base_url, EXTENSION_URL, "audio", "([0-9a-f]{64})")
+    handlers = [(jvox_audio_hash_route_pattern, jvox_audio_transport.JVoxAudioByHashRouteHandler, jvox_kwargs)]
     web_app.add_handlers(host_pattern, handlers)
 
-    
+    # Add JVox statistics endpoint
+    jvox_stats_route_pattern = url_path_join(base_url, EXTENSION_URL, "stats")
+    handlers = [(jvox_stats_route_pattern, StatsRouteHandler, jvox_kwargs)]
+    web_app.add_handlers(host_pattern, handlers)
@@ -1,3 +1,4 @@
+import base64
 import json
 
 
@@ -15,3 +16,64 @@ async def test_hello(jp_fetch):
                 " Try visiting me in your browser!"
             ),
         }
+
+
+async def test_audio_by_hash(jp_fetch):
+    # When: the audio is requested by hash, then fetched
+    body = json.dumps({"speech": "x equals 1", "tts_engine": "fake",
+                       "audio_mode": "hash"})
+    response = await jp_fetch("jvox-lab-ext", "audio", method="POST",
+                              body=body)
+    payload = json.loads(response.body)
+    audio = await jp_fetch("jvox-lab-ext", "audio", payload["audio_hash"])
+
+    # Then: the fetched audio is the inline audio
+    body = json.dumps({"speech": "x equals 1", "tts_engine": "fake"})
+    response = await jp_fetch("jvox-lab-ext", "audio", method="POST",
+                              body=body)
+    inline = json.loads(response.body)
+    assert payload["audio"] == ""
+    assert inline["audio_hash"] == ""
+    assert audio.code == 200
+    assert base64.b64encode(audio.body).decode("ascii") == inline["audio"]
+
+
+async def test_navigation_socket(jp_ws_fetch):
+    # When: several chunk requests are sent at once, e.g., a held key
+    ws = await jp_ws_fetch("jvox-lab-ext", "navigate")
+    for seq in range(3):
+        ws.write_message(json.dumps({
+            "seq": seq, "type": "chunk", "command": "next",
+            "statement": "x = foo(a, b) + 1", "cursor_pos": 0,
+            "chunk_len": 3, "audio": False}))
+    replies = [json.loads(await ws.read_message()) for seq in range(3)]
+    ws.close()
+
+    # Then: every request is replied in order, and the live one is read
+    assert [reply["seq"] for reply in replies] == [0, 1, 2]
+    assert all(reply["error"] == "" for reply in replies)
+    assert not replies[-1]["superseded"]
+    assert replies[-1]["chunk_to_read"] != ""
+    assert replies[-1]["new_pos"] > 0
+    for reply in replies[:-1]:
+        # requests superseded before their turn are not read
+        assert reply["chunk_to_read"] != "" or reply["superseded"]
+
+
+async def test_readline_uses_speech_cache(jp_fetch):
+    # Given: the interface shared by the handlers
+    from jupytervox.interface import get_shared_interface
+    jvox = get_shared_interface()
+
+    # When: the same line is read twice, indented the second time
+    replies = []
+    for stmt in ["count = count + step", "    count = count + step"]:
+        body = json.dumps({"stmt": stmt, "tts_engine": "fake"})
+        hits = jvox.speech_cache_stats()["hits"]
+        response = await jp_fetch("jvox-lab-ext", "readline", method="POST",
+                                  body=body)
+        replies.append(json.loads(response.body))
+
+    # Then: the second reading is served from the speech cache
+    assert jvox.speech_cache_stats()["hits"] == hits + 1
+    assert replies[1]["speech"].endswith(", " + replies[0]["speech"])
@@ -0,0 +1,136 @@
+import threading
+import time
+import types
+
+from jupytervox.commons import audio_cache
+from jupytervox.interface.jvox_interface import jvox_interface
+
+from jvox_jlab_ext import jvox_speculation
+
+
+class fake_jvox:
+    """Records the speeches synthesized by the speculator"""
+
+    def __init__(self):
+        self.synthesized = []
+
+    def gen_audio_from_speech(self, speech, tts_engine=None):
+        self.synthesized.append(speech)
+        return types.SimpleNamespace(key="key of " + speech)
+
+    gen_audio_from_token_speech = gen_audio_from_speech
+
+
+def wait_for(condition, timeout=10.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.01)
+
+
+def test_newest_job_first_and_oldest_dropped():
+    # Given: a speculator whose worker is busy with a first job
+    jvox = fake_jvox()
+    speculator = jvox_speculation.jvox_speculator(jvox, max_queue=2)
+    started = threading.Event()
+    release = threading.Event()
+
+    def blocking_job():
+        started.set()
+        release.wait()
+        return "busy"
+
+    speculator.submit(blocking_job)
+    started.wait()
+
+    # When: more jobs than the queue holds are submitted
+    for speech in ["a", "b", "c"]:
+        speculator.submit(lambda speech=speech: speech)
+    release.set()
+    wait_for(lambda: speculator.stats()["completed"] == 3)
+
+    # Then: the oldest waiting job is dropped, the newest runs first
+    assert jvox.synthesized == ["busy", "c", "b"]
+    stats = speculator.stats()
+    assert stats["submitted"] == 4
+    assert stats["dropped"] == 1
+    assert stats["queued"] == 0
+
+
+def test_hits_and_failures_are_counted():
+    # Given: a speculated speech and a failed job
+    jvox = fake_jvox()
+    speculator = jvox_speculation.jvox_speculator(jvox)
+    speculator.submit(lambda: ["x equals 1", ""])
+    speculator.submit(lambda: 1 / 0)
+    wait_for(lambda: speculator.stats()["completed"] +
+             speculator.stats()["failed"] == 2)
+
+    # When: real requests get the speculated audio, twice, and other audio
+    speculator.note_request("key of x equals 1")
+    speculator.note_request("key of x equals 1")
+    speculator.note_request("key of y")
+
+    # Then: empty speeches are skipped, each speculation is a hit only once
+    stats = speculator.stats()
+    assert jvox.synthesized == ["x equals 1"]
+    assert stats["failed"] == 1
+    assert stats["hits"] == 1
+    assert stats["requests"] == 3
+    assert stats["hit_rate"] == 1.0
+
+
+def test_speculated_line_is_a_cache_hit():
+    # Given: the next line is speculated with the fake TTS engine
+    jvox = jvox_interface()
+    speculator = jvox_speculation.jvox_speculator(jvox)
+    stmt = "total_of_speculation = price * 3"
+    speculator.speculate_lines([stmt], "fake")
+    wait_for(lambda: speculator.stats()["completed"] == 1)
+
+    # When: the user reads the line
+    cache = audio_cache.shared_cache()
+    misses = cache.stats()["misses"]
+    speech = jvox.gen_speech_for_one(stmt, False)
+    result = jvox.gen_audio_from_speech(speech, "fake")
+    speculator.note_request(result.key)
+
+    # Then: the audio comes from the cache and counts as a speculation hit
+    assert cache.stats()["misses"] == misses
+    assert speculator.stats()["hits"] == 1
+
+
+def test_request_waits_for_speculation_in_flight():
+    # Given: a speculation that is still synthesizing the audio
+    cache = audio_cache.audio_cache()
+    settings = {"engine": "fake", "lang": "en"}
+    started = threading.Event()
+    release = threading.Event()
+    calls = []
+
+    def slow_synthesize(text):
+        calls.append(text)
+        started.set()
+        release.wait()
+        return b"audio"
+
+    speculation = threading.Thread(
+        target=cache.get_or_synthesize,
+        args=("next line", settings, slow_synthesize))
+    speculation.start()
+    started.wait()
+
+    # When: the real request for the same audio arrives
+    results = []
+    request = threading.Thread(
+        target=lambda: results.append(cache.get_or_synthesize(
+            "next line", settings, slow_synthesize)))
+    request.start()
+    time.sleep(0.05)
+    release.set()
+    speculation.join()
+    request.join()
+
+    # Then: the audio is synthesized once, and the request gets it
+    assert calls == ["next line"]
+    assert results == [b"audio"]
@@ -12,7 +12,7 @@ import { requestAPI } from './request';
  
 // import { CodeEditor } from '@jupyterlab/codeeditor';
 
-import { jvox_getLineAndCursor, jvox_getSelection, jvox_speak, jvox_updateInfoPanel } from './jvox_utils';
+import { jvox_getLineAndCursor, jvox_getSelection, jvox_audioUrl, jvox_speak, jvox_updateInfoPanel } from './jvox_utils';
  
 import { JVoxCommandRegistry } from './jvox_command_registry';
 import { JVoxSettings } from './jvox_settings';
@@ -170,13 +170,12 @@ export class jvox_AiExplain {
         // Access the speech in text and audio
         const speechText = data.speech;
         console.debug("JVox AI Explain returns speech:", speechText);
-        const base64Audio = data.audio;
 
         // play audio
         console.debug("speech text:", speechText);
         jvox_updateInfoPanel(speechText); // update the info panel with the speech text
-        // Extract BASE64 encoded audio bytes, and play the audio
-        const audioUrl = `data:audio/mpeg;base64,${base64Audio}`;
+        // Get the embedded or hash-referenced audio, and play it
+        const audioUrl = jvox_audioUrl(data);
         jvox_speak(audioUrl);
 
         return;
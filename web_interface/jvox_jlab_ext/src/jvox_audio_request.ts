@@ -2,7 +2,7 @@
  * JVox utilities
  */
 
-import { jvox_speak, jvox_updateInfoPanel } from "./jvox_utils";
+import { jvox_audioUrl, jvox_speak, jvox_updateInfoPanel } from "./jvox_utils";
 
 import { requestAPI } from "./request";
 
@@ -13,7 +13,7 @@ import { requestAPI } from "./request";
 export function jvox_readSpeech(textToRead: String){
     // request audio mp3 from server
     // send line to server extension
-    const dataToSend = { speech: textToRead };
+    const dataToSend = { speech: textToRead, audio_mode: 'hash' };
     requestAPI('audio', {
         body: JSON.stringify(dataToSend),
         method: 'POST'
@@ -44,12 +44,11 @@ async function jvox_handleAudioResponse(response: Response)
 
     // Access the speech in text and audio
     const speechText = data.speech;
-    const base64Audio = data.audio;
 
     console.debug("speech text:", speechText);
     jvox_updateInfoPanel(speechText); // update the info panel with the speech text
 
-    // Extract BASE64 encoded audio bytes, and play the audio
-    const audioUrl = `data:audio/mpeg;base64,${base64Audio}`;
+    // Get the embedded or hash-referenced audio, and play it
+    const audioUrl = jvox_audioUrl(data);
     jvox_speak(audioUrl);
 }
\ No newline at end of file
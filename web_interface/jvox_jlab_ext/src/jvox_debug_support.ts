@@ -21,7 +21,7 @@ import { CodeEditor } from '@jupyterlab/codeeditor';
 
 import { jvox_readSpeech } from './jvox_audio_request';
 import { requestAPI } from './request';
-import { jvox_speak, jvox_updateInfoPanel } from './jvox_utils';
+import { jvox_audioUrl, jvox_speak, jvox_updateInfoPanel } from './jvox_utils';
 
 import { JVoxCommandRegistry } from './jvox_command_registry';
 
@@ -319,12 +319,11 @@ export class jvox_debugSupport {
 			.then(async (response: Response) => {
 				const data = await response.json();
 				const msg: string = data.msg;
-				const base64Audio: string = data.audio;
 
 				console.debug("JVox syntax check result:", msg, "offset:", data.offset);
 				jvox_updateInfoPanel(msg);
 
-				const audioUrl = `data:audio/mpeg;base64,${base64Audio}`;
+				const audioUrl = jvox_audioUrl(data);
 				jvox_speak(audioUrl);
 			})
 			.catch(reason => {
@@ -367,14 +366,13 @@ export class jvox_debugSupport {
 			.then(async (response: Response) => {
 				const data = await response.json();
 				const msg: string = data.msg;
-				const base64Audio: string = data.audio;
 
 				console.debug("JVox cell syntax check result:", msg,
 					"line_no:", data.line_no, "offset:", data.offset,
 					"error_no:", data.error_no);
 				jvox_updateInfoPanel(msg);
 
-				const audioUrl = `data:audio/mpeg;base64,${base64Audio}`;
+				const audioUrl = jvox_audioUrl(data);
 				jvox_speak(audioUrl);
 			})
 			.catch(reason => {
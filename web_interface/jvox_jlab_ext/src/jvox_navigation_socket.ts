@@ -0,0 +1,118 @@
+import { URLExt } from '@jupyterlab/coreutils';
+
+import { ServerConnection } from '@jupyterlab/services';
+
+/**
+ * Client of the JVox navigation WebSocket (jvox-lab-ext/navigate).
+ *
+ * Navigation requests are sent over one persistent connection instead of one
+ * HTTP POST per keystroke. Each request gets a sequence number; the server
+ * replies to every request in order, but drops the audio of requests that
+ * were superseded by a newer one (e.g., when a key is held down).
+ */
+export class jvox_NavigationSocket {
+    private socket: WebSocket | null = null;
+    private opening: Promise<WebSocket> | null = null;
+    private seq: number = 0;
+    private pending = new Map<number, {
+        resolve: (reply: any) => void,
+        reject: (reason: any) => void,
+        onSegment?: (reply: any) => void
+    }>();
+
+    /**
+     * Send one navigation request, e.g.,
+     * { type: 'chunk', command: 'next', statement, cursor_pos, chunk_len }
+     * @returns The reply from the server
+     */
+    public async navigate(request: any): Promise<any> {
+        const socket = await this.connect();
+        const seq = this.seq++;
+
+        return new Promise((resolve, reject) => {
+            this.pending.set(seq, { resolve, reject });
+            socket.send(JSON.stringify({ ...request, seq: seq }));
+        });
+    }
+
+    /**
+     * Read a whole line as a stream of speech segments, e.g.,
+     * { statement, audio_mode: 'hash' }. "onSegment" is called with the reply
+     * of each segment, in reading order, as soon as its audio is ready.
+     * @returns The reply of the final segment
+     */
+    public async readLineStream(request: any,
+                                onSegment: (reply: any) => void): Promise<any> {
+        const socket = await this.connect();
+        const seq = this.seq++;
+
+        return new Promise((resolve, reject) => {
+            this.pending.set(seq, { resolve, reject, onSegment });
+            socket.send(JSON.stringify({ ...request, type: 'line', seq: seq }));
+        });
+    }
+
+    // open the WebSocket if not yet opened
+    private connect(): Promise<WebSocket> {
+        if (this.socket && this.socket.readyState === WebSocket.OPEN) {
+            return Promise.resolve(this.socket);
+        }
+        if (this.opening) {
+            return this.opening;
+        }
+
+        const settings = ServerConnection.makeSettings();
+        let url = URLExt.join(settings.wsUrl, 'jvox-lab-ext', 'navigate');
+        if (settings.token) {
+            url = url + '?token=' + encodeURIComponent(settings.token);
+        }
+
+        this.opening = new Promise((resolve, reject) => {
+            const socket = new WebSocket(url);
+            socket.onopen = () => {
+                this.socket = socket;
+                this.opening = null;
+                resolve(socket);
+            };
+            socket.onerror = () => {
+                this.opening = null;
+                reject(new Error('JVox navigation WebSocket error'));
+            };
+            socket.onclose = () => {
+                this.socket = null;
+                this.opening = null;
+                // fail the requests still waiting for a reply
+                this.pending.forEach(p => p.reject(
+                    new Error('JVox navigation WebSocket closed')));
+                this.pending.clear();
+            };
+            socket.onmessage = (event) => {
+                const reply = JSON.parse(event.data);
+                const p = this.pending.get(reply.seq);
+                if (!p) {
+                    console.debug('JVox navigation: unexpected reply', reply);
+                    return;
+                }
+                if (reply.error) {
+                    this.pending.delete(reply.seq);
+                    p.reject(new Error(reply.error));
+                    return;
+                }
+                if (p.onSegment) {
+                    p.onSegment(reply);
+                    // a streamed reading has more segments to come
+                    if (reply.final === false) {
+                        return;
+                    }
+                }
+                this.pending.delete(reply.seq);
+                p.resolve(reply);
+            };
+        });
+
+        return this.opening;
+    }
+}
+
+// the shared navigation connection
+export const jvox_navigationSocket = new jvox_NavigationSocket();
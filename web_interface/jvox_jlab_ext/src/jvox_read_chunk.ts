@@ -7,6 +7,8 @@ import { INotebookTracker } from '@jupyterlab/notebook';
 import { ICommandPalette } from '@jupyterlab/apputils';
  
 import { requestAPI } from './request';
+
+import { jvox_navigationSocket } from './jvox_navigation_socket';
  
  //import { EditorView } from '@codemirror/view';
  
@@ -14,7 +16,7 @@ import { CodeEditor } from '@jupyterlab/codeeditor';
  
 //import { jvox_speak } from './jvox_audio_request';
 
-import { jvox_getLineAndCursor, jvox_speak } from './jvox_utils';
+import { jvox_getLineAndCursor, jvox_audioUrl, jvox_speak } from './jvox_utils';
  
 import { JVoxCommandRegistry } from './jvox_command_registry';
  
@@ -110,20 +112,30 @@ export class jvox_ReadChunk {
             statement: cursorInfo.lineText,
             cursor_pos: cursorInfo.column,
             command: readCommand,
-            chunk_len: this.chunk_len
+            chunk_len: this.chunk_len,
+            // reference the audio by hash, so the browser caches it
+            audio_mode: 'hash'
          };
-        requestAPI('readChunk', {
-            body: JSON.stringify(dataToSend),
-            method: 'POST'
-        })
-            .then(reply => {
-                console.log(reply);
-                this.jvox_handleReadChunkResponse(reply, cursorInfo);
+        // use the navigation WebSocket, fall back to HTTP if it fails
+        jvox_navigationSocket.navigate({ type: 'chunk', ...dataToSend })
+            .then(data => {
+                this.jvox_handleReadChunkData(data, cursorInfo);
             })
-            .catch(reason => {
-                console.error(
-                    `Error on JVox read chunk with ${dataToSend}.\n${reason}`
-                );
+            .catch(wsReason => {
+                console.debug(`JVox navigation WebSocket failed: ${wsReason}`);
+                requestAPI('readChunk', {
+                    body: JSON.stringify(dataToSend),
+                    method: 'POST'
+                })
+                    .then(reply => {
+                        console.log(reply);
+                        this.jvox_handleReadChunkResponse(reply, cursorInfo);
+                    })
+                    .catch(reason => {
+                        console.error(
+                            `Error on JVox read chunk with ${dataToSend}.\n${reason}`
+                        );
+                    });
             });
 
         return;
@@ -137,16 +149,25 @@ export class jvox_ReadChunk {
 
         // Unpack JSON
         const data = await response.json();
-      
+
+        this.jvox_handleReadChunkData(data, cursorInfo);
+
+        return;
+    }
+
+    private jvox_handleReadChunkData(data: any, cursorInfo: any)
+    {
         // Access the speech in text and audio
         const speechText = data.chunk_to_read;
-        const base64Audio = data.audio;
 
-        // play audio
+        // play audio. Superseded requests (a newer one is already sent) come
+        // back without audio, only move the cursor for them
         console.debug("speech text:", speechText);
-        // Extract BASE64 encoded audio bytes, and play the audio
-        const audioUrl = `data:audio/mpeg;base64,${base64Audio}`;
-        jvox_speak(audioUrl);
+        if (data.audio || data.audio_hash) {
+            // Get the embedded or hash-referenced audio, and play it
+            const audioUrl = jvox_audioUrl(data);
+            jvox_speak(audioUrl);
+        }
 
         // set new cursor position
         const editor: CodeEditor.IEditor = cursorInfo.editor;
@@ -8,7 +8,8 @@ import { ICommandPalette } from '@jupyterlab/apputils';
 
 import { requestAPI } from './request';
 
-import { jvox_speak, jvox_updateInfoPanel } from './jvox_utils';
+import { jvox_audioUrl, jvox_speak, jvox_speakQueued, jvox_updateInfoPanel } from './jvox_utils';
+import { jvox_navigationSocket } from './jvox_navigation_socket';
 
 import { JVoxCommandRegistry } from './jvox_command_registry'; // make sure this import is present
 
@@ -45,8 +46,34 @@ function jvox_read_line(notebookTracker: INotebookTracker)
     // log the line
     console.log(`Line ${lineNumber}: ${lineText}`);
 
+    // the next line, for the server to pre-synthesize its reading
+    const nextStmts = (lineNumber < cm.state.doc.lines) ?
+	[cm.state.doc.line(lineNumber + 1).text] : [];
+
+    // stream the reading over the navigation WebSocket, so that the first
+    // segment plays while the rest is synthesized; fall back to HTTP
+    let speechText = '';
+    jvox_navigationSocket.readLineStream(
+	{ statement: lineText, next_stmts: nextStmts, audio_mode: 'hash' },
+	(segment) => {
+	    speechText = speechText ? `${speechText} ${segment.speech}` : segment.speech;
+	    jvox_updateInfoPanel(speechText);
+	    if (segment.audio_hash || segment.audio) {
+		jvox_speakQueued(jvox_audioUrl(segment), segment.segment === 0);
+	    }
+	})
+	.catch(reason => {
+	    console.warn(`JVox line stream failed, using HTTP: ${reason}`);
+	    jvox_read_line_http(lineText, nextStmts);
+	});
+}
+
+// read a line with one HTTP request to the readline endpoint
+function jvox_read_line_http(lineText: string, nextStmts: string[])
+{
     // send line to server extension
-    const dataToSend = { stmt: lineText };
+    const dataToSend = { stmt: lineText, next_stmts: nextStmts,
+			 audio_mode: 'hash' };
     requestAPI('readline', {
 	body: JSON.stringify(dataToSend),
 	method: 'POST'
@@ -103,13 +130,12 @@ async function jvox_handle_readline_response(response: Response){
   
     // Access the speech in text and audio
     const speechText = data.speech;
-    const base64Audio = data.audio;
 
     console.debug("Read line speech text:", speechText);
     jvox_updateInfoPanel(speechText); // update the info panel with the speech text
 
-    // Extract BASE64 encoded audio bytes, and play the audio
-    const audioUrl = `data:audio/mpeg;base64,${base64Audio}`;
+    // Get the embedded or hash-referenced audio, and play it
+    const audioUrl = jvox_audioUrl(data);
     jvox_speak(audioUrl);
 
     return;
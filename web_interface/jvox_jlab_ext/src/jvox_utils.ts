@@ -5,6 +5,8 @@
 import { INotebookTracker } from '@jupyterlab/notebook';
 import { CodeEditor } from '@jupyterlab/codeeditor';
 import { JVoxInfoPanelManager } from './jvox_info_panel';  
+import { URLExt } from '@jupyterlab/coreutils';
+import { ServerConnection } from '@jupyterlab/services';
 
 /**
  *  play sound
@@ -25,7 +27,17 @@ export function jvox_setReadingRate(rate: number): void {
     console.log(`JVox: reading rate set to ${rate}`);
 }
 
-export async function jvox_speak(audioUrl: string){
+// audio URLs waiting for the current audio to end, e.g., the later segments
+// of a streamed line reading
+let audioQueue: string[] = [];
+audio.addEventListener('ended', () => {
+    const next = audioQueue.shift();
+    if (next !== undefined) {
+        void jvox_playAudio(next);
+    }
+});
+
+async function jvox_playAudio(audioUrl: string){
     // Extract BASE64 encoded audio bytes, and play the audio
     audio.src = audioUrl;
     audio.playbackRate = reading_rate;
@@ -38,6 +50,44 @@ export async function jvox_speak(audioUrl: string){
     }
 }
 
+export async function jvox_speak(audioUrl: string){
+    // a new reading interrupts the queued audio
+    audioQueue = [];
+    await jvox_playAudio(audioUrl);
+}
+
+/**
+ * Play the audio after the audio being played (and queued) so far, e.g., the
+ * next segment of a streamed reading. With "interrupt", start a new reading
+ * right away instead.
+ */
+export function jvox_speakQueued(audioUrl: string, interrupt: boolean): void {
+    if (interrupt || audio.paused || audio.ended) {
+        void jvox_speak(audioUrl);
+    } else {
+        audioQueue.push(audioUrl);
+    }
+}
+
+/**
+ * Get the URL to play the audio of a JVox server reply. The audio is either
+ * embedded as base64 ("audio"), or referenced by its hash ("audio_hash",
+ * requested with audio_mode: 'hash'), which the browser fetches and caches.
+ */
+export function jvox_audioUrl(data: any): string {
+    if (data.audio_hash) {
+        const settings = ServerConnection.makeSettings();
+        let url = URLExt.join(settings.baseUrl, 'jvox-lab-ext', 'audio',
+                              data.audio_hash);
+        if (settings.token) {
+            url = url + '?token=' + encodeURIComponent(settings.token);
+        }
+        return url;
+    }
+
+    return `data:${data.audio_type ?? 'audio/mpeg'};base64,${data.audio}`;
+}
+
 /**
  * Common function to process JVox server audio response
  * @param response 
@@ -52,12 +102,11 @@ export async function jvox_handleAudioResponse(response: Response)
 
     // Access the speech in text and audio
     const speechText = data.speech;
-    const base64Audio = data.audio;
 
     console.debug("speech text:", speechText);
 
     // Extract BASE64 encoded audio bytes, and play the audio
-    const audioUrl = `data:audio/mpeg;base64,${base64Audio}`;
+    const audioUrl = jvox_audioUrl(data);
     jvox_speak(audioUrl);
 } */
 
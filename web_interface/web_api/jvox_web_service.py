@@ -6,6 +6,8 @@ from flask import send_file
 
 # import jupytervox packages
 import jvox_interface
+from jupytervox.commons import config as jvox_config
+from jupytervox.parser.converter import prewarm
 
 app = Flask(__name__)
 jvox = None
@@ -156,6 +158,10 @@ def chunkify_statement():
 if __name__ == "__main__":
     jvox = jvox_interface.jvox_interface("default")
     print("hello jvox:", jvox)
+    # prewarm the parser's DFA caches in the background
+    prewarm_config = jvox_config.jvox_prewarm_config()
+    if prewarm_config["enabled"]:
+        prewarm.start_prewarm_thread(prewarm_config["max_statements"], print)
     # start the web service. this function will not return until the service is
     # terminate. so run this function at the end
     app.run()